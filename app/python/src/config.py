@@ -1,8 +1,13 @@
 import os
 
-from dotenv import load_dotenv
+# Lambda sets this variable; `.env` files are only a local-development aid, so
+# python-dotenv stays off the cold-start path.
+IS_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
 
-load_dotenv(override=True)
+if not IS_LAMBDA:
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
 
 
 class Config:
@@ -10,6 +15,69 @@ class Config:
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
     AWS_REGION_NAME = os.getenv("AWS_REGION_NAME", "us-east-1")
+    # Optional endpoint override, e.g. DynamoDB Local
+    DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+    DYNAMODB_MAX_POOL_CONNECTIONS = int(
+        os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "10")
+    )
+    DYNAMODB_CONNECT_TIMEOUT = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "1"))
+    DYNAMODB_READ_TIMEOUT = float(os.getenv("DYNAMODB_READ_TIMEOUT", "3"))
+    # Seconds of the Lambda's remaining time kept back from a request, to
+    # answer with a 503 and release idempotency claims when it runs out
+    REQUEST_DEADLINE_MARGIN = float(os.getenv("REQUEST_DEADLINE_MARGIN", "0.25"))
+    # Read through the low-level client instead of the boto3 resource layer
+    DYNAMODB_CLIENT_READS = (
+        os.getenv("DYNAMODB_CLIENT_READS", "false").lower() == "true"
+    )
+    # Client-side retries, rate limiting and circuit breaking of DynamoDB
+    # calls (`db.resilience`); when on, botocore makes a single attempt
+    DYNAMODB_RESILIENCE_ENABLED = (
+        os.getenv("DYNAMODB_RESILIENCE_ENABLED", "true").lower() == "true"
+    )
+    DYNAMODB_RETRY_MAX_ATTEMPTS = int(os.getenv("DYNAMODB_RETRY_MAX_ATTEMPTS", "5"))
+    DYNAMODB_RETRY_BASE_DELAY = float(os.getenv("DYNAMODB_RETRY_BASE_DELAY", "0.025"))
+    DYNAMODB_RETRY_MAX_DELAY = float(os.getenv("DYNAMODB_RETRY_MAX_DELAY", "0.5"))
+    # Most seconds one call may spend waiting between attempts
+    DYNAMODB_RETRY_BUDGET = float(os.getenv("DYNAMODB_RETRY_BUDGET", "1.0"))
+    # Requests per second per table and process; with 0 the rate limiter only
+    # paces requests after DynamoDB throttles them
+    DYNAMODB_MAX_REQUESTS_PER_SECOND = float(
+        os.getenv("DYNAMODB_MAX_REQUESTS_PER_SECOND", "0")
+    )
+    DYNAMODB_CIRCUIT_FAILURE_THRESHOLD = int(
+        os.getenv("DYNAMODB_CIRCUIT_FAILURE_THRESHOLD", "10")
+    )
+    DYNAMODB_CIRCUIT_RESET_TIMEOUT = float(
+        os.getenv("DYNAMODB_CIRCUIT_RESET_TIMEOUT", "5")
+    )
+    # Storage behind DynamoFender: `boto3`, or `memory` for offline runs
+    DYNAMODB_BACKEND = os.getenv("DYNAMODB_BACKEND", "boto3").lower()
+    # Worker threads for concurrent DynamoDB calls (kept below the pool size)
+    IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "8"))
+    # In-process item cache; TTLs are in seconds and 0 disables a prefix
+    ITEM_CACHE_ENABLED = os.getenv("ITEM_CACHE_ENABLED", "true").lower() == "true"
+    ITEM_CACHE_MAX_SIZE = int(os.getenv("ITEM_CACHE_MAX_SIZE", "1024"))
+    ITEM_CACHE_PLAN_TTL = float(os.getenv("ITEM_CACHE_PLAN_TTL", "300"))
+    ITEM_CACHE_USER_TTL = float(os.getenv("ITEM_CACHE_USER_TTL", "0"))
+    # Webhook de-duplication by `eventId`; the TTL feeds the table's `ttl` attribute
+    IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(7 * 24 * 60 * 60)))
+    IDEMPOTENCY_RECENT_EVENTS = int(os.getenv("IDEMPOTENCY_RECENT_EVENTS", "4096"))
+    # Upper bound for batch webhook requests
+    WEBHOOK_BATCH_MAX_EVENTS = int(os.getenv("WEBHOOK_BATCH_MAX_EVENTS", "500"))
+    # Upper bound for user IDs in one subscription lookup request
+    SUBSCRIPTION_LOOKUP_MAX_USERS = int(
+        os.getenv("SUBSCRIPTION_LOOKUP_MAX_USERS", "500")
+    )
+    # Users processed in parallel by the queue entry point
+    QUEUE_MAX_PARALLEL_USERS = int(os.getenv("QUEUE_MAX_PARALLEL_USERS", "4"))
+    # Response JSON encoder: `auto` (orjson when installed), `orjson` or `json`
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "auto").lower()
+    # Responses at least this large are gzipped when the client accepts it
+    RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+    # One embedded-metric-format log line per invocation with stage timings
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "FenderSubscriptions")
 
 
 IS_DEVELOPMENT = Config.ENVIRONMENT == "development"
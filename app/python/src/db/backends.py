@@ -0,0 +1,780 @@
+import math
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+try:
+    # For local development
+    from ..config import Config
+    from ..utils.metrics import count
+    from .expressions import Evaluator, ExpressionError, parse_condition, parse_update
+    from .serializers import convert_dynamo_value, deserialize_item
+    from .session import DynamoSession
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.expressions import Evaluator, ExpressionError, parse_condition, parse_update
+    from db.serializers import convert_dynamo_value, deserialize_item
+    from db.session import DynamoSession
+    from utils.metrics import count
+
+PK_FIELD = "pk"
+SK_FIELD = "sk"
+CONDITIONAL_CHECK_FAILED = "ConditionalCheckFailedException"
+# Most items a single BatchWriteItem request accepts
+BATCH_WRITE_MAX_ITEMS = 25
+# Most keys a single BatchGetItem request accepts
+BATCH_GET_MAX_KEYS = 100
+# `StorageBackend` methods that send a request to DynamoDB
+REQUEST_OPERATIONS = frozenset(
+    {
+        "query",
+        "get_item",
+        "batch_get",
+        "scan",
+        "batch_write",
+        "batch_write_request",
+        "put_item",
+        "update_item",
+        "delete_item",
+    }
+)
+
+
+class ConditionalCheckFailed(Exception):
+    """
+    A write's ConditionExpression did not hold, so nothing was written.
+    `item` is the item as stored at that moment, for puts that asked for it
+    with `return_stored`.
+    """
+
+    def __init__(self, message: str, item: dict | None = None) -> None:
+        super().__init__(message)
+        self.item = item
+
+
+class StorageBackend(ABC):
+    """
+    Storage operations `DynamoFender` performs against its table.
+
+    Expressions use DynamoDB syntax with `#name`/`:value` placeholders and
+    values are Python values as the boto3 resource takes them (`Decimal` for
+    non-integral numbers). Items always come back as plain Python (see
+    `serializers`), whatever the backend.
+    """
+
+    @abstractmethod
+    def query(
+        self,
+        key_condition: str,
+        names: dict,
+        values: dict,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None]:
+        """
+        Return one page of items and the key to continue from, if any.
+        """
+
+    @abstractmethod
+    def get_item(self, key: dict) -> dict | None:
+        """
+        Return the item with this primary key, or None if there is none.
+        """
+
+    @abstractmethod
+    def batch_get(self, keys: list[dict]) -> tuple[list[dict], list[dict]]:
+        """
+        Send one BatchGetItem request of at most `BATCH_GET_MAX_KEYS` keys.
+        Return the items found, in no particular order, and the keys left
+        unprocessed, for the caller to retry.
+        """
+
+    @abstractmethod
+    def scan(
+        self,
+        segment: int,
+        total_segments: int,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None, float]:
+        """
+        Return one page of a scan segment, the key to continue from, if any,
+        and the read capacity units the page consumed.
+        """
+
+    @abstractmethod
+    def batch_write(self, items: list[dict]) -> None:
+        """
+        Write `items`, in as many batches as it takes.
+        """
+
+    @abstractmethod
+    def batch_write_request(self, items: list[dict]) -> list[dict]:
+        """
+        Send one BatchWriteItem request of at most `BATCH_WRITE_MAX_ITEMS`
+        puts and return the items left unprocessed, for the caller to retry.
+        """
+
+    @abstractmethod
+    def put_item(
+        self,
+        item: dict,
+        condition: str | None = None,
+        names: dict | None = None,
+        values: dict | None = None,
+        return_stored: bool = False,
+    ) -> None:
+        """
+        Write an item. A failed `condition` raises `ConditionalCheckFailed`,
+        carrying the stored item if `return_stored`.
+        """
+
+    @abstractmethod
+    def update_item(
+        self,
+        key: dict,
+        update: str,
+        names: dict,
+        values: dict,
+        condition: str | None = None,
+    ) -> dict:
+        """
+        Apply an UpdateExpression and return the item as stored afterwards.
+        """
+
+    @abstractmethod
+    def delete_item(self, key: dict) -> None:
+        """
+        Delete the item with this primary key, if there is one.
+        """
+
+
+def _expression_params(names: dict | None, values: dict | None) -> dict:
+    # DynamoDB rejects empty placeholder maps
+    params = {}
+    if names:
+        params["ExpressionAttributeNames"] = names
+    if values:
+        params["ExpressionAttributeValues"] = values
+    return params
+
+
+class Boto3Backend(StorageBackend):
+    """
+    DynamoDB through the shared `DynamoSession`. Writes and (by default) reads
+    go through the boto3 resource; `client_reads` reads through the low-level
+    client instead, skipping the resource layer's type conversion.
+    """
+
+    serializer = TypeSerializer()
+
+    def __init__(self, tablename: str, client_reads: bool = False) -> None:
+        self.tablename = tablename
+        self.client_reads = client_reads
+        self._table = None
+
+    @property
+    def dynamodb(self):
+        return DynamoSession.resource()
+
+    @property
+    def client(self):
+        return DynamoSession.client()
+
+    @property
+    def table(self):
+        if self._table is None:
+            try:
+                self._table = DynamoSession.table(self.tablename)
+            except Exception as error:
+                raise ValueError(
+                    f"Could't make connection to `{self.tablename}` table due `{error}`"
+                )
+        return self._table
+
+    def query(
+        self,
+        key_condition: str,
+        names: dict,
+        values: dict,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None]:
+        params = {"KeyConditionExpression": key_condition}
+        if limit is not None:
+            params["Limit"] = limit
+
+        if self.client_reads:
+            values = {
+                name: self.serializer.serialize(value) for name, value in values.items()
+            }
+            if start_key is not None:
+                params["ExclusiveStartKey"] = {
+                    name: self.serializer.serialize(value)
+                    for name, value in start_key.items()
+                }
+            response = self.client.query(
+                TableName=self.tablename, **params, **_expression_params(names, values)
+            )
+            last_key = response.get("LastEvaluatedKey")
+            return (
+                [deserialize_item(item) for item in response["Items"]],
+                deserialize_item(last_key) if last_key else None,
+            )
+
+        if start_key is not None:
+            params["ExclusiveStartKey"] = start_key
+        response = self.table.query(**params, **_expression_params(names, values))
+        return (
+            [convert_dynamo_value(item) for item in response["Items"]],
+            response.get("LastEvaluatedKey"),
+        )
+
+    def get_item(self, key: dict) -> dict | None:
+        if self.client_reads:
+            response = self.client.get_item(
+                TableName=self.tablename,
+                Key={
+                    name: self.serializer.serialize(value)
+                    for name, value in key.items()
+                },
+            )
+            item = response.get("Item")
+            return deserialize_item(item) if item else None
+
+        item = self.table.get_item(Key=key).get("Item")
+        return convert_dynamo_value(item) if item else None
+
+    def batch_get(self, keys: list[dict]) -> tuple[list[dict], list[dict]]:
+        if self.client_reads:
+            response = self.client.batch_get_item(
+                RequestItems={
+                    self.tablename: {
+                        "Keys": [
+                            {
+                                name: self.serializer.serialize(value)
+                                for name, value in key.items()
+                            }
+                            for key in keys
+                        ]
+                    }
+                }
+            )
+            items = [
+                deserialize_item(item)
+                for item in response["Responses"].get(self.tablename, [])
+            ]
+            unprocessed = response.get("UnprocessedKeys", {}).get(self.tablename, {})
+            return items, [deserialize_item(key) for key in unprocessed.get("Keys", [])]
+
+        response = self.dynamodb.batch_get_item(
+            RequestItems={self.tablename: {"Keys": keys}}
+        )
+        items = [
+            convert_dynamo_value(item)
+            for item in response["Responses"].get(self.tablename, [])
+        ]
+        unprocessed = response.get("UnprocessedKeys", {}).get(self.tablename, {})
+        return items, unprocessed.get("Keys", [])
+
+    def scan(
+        self,
+        segment: int,
+        total_segments: int,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None, float]:
+        params = {
+            "Segment": segment,
+            "TotalSegments": total_segments,
+            "ReturnConsumedCapacity": "TOTAL",
+        }
+        if limit is not None:
+            params["Limit"] = limit
+
+        if self.client_reads:
+            if start_key is not None:
+                params["ExclusiveStartKey"] = {
+                    name: self.serializer.serialize(value)
+                    for name, value in start_key.items()
+                }
+            response = self.client.scan(TableName=self.tablename, **params)
+            last_key = response.get("LastEvaluatedKey")
+            items = [deserialize_item(item) for item in response["Items"]]
+            last_key = deserialize_item(last_key) if last_key else None
+        else:
+            if start_key is not None:
+                params["ExclusiveStartKey"] = start_key
+            response = self.table.scan(**params)
+            items = [convert_dynamo_value(item) for item in response["Items"]]
+            last_key = response.get("LastEvaluatedKey")
+
+        capacity = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+        return items, last_key, float(capacity)
+
+    def batch_write(self, items: list[dict]) -> None:
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    def batch_write_request(self, items: list[dict]) -> list[dict]:
+        response = self.dynamodb.batch_write_item(
+            RequestItems={
+                self.tablename: [{"PutRequest": {"Item": item}} for item in items]
+            }
+        )
+        unprocessed = response.get("UnprocessedItems", {}).get(self.tablename, [])
+        return [request["PutRequest"]["Item"] for request in unprocessed]
+
+    def put_item(
+        self,
+        item: dict,
+        condition: str | None = None,
+        names: dict | None = None,
+        values: dict | None = None,
+        return_stored: bool = False,
+    ) -> None:
+        params = _expression_params(names, values)
+        if condition:
+            params["ConditionExpression"] = condition
+        if return_stored:
+            params["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+
+        try:
+            self.table.put_item(Item=item, **params)
+        except ClientError as error:
+            if error.response["Error"]["Code"] == CONDITIONAL_CHECK_FAILED:
+                # Error responses skip the resource layer's type conversion
+                stored = error.response.get("Item")
+                raise ConditionalCheckFailed(
+                    str(error), deserialize_item(stored) if stored else None
+                ) from error
+            raise
+
+    def update_item(
+        self,
+        key: dict,
+        update: str,
+        names: dict,
+        values: dict,
+        condition: str | None = None,
+    ) -> dict:
+        params = _expression_params(names, values)
+        if condition:
+            params["ConditionExpression"] = condition
+
+        try:
+            response = self.table.update_item(
+                Key=key, UpdateExpression=update, ReturnValues="ALL_NEW", **params
+            )
+        except ClientError as error:
+            if error.response["Error"]["Code"] == CONDITIONAL_CHECK_FAILED:
+                raise ConditionalCheckFailed(str(error)) from error
+            raise
+
+        return convert_dynamo_value(response.get("Attributes", {}))
+
+    def delete_item(self, key: dict) -> None:
+        self.table.delete_item(Key=key)
+
+
+def _copy(value):
+    # Stored items must not share containers with the caller's dicts
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def item_size(value, name: str = "") -> int:
+    """
+    Approximate stored size of an item (or attribute) in bytes, following
+    DynamoDB's sizing rules closely enough to estimate consumed capacity.
+    """
+    size = len(name.encode())
+    if isinstance(value, str):
+        return size + len(value.encode())
+    if isinstance(value, (bytes, bytearray)):
+        return size + len(value)
+    if isinstance(value, bool) or value is None:
+        return size + 1
+    if isinstance(value, (int, float, Decimal)):
+        return size + len(str(value)) // 2 + 1
+    if isinstance(value, dict):
+        return size + 3 + sum(item_size(item, key) for key, item in value.items())
+    return size + 3 + sum(item_size(item) for item in value)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    In-process table for tests, benchmarks and offline runs.
+
+    Each partition keeps its sort keys in a sorted list next to a dict of
+    items, so queries walk the partition in sort-key order and pages resume
+    with a bisect. Key conditions, update expressions and condition
+    expressions are evaluated by `expressions`. `page_size` caps the items
+    per query page, standing in for DynamoDB's 1 MB page limit, and `calls`
+    counts the operations received (the round trips a real table would see).
+    """
+
+    def __init__(self, items: list[dict] | None = None, page_size: int = 1000) -> None:
+        self.page_size = page_size
+        self.calls = Counter()
+        self._partitions = {}
+        self._lock = threading.RLock()
+        # Bumped whenever a partition is created or removed
+        self._layout = 0
+        self._segments = {}
+
+        for item in items or []:
+            self._store(_copy(item))
+
+    def _store(self, item: dict) -> None:
+        pk, sk = item[PK_FIELD], item[SK_FIELD]
+        if pk not in self._partitions:
+            self._partitions[pk] = ([], {})
+            self._layout += 1
+        sort_keys, items = self._partitions[pk]
+        if sk not in items:
+            insort(sort_keys, sk)
+        items[sk] = item
+
+    def _remove(self, pk: str, sk: str) -> None:
+        if (partition := self._partitions.get(pk)) is None:
+            return
+        sort_keys, items = partition
+        if items.pop(sk, None) is not None:
+            sort_keys.remove(sk)
+        if not items:
+            del self._partitions[pk]
+            self._layout += 1
+
+    def _stored(self, key: dict) -> dict | None:
+        if (partition := self._partitions.get(key[PK_FIELD])) is None:
+            return None
+        return partition[1].get(key[SK_FIELD])
+
+    @staticmethod
+    def _check(item: dict, condition: str | None, evaluator: Evaluator) -> None:
+        if condition and not evaluator.test(parse_condition(condition), item):
+            raise ConditionalCheckFailed("The conditional request failed")
+
+    @staticmethod
+    def _partition_key(node: tuple, evaluator: Evaluator):
+        """
+        Find the `pk = :value` part a key condition must contain.
+        """
+        if node[0] == "and":
+            return MemoryBackend._partition_key(
+                node[1], evaluator
+            ) or MemoryBackend._partition_key(node[2], evaluator)
+        if (
+            node[0] == "compare"
+            and node[1] == "="
+            and node[2][0] == "path"
+            and node[3][0] == "value"
+            and evaluator.attribute(node[2][1][0]) == PK_FIELD
+        ):
+            return evaluator.resolve(node[3], {})
+        return None
+
+    def get(self, pk: str, sk: str) -> dict | None:
+        """
+        Return a stored item as plain Python, without counting a call.
+        """
+        with self._lock:
+            item = self._stored({PK_FIELD: pk, SK_FIELD: sk})
+            return None if item is None else convert_dynamo_value(item)
+
+    def keys(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return [
+                (pk, sk)
+                for pk, (sort_keys, _) in sorted(self._partitions.items())
+                for sk in sort_keys
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(items) for _, items in self._partitions.values())
+
+    def query(
+        self,
+        key_condition: str,
+        names: dict,
+        values: dict,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None]:
+        self.calls["query"] += 1
+        node = parse_condition(key_condition)
+        evaluator = Evaluator(names, values)
+        if (pk := self._partition_key(node, evaluator)) is None:
+            raise ExpressionError("The key condition must match `pk` by equality")
+
+        page_size = min(limit or self.page_size, self.page_size)
+        with self._lock:
+            if (partition := self._partitions.get(pk)) is None:
+                return [], None
+            sort_keys, items = partition
+
+            start = 0
+            if start_key is not None:
+                start = bisect_right(sort_keys, start_key[SK_FIELD])
+
+            page = []
+            for position in range(start, len(sort_keys)):
+                item = items[sort_keys[position]]
+                if evaluator.test(node, item):
+                    page.append(convert_dynamo_value(item))
+                if len(page) == page_size:
+                    if position + 1 < len(sort_keys):
+                        return page, {PK_FIELD: pk, SK_FIELD: sort_keys[position]}
+                    break
+
+        return page, None
+
+    def get_item(self, key: dict) -> dict | None:
+        self.calls["get_item"] += 1
+        with self._lock:
+            item = self._stored(key)
+            return None if item is None else convert_dynamo_value(item)
+
+    def batch_get(self, keys: list[dict]) -> tuple[list[dict], list[dict]]:
+        if len(keys) > BATCH_GET_MAX_KEYS:
+            raise ExpressionError(
+                f"BatchGetItem takes at most {BATCH_GET_MAX_KEYS} keys"
+            )
+        self.calls["batch_get"] += 1
+        with self._lock:
+            items = [self._stored(key) for key in keys]
+            return [convert_dynamo_value(item) for item in items if item], []
+
+    @staticmethod
+    def segment_of(pk: str, total_segments: int) -> int:
+        """
+        Scan segment of a partition; DynamoDB likewise splits by key hash.
+        """
+        return zlib.crc32(pk.encode()) % total_segments
+
+    def scan(
+        self,
+        segment: int,
+        total_segments: int,
+        limit: int | None = None,
+        start_key: dict | None = None,
+    ) -> tuple[list[dict], dict | None, float]:
+        self.calls["scan"] += 1
+        page_size = min(limit or self.page_size, self.page_size)
+
+        with self._lock:
+            pks = self._segment_keys(segment, total_segments)
+            position, after = 0, None
+            if start_key is not None:
+                position = bisect_left(pks, start_key[PK_FIELD])
+                after = start_key
+
+            page = []
+            for pk in pks[position:]:
+                sort_keys, items = self._partitions[pk]
+                start = 0
+                if after is not None and after[PK_FIELD] == pk:
+                    start = bisect_right(sort_keys, after[SK_FIELD])
+                for sk in sort_keys[start:]:
+                    page.append(convert_dynamo_value(items[sk]))
+                    if len(page) == page_size:
+                        last_key = {PK_FIELD: pk, SK_FIELD: sk}
+                        return page, last_key, self._read_capacity(page)
+
+        return page, None, self._read_capacity(page)
+
+    def _segment_keys(self, segment: int, total_segments: int) -> list[str]:
+        """
+        Sorted partition keys of a segment, kept until partitions come or go.
+        """
+        cached = self._segments.get((segment, total_segments))
+        if cached is not None and cached[0] == self._layout:
+            return cached[1]
+
+        pks = sorted(
+            pk
+            for pk in self._partitions
+            if self.segment_of(pk, total_segments) == segment
+        )
+        self._segments[(segment, total_segments)] = (self._layout, pks)
+        return pks
+
+    @staticmethod
+    def _read_capacity(items: list[dict]) -> float:
+        # Eventually consistent reads: half a unit per 4 KB read
+        return math.ceil(sum(item_size(item) for item in items) / 4096) * 0.5
+
+    def batch_write(self, items: list[dict]) -> None:
+        self.calls["batch_write"] += 1
+        with self._lock:
+            for item in items:
+                self._store(_copy(item))
+
+    def batch_write_request(self, items: list[dict]) -> list[dict]:
+        if len(items) > BATCH_WRITE_MAX_ITEMS:
+            raise ExpressionError(
+                f"BatchWriteItem takes at most {BATCH_WRITE_MAX_ITEMS} items"
+            )
+        self.calls["batch_write_request"] += 1
+        with self._lock:
+            for item in items:
+                self._store(_copy(item))
+        return []
+
+    def put_item(
+        self,
+        item: dict,
+        condition: str | None = None,
+        names: dict | None = None,
+        values: dict | None = None,
+        return_stored: bool = False,
+    ) -> None:
+        self.calls["put_item"] += 1
+        with self._lock:
+            current = self._stored(item) or {}
+            try:
+                self._check(current, condition, Evaluator(names, values))
+            except ConditionalCheckFailed as error:
+                if return_stored and current:
+                    error.item = convert_dynamo_value(_copy(current))
+                raise
+            self._store(_copy(item))
+
+    def update_item(
+        self,
+        key: dict,
+        update: str,
+        names: dict,
+        values: dict,
+        condition: str | None = None,
+    ) -> dict:
+        self.calls["update_item"] += 1
+        evaluator = Evaluator(names, values)
+        with self._lock:
+            current = self._stored(key) or {}
+            self._check(current, condition, evaluator)
+            item = evaluator.apply(parse_update(update), {**current, **key})
+            self._store(_copy(item))
+            return convert_dynamo_value(item)
+
+    def delete_item(self, key: dict) -> None:
+        self.calls["delete_item"] += 1
+        with self._lock:
+            self._remove(key[PK_FIELD], key[SK_FIELD])
+
+
+class MeteredBackend:
+    """
+    Wraps a backend so each request it sends (retries included) is tallied
+    in the invocation's `dynamo.calls` metric. Reads answered by the item
+    cache never get this far. Other attributes are the wrapped backend's own.
+    """
+
+    def __init__(self, backend: StorageBackend) -> None:
+        self.backend = backend
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.backend, name)
+        if name not in REQUEST_OPERATIONS:
+            return attribute
+
+        def operation(*args, **kwargs):
+            count("dynamo.calls")
+            return attribute(*args, **kwargs)
+
+        return operation
+
+
+class FaultInjectingBackend:
+    """
+    Wraps a backend (usually a `MemoryBackend`) so its requests fail the way
+    an unhealthy table's do, for exercising `resilience` offline.
+
+    `fail_next(count, code)` makes the next `count` requests raise a
+    `ClientError` with that DynamoDB error code; `error_rate` makes any
+    request fail with `code` at random. `injected` counts the faults raised
+    by operation. `latency` makes every request (or those in
+    `slow_operations` only) take that many seconds more, like a round trip
+    to DynamoDB; the sleep releases the GIL as socket I/O does. Other
+    attributes are the wrapped backend's own.
+    """
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        error_rate: float = 0.0,
+        code: str = "ProvisionedThroughputExceededException",
+        seed: int | None = None,
+        latency: float = 0.0,
+        slow_operations: frozenset[str] = REQUEST_OPERATIONS,
+    ) -> None:
+        self.backend = backend
+        self.error_rate = error_rate
+        self.code = code
+        self.latency = latency
+        self.slow_operations = slow_operations
+        self.injected = Counter()
+        self._scheduled = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(
+        self, count: int = 1, code: str = "ProvisionedThroughputExceededException"
+    ) -> None:
+        with self._lock:
+            self._scheduled.extend([code] * count)
+
+    def _fault(self) -> str | None:
+        with self._lock:
+            if self._scheduled:
+                return self._scheduled.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.code
+        return None
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.backend, name)
+        if name not in REQUEST_OPERATIONS:
+            return attribute
+
+        def operation(*args, **kwargs):
+            if self.latency and name in self.slow_operations:
+                time.sleep(self.latency)
+            if (code := self._fault()) is not None:
+                self.injected[name] += 1
+                raise ClientError(
+                    {"Error": {"Code": code, "Message": "Injected fault"}}, name
+                )
+            return attribute(*args, **kwargs)
+
+        return operation
+
+
+def make_backend(
+    tablename: str, client_reads: bool = Config.DYNAMODB_CLIENT_READS
+) -> StorageBackend:
+    """
+    Backend selected by `Config.DYNAMODB_BACKEND` (`boto3` or `memory`).
+    """
+    if Config.DYNAMODB_BACKEND == "memory":
+        return MemoryBackend()
+    if Config.DYNAMODB_BACKEND == "boto3":
+        return Boto3Backend(tablename, client_reads=client_reads)
+    raise ValueError(f"Unknown DynamoDB backend `{Config.DYNAMODB_BACKEND}`")
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    # For local development
+    from ..utils.metrics import count
+except ImportError:
+    # For AWS Lambda deployment
+    from utils.metrics import count
+
+
+class ItemCache:
+    """
+    In-process read-through cache for DynamoDB items.
+
+    Entries are keyed by `(pk, sk)` (`sk` is None for whole-partition reads),
+    evicted in LRU order once `max_size` is reached and expire after the TTL of
+    the longest matching key prefix. A TTL of 0 means keys with that prefix are
+    never cached. Being module-level state, the cache survives warm Lambda
+    invocations; callers must treat cached items as read-only.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        prefix_ttls: dict[str, float] | None = None,
+        default_ttl: float = 0,
+    ) -> None:
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        # Longest prefix first, so `plan:legacy:` can override `plan:`
+        self.prefix_ttls = sorted(
+            (prefix_ttls or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def ttl_for(self, pk: str) -> float:
+        for prefix, ttl in self.prefix_ttls:
+            if pk.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def get(self, pk: str, sk: str | None = None):
+        """
+        Return the cached value or None on a miss. Hits are also tallied in
+        the invocation's `cache.hits` metric. Keys that are never cached do
+        not count towards the hit rate.
+        """
+        if self.ttl_for(pk) <= 0:
+            return None
+
+        key = (pk, sk)
+
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+        count("cache.hits")
+        return value
+
+    def set(self, pk: str, value, sk: str | None = None) -> None:
+        if (ttl := self.ttl_for(pk)) <= 0:
+            return
+
+        key = (pk, sk)
+
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + ttl)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, pk: str, sk: str | None = None) -> None:
+        """
+        Drop the partition read for `pk` and, if given, the `(pk, sk)` item.
+        """
+        with self._lock:
+            self._items.pop((pk, None), None)
+            if sk is not None:
+                self._items.pop((pk, sk), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hitRate": self.hits / requests if requests else 0.0,
+        }
@@ -1,38 +1,70 @@
-import json
+import random
+import re
+import time
 from decimal import Decimal
-
-import boto3
-from boto3.dynamodb.conditions import And, Key
+from typing import Callable, Iterator
 
 try:
     # For local development
-    from ..config import IS_DEVELOPMENT, Config
-except:
-    from config import IS_DEVELOPMENT, Config
-
-
-def serialize_dynamo(dict):
-    return json.loads(json.dumps(dict, default=str_dynamo_data))
-
-
-def str_dynamo_data(obj):
-    # Coerce every object into string
-    return str(obj)
+    from ..config import Config
+    from ..utils.concurrency import run_concurrently
+    from ..utils.metrics import timed
+    from .backends import (
+        BATCH_GET_MAX_KEYS,
+        PK_FIELD,
+        SK_FIELD,
+        ConditionalCheckFailed,
+        MeteredBackend,
+        StorageBackend,
+        make_backend,
+    )
+    from .cache import ItemCache
+    from .resilience import GuardedBackend, TableGuard
+    from .scan import ScanProgress, parallel_scan
+    from .serializers import convert_dynamo_items
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.backends import (
+        BATCH_GET_MAX_KEYS,
+        PK_FIELD,
+        SK_FIELD,
+        ConditionalCheckFailed,
+        MeteredBackend,
+        StorageBackend,
+        make_backend,
+    )
+    from db.cache import ItemCache
+    from db.resilience import GuardedBackend, TableGuard
+    from db.scan import ScanProgress, parallel_scan
+    from db.serializers import convert_dynamo_items
+    from utils.concurrency import run_concurrently
+    from utils.metrics import timed
+
+# Retries of keys a BatchGetItem request leaves unprocessed (throttling)
+BATCH_GET_MAX_ATTEMPTS = 6
+BATCH_GET_BASE_DELAY = 0.02
+BATCH_GET_MAX_DELAY = 1.0
+
+
+def serialize_dynamo(items: list[dict]) -> list[dict]:
+    """
+    Convert items read from DynamoDB into plain Python (see `serializers`).
+    """
+    return convert_dynamo_items(items)
 
 
-def dynamo_write_serializer(dict: dict) -> dict:
+def dynamo_write_serializer(data: dict) -> dict:
     """
-    Serialize data before writing into DynamoDB
+    Serialize data before writing into DynamoDB, including nested maps
     """
-    for key, value in dict.items():
+    for key, value in data.items():
         if isinstance(value, float):
-            dict[key] = Decimal(str(value))
-
-    return dict
-
+            data[key] = Decimal(str(value))
+        elif isinstance(value, dict):
+            dynamo_write_serializer(value)
 
-PK_FIELD = "pk"
-SK_FIELD = "sk"
+    return data
 
 
 class DynamoFender:
@@ -40,25 +72,43 @@ class DynamoFender:
     DynamoDB connection handler for Fender application.
     """
 
-    def __init__(self, tablename) -> None:
-        if IS_DEVELOPMENT:
-            auth_params = {
-                "aws_access_key_id": Config.AWS_ACCESS_KEY_ID,
-                "aws_secret_access_key": Config.AWS_SECRET_ACCESS_KEY,
-                "region_name": Config.AWS_REGION_NAME,
-            }
-            self.dynamodb = boto3.resource("dynamodb", **auth_params)
-            self.client = boto3.client("dynamodb", **auth_params)
-        else:
-            self.dynamodb = boto3.resource("dynamodb")
-            self.client = boto3.client("dynamodb")
-        try:
-            self.table = self.dynamodb.Table(tablename)
-        except Exception as error:
-            raise ValueError(
-                f"Could't make connection to `{tablename}` table due `{error}`"
-            )
-
+    def __init__(
+        self,
+        tablename,
+        cache: ItemCache | None = None,
+        client_reads: bool = Config.DYNAMODB_CLIENT_READS,
+        backend: StorageBackend | None = None,
+        guard: TableGuard | None = None,
+    ) -> None:
+        # The default boto3 backend builds its clients lazily from the shared
+        # `DynamoSession`, so creating a table handler is free until it
+        # actually talks to DynamoDB.
+        self.tablename = tablename
+        self.cache = cache
+        if backend is None:
+            backend = make_backend(tablename, client_reads=client_reads)
+        self.backend = backend
+        if guard is None and Config.DYNAMODB_RESILIENCE_ENABLED:
+            guard = TableGuard.from_config()
+        self.guard = guard
+        self._io = None
+        self._io_backend = None
+
+    @property
+    def io(self) -> StorageBackend:
+        """
+        The backend every request goes through: metered (see
+        `MeteredBackend`) and behind the table's `guard` (see `resilience`),
+        if it has one. It follows `backend` when that is swapped, as tests do.
+        """
+        if self._io is None or self._io_backend is not self.backend:
+            io = MeteredBackend(self.backend)
+            if self.guard is not None:
+                io = GuardedBackend(io, self.guard)
+            self._io, self._io_backend = io, self.backend
+        return self._io
+
+    @timed("dynamo.write")
     def write(self, data: list | dict) -> bool:
         """
         Writes data into table
@@ -67,31 +117,154 @@ class DynamoFender:
         if isinstance(data, dict):
             data = [data]
 
-        with self.table.batch_writer() as batch:
-            for values in data:
-                serialized_values = dynamo_write_serializer(values)
-                batch.put_item(Item=serialized_values)
+        self.io.batch_write([dynamo_write_serializer(values) for values in data])
+
+        for values in data:
+            self._invalidate(values.get(PK_FIELD), values.get(SK_FIELD))
 
         return True
 
-    def _convert_updatable_dict(self, payload: dict) -> dict:
+    @timed("dynamo.write_batch")
+    def write_batch(self, items: list[dict]) -> list[dict]:
         """
-        Convert payload to corresponding format to update
+        Write up to 25 items in one BatchWriteItem request. Returns the items
+        DynamoDB left unprocessed; retrying them is up to the caller.
         """
+        unprocessed = self.io.batch_write_request(
+            [dynamo_write_serializer(values) for values in items]
+        )
 
-        final_dict = {}
+        for values in items:
+            self._invalidate(values.get(PK_FIELD), values.get(SK_FIELD))
 
-        for key, value in payload.items():
-            if key == PK_FIELD or key == SK_FIELD:
-                continue
+        return unprocessed
+
+    @timed("dynamo.put")
+    def put(
+        self,
+        data: dict,
+        condition: str | None = None,
+        condition_values: dict | None = None,
+    ) -> bool:
+        """
+        Write a whole item with a single PutItem, replacing any item with the
+        same key. `condition` is an optional ConditionExpression, named like
+        the ones of `update`. Returns False when the condition failed.
+        """
+        names = {}
+        if condition:
+            names = {f"#{name}": name for name in re.findall(r"#(\w+)", condition)}
+
+        try:
+            self.io.put_item(
+                dynamo_write_serializer(data),
+                condition=condition,
+                names=names,
+                values=dynamo_write_serializer(dict(condition_values or {})),
+            )
+        except ConditionalCheckFailed:
+            return False
+        finally:
+            self._invalidate(data.get(PK_FIELD), data.get(SK_FIELD))
+
+        return True
+
+    @timed("dynamo.put_if_absent")
+    def put_if_absent(self, data: dict, token_field: str | None = None) -> bool:
+        """
+        Write an item only if no item with the same key exists. Returns False
+        when the item was already there.
 
-            final_dict.update({key: {"Value": value}})
+        The put may be retried after an error that left its outcome unknown,
+        and then fail its condition on the item its own first attempt wrote.
+        With a `token_field` holding a value unique to this write, an item
+        found with that same value counts as written by this call.
+        """
+        try:
+            self.io.put_item(
+                dynamo_write_serializer(data),
+                condition="attribute_not_exists(#pk)",
+                names={"#pk": PK_FIELD},
+                return_stored=token_field is not None,
+            )
+        except ConditionalCheckFailed as error:
+            if (
+                token_field is None
+                or error.item is None
+                or error.item.get(token_field) != data[token_field]
+            ):
+                return False
+
+        self._invalidate(data.get(PK_FIELD), data.get(SK_FIELD))
+        return True
 
-        return final_dict
+    @timed("dynamo.delete")
+    def delete(self, pk: str, sk: str) -> None:
+        """
+        Deletes a single item by key
+        """
+        self.io.delete_item({PK_FIELD: pk, SK_FIELD: sk})
+        self._invalidate(pk, sk)
+
+    def _invalidate(self, pk: str, sk: str) -> None:
+        if self.cache is not None and pk:
+            self.cache.invalidate(pk, sk)
 
-    def update(self, data: dict) -> None:
+    def _build_update_expression(
+        self, data: dict, set_if_missing: dict, condition: str | None
+    ) -> dict:
         """
-        Updates DB in dynamo
+        Build the UpdateItem expression parameters. Every attribute is named
+        `#<attribute>` and valued `:<attribute>`, so conditions can refer to
+        attributes as `#lastModified` and to their own values as `:<name>`.
+        """
+        names = {}
+        values = {}
+        actions = []
+
+        for key, value in data.items():
+            if key in (PK_FIELD, SK_FIELD):
+                continue
+            names[f"#{key}"] = key
+            values[f":{key}"] = value
+            actions.append(f"#{key} = :{key}")
+
+        for key, value in set_if_missing.items():
+            if key in (PK_FIELD, SK_FIELD) or f"#{key}" in names:
+                continue
+            names[f"#{key}"] = key
+            values[f":{key}"] = value
+            actions.append(f"#{key} = if_not_exists(#{key}, :{key})")
+
+        params = {
+            "UpdateExpression": "SET " + ", ".join(actions),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": dynamo_write_serializer(values),
+        }
+
+        if condition:
+            params["ConditionExpression"] = condition
+            # DynamoDB rejects unused placeholders, so only add the ones used
+            for name in re.findall(r"#(\w+)", condition):
+                names[f"#{name}"] = name
+
+        return params
+
+    @timed("dynamo.update")
+    def update(
+        self,
+        data: dict,
+        set_if_missing: dict | None = None,
+        condition: str | None = None,
+        condition_values: dict | None = None,
+    ) -> dict | None:
+        """
+        Updates DB in dynamo with a single conditional UpdateItem.
+
+        `data` attributes are always set and `set_if_missing` ones only when
+        the item does not have them yet, so the same call creates or updates
+        the item. `condition` is an optional ConditionExpression. Returns the
+        item as stored after the write, or None if the condition failed.
         """
         pk_value = data.get(PK_FIELD)
         sk_value = data.get(SK_FIELD)
@@ -102,30 +275,150 @@ class DynamoFender:
         if SK_FIELD not in data.keys() or not sk_value:
             raise ValueError(f"`sk` is mandatory")
 
-        # Convert dict to value field
-        attributes = self._convert_updatable_dict(data)
-
-        return self.table.update_item(
-            Key={
-                PK_FIELD: pk_value,
-                SK_FIELD: sk_value,
-            },
-            AttributeUpdates=attributes,
+        params = self._build_update_expression(data, set_if_missing or {}, condition)
+        params["ExpressionAttributeValues"].update(
+            dynamo_write_serializer(dict(condition_values or {}))
         )
 
+        try:
+            return self.io.update_item(
+                {PK_FIELD: pk_value, SK_FIELD: sk_value},
+                params["UpdateExpression"],
+                params["ExpressionAttributeNames"],
+                params["ExpressionAttributeValues"],
+                condition=params.get("ConditionExpression"),
+            )
+        except ConditionalCheckFailed:
+            return None
+        finally:
+            self._invalidate(pk_value, sk_value)
+
+    def _query(self, pk: str, sk: str | None = None) -> list[dict]:
+        """
+        Read a partition, or one item of it, following every result page.
+        """
+        condition = "#pk = :pk"
+        names = {"#pk": PK_FIELD}
+        values = {":pk": pk}
+        if sk is not None:
+            condition += " AND #sk = :sk"
+            names["#sk"] = SK_FIELD
+            values[":sk"] = sk
+
+        items, start_key = self.io.query(condition, names, values)
+        while start_key is not None:
+            page, start_key = self.io.query(
+                condition, names, values, start_key=start_key
+            )
+            items.extend(page)
+
+        return items
+
+    @timed("dynamo.get_by_pk")
     def get_by_pk(self, pk: str) -> dict:
-        response = self.table.query(KeyConditionExpression=Key("pk").eq(pk))
-        return serialize_dynamo(response["Items"])
+        if self.cache is not None and (items := self.cache.get(pk)) is not None:
+            return items
 
+        items = self._query(pk)
+
+        # Missing items are not cached, so newly created ones show up at once
+        if self.cache is not None and items:
+            self.cache.set(pk, items)
+
+        return items
+
+    @timed("dynamo.get_item")
+    def get_item(self, pk: str, sk: str) -> dict | None:
+        """
+        Read one item by its full key with a single GetItem.
+        """
+        if self.cache is not None and (item := self.cache.get(pk, sk)) is not None:
+            return item
+
+        item = self.io.get_item({PK_FIELD: pk, SK_FIELD: sk})
+        if self.cache is not None and item is not None:
+            self.cache.set(pk, item, sk=sk)
+        return item
+
+    @timed("dynamo.get_items")
+    def get_items(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+        """
+        Read many items by full key through BatchGetItem, in concurrent
+        requests of up to 100 keys. Returns the items found keyed by
+        `(pk, sk)`; missing items are left out.
+        """
+        found = {}
+        pending = []
+        for pk, sk in dict.fromkeys(keys):
+            if self.cache is not None and (item := self.cache.get(pk, sk)) is not None:
+                found[(pk, sk)] = item
+            else:
+                pending.append({PK_FIELD: pk, SK_FIELD: sk})
+
+        calls = [
+            lambda chunk=pending[start : start + BATCH_GET_MAX_KEYS]: self._batch_get(
+                chunk
+            )
+            for start in range(0, len(pending), BATCH_GET_MAX_KEYS)
+        ]
+        for items in run_concurrently(*calls) if calls else []:
+            for item in items:
+                pk, sk = item[PK_FIELD], item[SK_FIELD]
+                found[(pk, sk)] = item
+                if self.cache is not None:
+                    self.cache.set(pk, item, sk=sk)
+
+        return found
+
+    def _batch_get(self, keys: list[dict]) -> list[dict]:
+        """
+        One chunk of `get_items`. Unprocessed keys are retried with
+        exponential backoff and full jitter, and raise once the attempts run
+        out.
+        """
+        items = []
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt:
+                delay = BATCH_GET_BASE_DELAY * 2 ** (attempt - 1)
+                time.sleep(random.uniform(0, min(BATCH_GET_MAX_DELAY, delay)))
+            page, keys = self.io.batch_get(keys)
+            items.extend(page)
+            if not keys:
+                return items
+
+        raise RuntimeError(f"BatchGetItem left {len(keys)} keys unprocessed")
+
+    @timed("dynamo.get_or_create")
     def get_or_create(self, pk: str, sk: str) -> dict:
-        response = self.table.query(
-            KeyConditionExpression=And(Key("pk").eq(pk), Key("sk").eq(sk))
-        )
-        items = serialize_dynamo(response["Items"])
+        if self.cache is not None and (item := self.cache.get(pk, sk)) is not None:
+            return item
+
+        items = self._query(pk, sk)
         if items:
+            if self.cache is not None:
+                self.cache.set(pk, items[0], sk=sk)
             return items[0]
         return {}
 
+    def scan_parallel(
+        self,
+        total_segments: int = 4,
+        page_size: int | None = None,
+        max_capacity_per_second: float | None = None,
+        progress: Callable[[ScanProgress], None] | None = None,
+    ) -> Iterator[dict]:
+        """
+        Stream every item of the table through a segmented parallel scan
+        (see `scan.parallel_scan`). It bypasses the item cache.
+        """
+        return parallel_scan(
+            self.io,
+            total_segments=total_segments,
+            page_size=page_size,
+            max_capacity_per_second=max_capacity_per_second,
+            progress=progress,
+        )
+
 
 class SubscriptionTable(DynamoFender):
     """
@@ -158,6 +451,14 @@ class SubscriptionsAndPlansTable(DynamoFender):
 
     __tablename__ = "fender_digital_code_exercise"
 
-    def __init__(self, tablename: str = None) -> None:
+    def __init__(self, tablename: str = None, cache: ItemCache | None = None) -> None:
         _tablename = tablename or self.__tablename__
-        super().__init__(_tablename)
+        if cache is None and Config.ITEM_CACHE_ENABLED:
+            cache = ItemCache(
+                max_size=Config.ITEM_CACHE_MAX_SIZE,
+                prefix_ttls={
+                    "plan:": Config.ITEM_CACHE_PLAN_TTL,
+                    "user:": Config.ITEM_CACHE_USER_TTL,
+                },
+            )
+        super().__init__(_tablename, cache=cache)
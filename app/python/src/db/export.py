@@ -0,0 +1,164 @@
+import argparse
+import gzip
+import json
+import sys
+import time
+from typing import Iterable
+
+try:
+    # For local development
+    from .dynamo import DynamoFender
+    from .scan import ScanProgress
+    from .tables import DynamoFenderTables
+except ImportError:
+    # For AWS Lambda deployment
+    from db.dynamo import DynamoFender
+    from db.scan import ScanProgress
+    from db.tables import DynamoFenderTables
+
+FORMATS = ("ndjson", "json-chunks")
+# Items per line of the chunked JSON format
+JSON_CHUNK_SIZE = 10_000
+
+
+def write_ndjson(items: Iterable[dict], path: str) -> int:
+    """
+    Write items to a gzipped NDJSON file, one item per line, as they arrive.
+    Returns the number of items written.
+    """
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as output:
+        for item in items:
+            output.write(encode(item))
+            output.write("\n")
+            count += 1
+    return count
+
+
+def _json_chunk(rows: list[dict]) -> dict:
+    names = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    return {
+        "count": len(rows),
+        "columns": {name: [row.get(name) for row in rows] for name in names},
+    }
+
+
+def write_json_chunks(
+    items: Iterable[dict], path: str, chunk_size: int = JSON_CHUNK_SIZE
+) -> int:
+    """
+    Write items to a gzipped file of JSON chunks: every line holds up to
+    `chunk_size` items as `{"count": n, "columns": {name: [values]}}`, with
+    null where an item lacks the attribute. It is still JSON, only laid out
+    by attribute within each chunk, not a columnar format like Parquet. Only
+    one chunk is held in memory. Returns the number of items written.
+    """
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    count = 0
+    rows = []
+    with gzip.open(path, "wt", encoding="utf-8") as output:
+        for item in items:
+            rows.append(item)
+            if len(rows) == chunk_size:
+                output.write(encode(_json_chunk(rows)))
+                output.write("\n")
+                count += len(rows)
+                rows = []
+        if rows:
+            output.write(encode(_json_chunk(rows)))
+            output.write("\n")
+            count += len(rows)
+    return count
+
+
+def read_json_chunks(path: str) -> Iterable[dict]:
+    """
+    Read back a file written by `write_json_chunks`, item by item. Attributes
+    that were null are left out, as they were missing from the item.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as source:
+        for line in source:
+            chunk = json.loads(line)
+            columns = chunk["columns"]
+            for index in range(chunk["count"]):
+                yield {
+                    name: values[index]
+                    for name, values in columns.items()
+                    if values[index] is not None
+                }
+
+
+def export_table(
+    table: DynamoFender,
+    path: str,
+    output_format: str = "ndjson",
+    total_segments: int = 4,
+    page_size: int | None = None,
+    max_capacity_per_second: float | None = None,
+    progress_interval: float = 5.0,
+) -> int:
+    """
+    Scan a whole table in parallel straight into a file and return the
+    number of items written. Progress is reported on stderr at most every
+    `progress_interval` seconds.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown export format `{output_format}`")
+
+    last_report = time.perf_counter()
+    final = None
+
+    def report(progress: ScanProgress) -> None:
+        nonlocal last_report, final
+        final = progress
+        if time.perf_counter() - last_report >= progress_interval:
+            last_report = time.perf_counter()
+            print(f"export: {progress}", file=sys.stderr)
+
+    items = table.scan_parallel(
+        total_segments=total_segments,
+        page_size=page_size,
+        max_capacity_per_second=max_capacity_per_second,
+        progress=report,
+    )
+    if output_format == "ndjson":
+        count = write_ndjson(items, path)
+    else:
+        count = write_json_chunks(items, path)
+
+    # No progress is reported when the scan yields no page at all
+    print(f"export: done, {final or f'{count} items'}", file=sys.stderr)
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Export the subscriptions table to a gzipped file."
+    )
+    parser.add_argument("path", help="output file, e.g. export.ndjson.gz")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument(
+        "--max-rcu",
+        type=float,
+        default=None,
+        help="read capacity units per second to stay under",
+    )
+    args = parser.parse_args(argv)
+
+    export_table(
+        DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS,
+        args.path,
+        output_format=args.format,
+        total_segments=args.segments,
+        page_size=args.page_size,
+        max_capacity_per_second=args.max_rcu,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+# Evaluates the subset of DynamoDB expression syntax DynamoFender emits, for
+# the in-memory backend. Expressions are parsed once into tuples and cached;
+# `#name` and `:value` placeholders are resolved on every evaluation.
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<name>#\w+)|(?P<value>:\w+)|(?P<symbol><>|<=|>=|[=<>(),+\-.])"
+    r"|(?P<word>[A-Za-z_]\w*))"
+)
+COMPARATORS = {"=", "<>", "<", "<=", ">", ">="}
+CONDITION_FUNCTIONS = {
+    "attribute_exists",
+    "attribute_not_exists",
+    "begins_with",
+    "contains",
+}
+UPDATE_CLAUSES = {"SET", "REMOVE", "ADD"}
+
+# Value of an attribute the item does not have
+MISSING = object()
+
+
+class ExpressionError(ValueError):
+    """
+    Raised for expressions the in-memory backend cannot parse or evaluate,
+    where DynamoDB would answer with a ValidationException.
+    """
+
+
+def tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None:
+            raise ExpressionError(f"Invalid expression near `{expression[position:]}`")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "word" and text.upper() in {"AND", "OR", "NOT", "BETWEEN", "IN"}:
+            kind, text = "keyword", text.upper()
+        tokens.append((kind, text))
+        position = match.end()
+
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> tuple[str | None, str | None]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, text: str | None = None) -> tuple[str, str]:
+        kind, token = self.peek()
+        if kind is None or (text is not None and token != text):
+            raise ExpressionError(
+                f"Expected `{text or 'a token'}` in `{self.expression}`"
+            )
+        self.position += 1
+        return kind, token
+
+    def accept(self, text: str) -> bool:
+        if self.peek()[1] == text:
+            self.position += 1
+            return True
+        return False
+
+    def done(self) -> None:
+        if self.position != len(self.tokens):
+            raise ExpressionError(
+                f"Unexpected `{self.peek()[1]}` in `{self.expression}`"
+            )
+
+    # Conditions
+
+    def condition(self) -> tuple:
+        node = self.conjunction()
+        while self.accept("OR"):
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self) -> tuple:
+        node = self.negation()
+        while self.accept("AND"):
+            node = ("and", node, self.negation())
+        return node
+
+    def negation(self) -> tuple:
+        if self.accept("NOT"):
+            return ("not", self.negation())
+        return self.predicate()
+
+    def predicate(self) -> tuple:
+        if self.accept("("):
+            node = self.condition()
+            self.take(")")
+            return node
+
+        kind, token = self.peek()
+        if kind == "word" and token in CONDITION_FUNCTIONS:
+            self.position += 1
+            self.take("(")
+            arguments = [self.operand()]
+            while self.accept(","):
+                arguments.append(self.operand())
+            self.take(")")
+            return ("call", token, tuple(arguments))
+
+        left = self.operand()
+        if self.accept("BETWEEN"):
+            low = self.operand()
+            self.take("AND")
+            return ("between", left, low, self.operand())
+        if self.accept("IN"):
+            self.take("(")
+            options = [self.operand()]
+            while self.accept(","):
+                options.append(self.operand())
+            self.take(")")
+            return ("in", left, tuple(options))
+
+        _, comparator = self.take()
+        if comparator not in COMPARATORS:
+            raise ExpressionError(
+                f"Unknown comparator `{comparator}` in `{self.expression}`"
+            )
+        return ("compare", comparator, left, self.operand())
+
+    def operand(self) -> tuple:
+        kind, token = self.peek()
+        if kind == "value":
+            self.position += 1
+            return ("value", token)
+        if kind == "word" and token == "size" and self.peek(1)[1] == "(":
+            self.position += 1
+            self.take("(")
+            path = self.path()
+            self.take(")")
+            return ("size", path)
+        return self.path()
+
+    def path(self) -> tuple:
+        segments = [self.segment()]
+        while self.accept("."):
+            segments.append(self.segment())
+        return ("path", tuple(segments))
+
+    def segment(self) -> str:
+        kind, token = self.take()
+        if kind not in ("name", "word"):
+            raise ExpressionError(
+                f"Expected an attribute, got `{token}` in `{self.expression}`"
+            )
+        return token
+
+    # Updates
+
+    def update(self) -> tuple:
+        actions = []
+        while self.peek()[0] is not None:
+            _, clause = self.take()
+            clause = clause.upper()
+            if clause not in UPDATE_CLAUSES:
+                raise ExpressionError(
+                    f"Unsupported update clause `{clause}` in `{self.expression}`"
+                )
+            while True:
+                actions.append(self.action(clause))
+                if not self.accept(","):
+                    break
+        return tuple(actions)
+
+    def action(self, clause: str) -> tuple:
+        path = self.path()
+        if clause == "REMOVE":
+            return ("remove", path)
+        if clause == "ADD":
+            return ("add", path, self.operand())
+        self.take("=")
+        return ("set", path, self.set_value())
+
+    def set_value(self) -> tuple:
+        node = self.set_operand()
+        if (symbol := self.peek()[1]) in ("+", "-"):
+            self.position += 1
+            node = ("arithmetic", symbol, node, self.set_operand())
+        return node
+
+    def set_operand(self) -> tuple:
+        kind, token = self.peek()
+        if kind == "word" and token in ("if_not_exists", "list_append"):
+            self.position += 1
+            self.take("(")
+            first = self.path() if token == "if_not_exists" else self.set_value()
+            self.take(",")
+            second = self.set_value()
+            self.take(")")
+            return (token, first, second)
+        return self.operand()
+
+
+@lru_cache(maxsize=256)
+def parse_condition(expression: str) -> tuple:
+    parser = _Parser(expression)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@lru_cache(maxsize=256)
+def parse_update(expression: str) -> tuple:
+    parser = _Parser(expression)
+    actions = parser.update()
+    parser.done()
+    return actions
+
+
+class Evaluator:
+    """
+    Resolves placeholders and evaluates parsed expressions against an item.
+    """
+
+    def __init__(self, names: dict | None = None, values: dict | None = None) -> None:
+        self.names = names or {}
+        self.values = values or {}
+
+    def attribute(self, segment: str) -> str:
+        if not segment.startswith("#"):
+            return segment
+        try:
+            return self.names[segment]
+        except KeyError:
+            raise ExpressionError(f"Undefined attribute name `{segment}`")
+
+    def resolve(self, node: tuple, item: dict):
+        kind = node[0]
+        if kind == "value":
+            try:
+                return self.values[node[1]]
+            except KeyError:
+                raise ExpressionError(f"Undefined attribute value `{node[1]}`")
+        if kind == "size":
+            value = self.resolve(node[1], item)
+            return MISSING if value is MISSING else len(value)
+
+        value = item
+        for segment in node[1]:
+            if not isinstance(value, dict):
+                return MISSING
+            value = value.get(self.attribute(segment), MISSING)
+        return value
+
+    def test(self, node: tuple, item: dict) -> bool:
+        kind = node[0]
+        if kind == "or":
+            return self.test(node[1], item) or self.test(node[2], item)
+        if kind == "and":
+            return self.test(node[1], item) and self.test(node[2], item)
+        if kind == "not":
+            return not self.test(node[1], item)
+        if kind == "compare":
+            _, comparator, left, right = node
+            return compare(
+                self.resolve(left, item), comparator, self.resolve(right, item)
+            )
+        if kind == "between":
+            value = self.resolve(node[1], item)
+            return compare(value, ">=", self.resolve(node[2], item)) and compare(
+                value, "<=", self.resolve(node[3], item)
+            )
+        if kind == "in":
+            value = self.resolve(node[1], item)
+            return any(
+                compare(value, "=", self.resolve(option, item)) for option in node[2]
+            )
+
+        _, function, arguments = node
+        value = self.resolve(arguments[0], item)
+        if function == "attribute_exists":
+            return value is not MISSING
+        if function == "attribute_not_exists":
+            return value is MISSING
+        operand = self.resolve(arguments[1], item)
+        if value is MISSING or operand is MISSING:
+            return False
+        if function == "begins_with":
+            return isinstance(value, str) and value.startswith(operand)
+        # contains
+        try:
+            return operand in value
+        except TypeError:
+            return False
+
+    def apply(self, actions: tuple, item: dict) -> dict:
+        """
+        Return a copy of `item` with the update actions applied. Every value
+        is computed from the item as it was before the update, as in DynamoDB.
+        """
+        updated = dict(item)
+
+        for action in actions:
+            path = action[1][1]
+            if len(path) != 1:
+                raise ExpressionError("Nested update paths are not supported")
+            attribute = self.attribute(path[0])
+
+            if action[0] == "remove":
+                updated.pop(attribute, None)
+            elif action[0] == "set":
+                updated[attribute] = self.set_value(action[2], item)
+            else:
+                updated[attribute] = self.add(
+                    item.get(attribute, MISSING), self.resolve(action[2], item)
+                )
+
+        return updated
+
+    def set_value(self, node: tuple, item: dict):
+        kind = node[0]
+        if kind == "if_not_exists":
+            value = self.resolve(node[1], item)
+            return self.set_value(node[2], item) if value is MISSING else value
+        if kind == "list_append":
+            return list(self.set_value(node[1], item)) + list(
+                self.set_value(node[2], item)
+            )
+        if kind == "arithmetic":
+            left = self.set_value(node[2], item)
+            right = self.set_value(node[3], item)
+            if not (is_number(left) and is_number(right)):
+                raise ExpressionError("Arithmetic needs two numbers")
+            return left + right if node[1] == "+" else left - right
+
+        value = self.resolve(node, item)
+        if value is MISSING:
+            raise ExpressionError("The update refers to a missing attribute")
+        return value
+
+    @staticmethod
+    def add(current, value):
+        if current is MISSING:
+            return value
+        if is_number(current) and is_number(value):
+            return current + value
+        if isinstance(current, set) and isinstance(value, set):
+            return current | value
+        raise ExpressionError("ADD needs a number or a set")
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def compare(left, comparator: str, right) -> bool:
+    """
+    Compare two attribute values the way DynamoDB does: missing attributes
+    and values of different types never match.
+    """
+    if left is MISSING or right is MISSING:
+        return False
+
+    if is_number(left) and is_number(right):
+        pass
+    elif type(left) is not type(right):
+        return comparator == "<>"
+    elif comparator not in ("=", "<>") and not isinstance(left, (str, bytes)):
+        return False
+
+    if comparator == "=":
+        return left == right
+    if comparator == "<>":
+        return left != right
+    if comparator == "<":
+        return left < right
+    if comparator == "<=":
+        return left <= right
+    if comparator == ">":
+        return left > right
+    return left >= right
@@ -0,0 +1,398 @@
+import random
+import threading
+import time
+from typing import Callable
+
+from botocore.exceptions import ClientError
+from botocore.exceptions import ConnectionError as BotocoreConnectionError
+from botocore.exceptions import HTTPClientError
+
+try:
+    # For local development
+    from ..config import Config
+    from ..utils.concurrency import call_with_timeout
+    from ..utils.deadline import DeadlineExceeded, check_deadline, time_remaining
+    from ..utils.metrics import span
+    from .backends import REQUEST_OPERATIONS, StorageBackend
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.backends import REQUEST_OPERATIONS, StorageBackend
+    from utils.concurrency import call_with_timeout
+    from utils.deadline import DeadlineExceeded, check_deadline, time_remaining
+    from utils.metrics import span
+
+# DynamoDB error codes that mean "slow down"; they also cut the request rate
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "ProvisionedThroughputExceededException",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+    }
+)
+# Server-side errors worth another attempt at the same rate
+TRANSIENT_ERROR_CODES = frozenset({"InternalServerError", "ServiceUnavailable"})
+
+
+class TableUnavailable(Exception):
+    """
+    DynamoDB could not serve a call in time. `retry_after` is a hint, in
+    seconds, for when the caller may try again.
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TableThrottled(TableUnavailable):
+    """
+    A call was still throttled (or failing) once its retry budget ran out.
+    """
+
+
+class CircuitOpen(TableUnavailable):
+    """
+    Recent calls kept failing, so calls are refused without reaching
+    DynamoDB until the circuit's reset timeout has passed.
+    """
+
+
+def error_kind(error: Exception) -> str | None:
+    """
+    `"throttled"`, `"transient"` or None (not worth retrying) for an error
+    raised by a backend call.
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        if code in THROTTLING_ERROR_CODES:
+            return "throttled"
+        if code in TRANSIENT_ERROR_CODES:
+            return "transient"
+        return None
+    if isinstance(error, (BotocoreConnectionError, HTTPClientError)):
+        return "transient"
+    return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket over requests to one table whose rate adapts to throttling
+    (additive increase, multiplicative decrease), so a throttled client
+    backs off as a whole instead of each call retrying on its own.
+
+    Every throttled response halves the rate, down to `min_rate`, and every
+    successful one adds `recovery_per_success` requests per second back. Without a `max_rate`
+    the bucket starts open: the first throttle sets the rate to half the
+    send rate measured over the last second, and the bucket opens again
+    once the rate has recovered to that send rate.
+
+    `acquire` waits for a token only up to `max_wait` seconds; a caller
+    that would have to wait longer is refused at once.
+    """
+
+    def __init__(
+        self,
+        max_rate: float | None = None,
+        min_rate: float = 10.0,
+        recovery_per_success: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.recovery_per_success = recovery_per_success
+        # None while the bucket is open
+        self.rate = max_rate
+        self._ceiling = max_rate
+        self._clock = clock
+        self._sleep = sleep
+        # Bursts of up to one second's worth of requests
+        self._available = max_rate or 0.0
+        self._updated = clock()
+        # Requests sent in the current and the previous one-second window
+        self._window_started = self._updated
+        self._sent = 0
+        self._sent_before = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._available = min(
+            self.rate, self._available + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _count(self, now: float) -> None:
+        elapsed = now - self._window_started
+        if elapsed >= 1:
+            self._sent_before = self._sent if elapsed < 2 else 0
+            self._sent = 0
+            self._window_started = now
+        self._sent += 1
+
+    def acquire(self, max_wait: float) -> bool:
+        """
+        Take one token, sleeping for it if needed. Returns False, without
+        taking it, when that would mean waiting more than `max_wait`.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.rate is None:
+                self._count(now)
+                return True
+            self._refill(now)
+            delay = (1 - self._available) / self.rate
+            if delay > max_wait:
+                return False
+            # Reserve the token now, so concurrent callers queue behind it
+            self._available -= 1
+            self._count(now)
+        if delay > 0:
+            with span("resilience.rate_limited"):
+                self._sleep(delay)
+        return True
+
+    def throttled(self) -> None:
+        with self._lock:
+            now = self._clock()
+            if self.rate is None:
+                self._ceiling = max(self.min_rate, self._sent, self._sent_before)
+                self.rate = self._ceiling
+                self._available = 0.0
+                self._updated = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._available = min(self._available, self.rate)
+
+    def succeeded(self) -> None:
+        if self.rate is None or self.rate >= self._ceiling:
+            return
+        with self._lock:
+            if self.rate is None:
+                return
+            self.rate = min(self._ceiling, self.rate + self.recovery_per_success)
+            if self.rate >= self._ceiling and self.max_rate is None:
+                self.rate = None
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive throttled or failed
+    attempts, so that while the table is unhealthy calls fail at once
+    instead of each spending its whole retry budget. Once `reset_timeout`
+    seconds have passed one trial call is let through (half-open): its
+    success closes the circuit and its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Raise `CircuitOpen` unless a call may go through now.
+        """
+        if self.state == self.CLOSED:
+            return
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - self._clock()
+                if remaining > 0:
+                    raise CircuitOpen("DynamoDB is unavailable", retry_after=remaining)
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpen(
+                        "DynamoDB is unavailable", retry_after=self.reset_timeout
+                    )
+                self._trial_running = True
+
+    def cancelled(self) -> None:
+        """
+        The call let through by `before_call` was never made (e.g. the rate
+        limiter refused it), so a half-open circuit waits for another trial.
+        """
+        if self.state != self.HALF_OPEN:
+            return
+        with self._lock:
+            self._trial_running = False
+
+    def succeeded(self) -> None:
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._trial_running = False
+
+    def failed(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+
+class TableGuard:
+    """
+    Resilience policy around every request to one table.
+
+    Each call first passes the circuit breaker and takes a token from the
+    adaptive rate limiter. Throttled and transient failures are retried
+    with exponential backoff and full jitter, within `max_attempts` and
+    `retry_budget` seconds of the first attempt, so a call's duration under
+    throttling stays bounded. A call that still fails raises
+    `TableThrottled`. Any other error means DynamoDB answered, so it counts
+    as a healthy response and is raised as it is.
+
+    Calls made while serving a request (see `utils.deadline`) also stay
+    within the request's remaining time: no attempt starts, and no backoff
+    sleeps, past the deadline. An attempt made with less time left than the
+    client's own connect and read timeouts (`call_timeout`) is abandoned
+    once the deadline passes. Either way `DeadlineExceeded` is raised. The
+    abandoned request is not cancelled: botocore sets timeouts per client,
+    not per call, so a write may still be applied after the request was
+    answered with a 503. Webhook writes are conditional on the event's
+    `lastModifiedMs`, so the provider's retry of the event is harmless.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = Config.DYNAMODB_RETRY_MAX_ATTEMPTS,
+        base_delay: float = Config.DYNAMODB_RETRY_BASE_DELAY,
+        max_delay: float = Config.DYNAMODB_RETRY_MAX_DELAY,
+        retry_budget: float = Config.DYNAMODB_RETRY_BUDGET,
+        call_timeout: float = (
+            Config.DYNAMODB_CONNECT_TIMEOUT + Config.DYNAMODB_READ_TIMEOUT
+        ),
+        limiter: AdaptiveRateLimiter | None = None,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.call_timeout = call_timeout
+        self.limiter = limiter
+        self.breaker = breaker
+        self._sleep = sleep
+        self._clock = clock
+
+    @classmethod
+    def from_config(cls) -> "TableGuard":
+        return cls(
+            limiter=AdaptiveRateLimiter(
+                Config.DYNAMODB_MAX_REQUESTS_PER_SECOND or None
+            ),
+            breaker=CircuitBreaker(
+                Config.DYNAMODB_CIRCUIT_FAILURE_THRESHOLD,
+                Config.DYNAMODB_CIRCUIT_RESET_TIMEOUT,
+            ),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _attempt(self, operation: Callable, args: tuple, kwargs: dict):
+        request_left = time_remaining()
+        if request_left is None or request_left >= self.call_timeout:
+            return operation(*args, **kwargs)
+        try:
+            return call_with_timeout(lambda: operation(*args, **kwargs), request_left)
+        except TimeoutError as error:
+            raise DeadlineExceeded(
+                "Request deadline exceeded waiting for DynamoDB"
+            ) from error
+
+    def call(self, operation: Callable, *args, **kwargs):
+        retry_deadline = self._clock() + self.retry_budget
+        for attempt in range(self.max_attempts):
+            check_deadline()
+            if self.breaker is not None:
+                self.breaker.before_call()
+            remaining = retry_deadline - self._clock()
+            if (request_left := time_remaining()) is not None:
+                remaining = min(remaining, request_left)
+            if self.limiter is not None and not self.limiter.acquire(remaining):
+                if self.breaker is not None:
+                    self.breaker.cancelled()
+                raise TableThrottled(
+                    "DynamoDB request rate limit reached", retry_after=1.0
+                )
+
+            try:
+                result = self._attempt(operation, args, kwargs)
+            except DeadlineExceeded:
+                # No answer in time; it also ends a half-open trial call
+                if self.breaker is not None:
+                    self.breaker.failed()
+                raise
+            except Exception as error:
+                if (kind := error_kind(error)) is None:
+                    self._succeeded()
+                    raise
+                if self.breaker is not None:
+                    self.breaker.failed()
+                if kind == "throttled" and self.limiter is not None:
+                    self.limiter.throttled()
+
+                delay = self._backoff(attempt)
+                last_attempt = attempt == self.max_attempts - 1
+                if last_attempt or self._clock() + delay > retry_deadline:
+                    raise TableThrottled(
+                        f"DynamoDB is {kind}: {error}",
+                        retry_after=self.max_delay,
+                    ) from error
+                if (request_left := time_remaining()) is not None:
+                    if delay >= request_left:
+                        raise DeadlineExceeded(
+                            f"Request deadline exceeded retrying DynamoDB: {error}"
+                        ) from error
+                with span("resilience.backoff"):
+                    self._sleep(delay)
+                continue
+
+            self._succeeded()
+            return result
+
+    def _succeeded(self) -> None:
+        if self.breaker is not None:
+            self.breaker.succeeded()
+        if self.limiter is not None:
+            self.limiter.succeeded()
+
+
+class GuardedBackend:
+    """
+    A `StorageBackend` whose requests all go through a `TableGuard`; other
+    attributes are the wrapped backend's own.
+    """
+
+    def __init__(self, backend: StorageBackend, guard: TableGuard) -> None:
+        self.backend = backend
+        self.guard = guard
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.backend, name)
+        if name not in REQUEST_OPERATIONS:
+            return attribute
+        return lambda *args, **kwargs: self.guard.call(attribute, *args, **kwargs)
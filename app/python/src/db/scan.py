@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+try:
+    # For local development
+    from .backends import StorageBackend
+except ImportError:
+    # For AWS Lambda deployment
+    from db.backends import StorageBackend
+
+# Pages each segment may read ahead of the consumer; bounds memory use
+PAGES_BUFFERED_PER_SEGMENT = 2
+_DONE = object()
+
+
+class CapacityLimiter:
+    """
+    Token bucket over read capacity units shared by all scan segments. A
+    page's cost is only known once it is read, so segments wait while the
+    bucket is in debt and pay for each page afterwards; the average rate
+    stays at `units_per_second`, with bursts of up to one second's worth.
+    """
+
+    def __init__(
+        self,
+        units_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.units_per_second = units_per_second
+        self._clock = clock
+        self._sleep = sleep
+        self._available = units_per_second
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._available = min(
+            self.units_per_second,
+            self._available + (now - self._updated) * self.units_per_second,
+        )
+        self._updated = now
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._available >= 0:
+                    return
+                delay = -self._available / self.units_per_second
+            self._sleep(delay)
+
+    def consume(self, units: float) -> None:
+        with self._lock:
+            self._refill()
+            self._available -= units
+
+
+class ScanProgress:
+    """
+    Running totals of a scan, handed to the progress callback after every
+    page.
+    """
+
+    def __init__(self, total_segments: int) -> None:
+        self.total_segments = total_segments
+        self.segments_done = 0
+        self.items = 0
+        self.pages = 0
+        self.capacity = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def items_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.items / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.items} items in {self.pages} pages, "
+            f"{self.segments_done}/{self.total_segments} segments, "
+            f"{self.capacity:.1f} RCU, {self.elapsed:.1f}s "
+            f"({self.items_per_second:.0f} items/s)"
+        )
+
+
+def _put(pages: queue.Queue, entry, stop: threading.Event) -> None:
+    # Give up once the consumer is gone instead of blocking forever
+    while not stop.is_set():
+        try:
+            pages.put(entry, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def parallel_scan(
+    backend: StorageBackend,
+    total_segments: int = 4,
+    page_size: int | None = None,
+    max_capacity_per_second: float | None = None,
+    progress: Callable[[ScanProgress], None] | None = None,
+) -> Iterator[dict]:
+    """
+    Yield every item of the table, scanning `total_segments` segments at once
+    on a dedicated pool. Each segment follows its own continuation keys and
+    hands whole pages to the caller's thread through a bounded queue, so at
+    most a few pages per segment are held in memory whatever the table size.
+    Items of different segments are interleaved in no particular order.
+
+    Closing the generator early stops the segments after their current page.
+    """
+    limiter = None
+    if max_capacity_per_second:
+        limiter = CapacityLimiter(max_capacity_per_second)
+    pages = queue.Queue(maxsize=total_segments * PAGES_BUFFERED_PER_SEGMENT)
+    stop = threading.Event()
+
+    def scan_segment(segment: int) -> None:
+        try:
+            start_key = None
+            while not stop.is_set():
+                if limiter is not None:
+                    limiter.wait()
+                items, start_key, capacity = backend.scan(
+                    segment, total_segments, limit=page_size, start_key=start_key
+                )
+                if limiter is not None:
+                    limiter.consume(capacity)
+                _put(pages, (items, capacity), stop)
+                if start_key is None:
+                    break
+        except Exception as error:
+            _put(pages, error, stop)
+        finally:
+            _put(pages, _DONE, stop)
+
+    stats = ScanProgress(total_segments)
+    executor = ThreadPoolExecutor(
+        max_workers=total_segments, thread_name_prefix="fender-scan"
+    )
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        while stats.segments_done < total_segments:
+            entry = pages.get()
+            if isinstance(entry, Exception):
+                raise entry
+
+            items = ()
+            if entry is _DONE:
+                stats.segments_done += 1
+            else:
+                items, capacity = entry
+                stats.items += len(items)
+                stats.pages += 1
+                stats.capacity += capacity
+            if progress is not None:
+                progress(stats)
+            yield from items
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+# DynamoDB `N` attributes whose Python type is fixed by our models. Any other
+# number becomes an int when it is integral and a float otherwise.
+NUMERIC_ATTRIBUTE_TYPES = {
+    "price": float,
+    "ttl": int,
+    "expiresAtMs": int,
+    "cancelledAtMs": int,
+    "lastModifiedMs": int,
+}
+
+
+def convert_number(name: str | None, value: Decimal | str):
+    """
+    Convert a DynamoDB number (a `Decimal` from boto3 or the raw wire string)
+    into the int or float its attribute is stored as.
+    """
+    if (number_type := NUMERIC_ATTRIBUTE_TYPES.get(name)) is not None:
+        return number_type(value)
+
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            number = float(value)
+            return int(number) if number.is_integer() else number
+
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def convert_dynamo_value(value, name: str | None = None):
+    """
+    Convert one value read through the boto3 resource layer into plain Python
+    in a single walk: Decimals become ints or floats and sets become lists.
+    """
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    if isinstance(value, Decimal):
+        return convert_number(name, value)
+    if isinstance(value, dict):
+        return {key: convert_dynamo_value(item, key) for key, item in value.items()}
+    if isinstance(value, (list, set)):
+        return [convert_dynamo_value(item, name) for item in value]
+    # Binary and anything unexpected keep the previous behaviour
+    return str(value)
+
+
+def convert_dynamo_items(items: list[dict]) -> list[dict]:
+    return [convert_dynamo_value(item) for item in items]
+
+
+def deserialize_attribute(value: dict, name: str | None = None):
+    """
+    Deserialize one attribute in DynamoDB wire format (`{"S": "..."}`), as the
+    low-level client returns it, straight into plain Python. Unlike boto3's
+    `TypeDeserializer` it never builds intermediate `Decimal`s.
+    """
+    (kind, data), *_ = value.items()
+
+    if kind == "S" or kind == "BOOL":
+        return data
+    if kind == "N":
+        return convert_number(name, data)
+    if kind == "M":
+        return {key: deserialize_attribute(item, key) for key, item in data.items()}
+    if kind == "L":
+        return [deserialize_attribute(item, name) for item in data]
+    if kind == "NULL":
+        return None
+    if kind == "SS":
+        return list(data)
+    if kind == "NS":
+        return [convert_number(name, item) for item in data]
+    # `B` and `BS` keep the previous behaviour of coercing to strings
+    if kind == "BS":
+        return [str(item) for item in data]
+    return str(data)
+
+
+def deserialize_item(item: dict) -> dict:
+    return {name: deserialize_attribute(value, name) for name, value in item.items()}
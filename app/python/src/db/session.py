@@ -0,0 +1,125 @@
+import threading
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+try:
+    # For local development
+    from ..config import IS_DEVELOPMENT, Config
+except ImportError:
+    # For AWS Lambda deployment
+    from config import IS_DEVELOPMENT, Config
+
+
+class DynamoSession:
+    """
+    Process-wide boto3 session shared by every DynamoFender table.
+
+    Nothing is built at import time. The session, the DynamoDB resource and
+    the low-level client are created on first use and then reused across warm
+    Lambda invocations. Every table shares the resource's keep-alive
+    connections, and every wire-format call shares the client's: two pools per
+    process, one per access path, never one per table.
+    """
+
+    _lock = threading.Lock()
+    _config = None
+    _session = None
+    _resource = None
+    _client = None
+
+    @classmethod
+    def _session_params(cls) -> dict:
+        if IS_DEVELOPMENT:
+            return {
+                "aws_access_key_id": Config.AWS_ACCESS_KEY_ID,
+                "aws_secret_access_key": Config.AWS_SECRET_ACCESS_KEY,
+                "region_name": Config.AWS_REGION_NAME,
+            }
+        return {}
+
+    @classmethod
+    def _client_config(cls) -> BotoConfig:
+        """
+        The one botocore config both DynamoDB clients are built with.
+        """
+        if cls._config is None:
+            cls._config = cls._build_client_config()
+        return cls._config
+
+    @classmethod
+    def _build_client_config(cls) -> BotoConfig:
+        return BotoConfig(
+            max_pool_connections=Config.DYNAMODB_MAX_POOL_CONNECTIONS,
+            connect_timeout=Config.DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=Config.DYNAMODB_READ_TIMEOUT,
+            tcp_keepalive=True,
+            # `db.resilience` retries on its own; botocore retrying as well
+            # would multiply the attempts
+            retries=(
+                {"mode": "standard", "total_max_attempts": 1}
+                if Config.DYNAMODB_RESILIENCE_ENABLED
+                else {"mode": "standard"}
+            ),
+        )
+
+    @classmethod
+    def session(cls) -> boto3.session.Session:
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    cls._session = boto3.session.Session(**cls._session_params())
+        return cls._session
+
+    @classmethod
+    def resource(cls):
+        """
+        Shared DynamoDB service resource.
+        """
+        if cls._resource is None:
+            session = cls.session()
+            with cls._lock:
+                if cls._resource is None:
+                    cls._resource = session.resource(
+                        "dynamodb",
+                        endpoint_url=Config.DYNAMODB_ENDPOINT_URL,
+                        config=cls._client_config(),
+                    )
+        return cls._resource
+
+    @classmethod
+    def client(cls):
+        """
+        Low-level DynamoDB client, without the resource layer's type
+        transformations (it takes and returns DynamoDB wire format).
+
+        It is a separate client because the resource registers its
+        (de)serializers on its own client. It is built from the same session
+        and botocore config as the resource, so it keeps its own pool of the
+        same size: the process holds one pool per access path, not per table.
+        """
+        if cls._client is None:
+            session = cls.session()
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = session.client(
+                        "dynamodb",
+                        endpoint_url=Config.DYNAMODB_ENDPOINT_URL,
+                        config=cls._client_config(),
+                    )
+        return cls._client
+
+    @classmethod
+    def table(cls, tablename: str):
+        return cls.resource().Table(tablename)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Drop the cached session and clients (used by tests and benchmarks).
+        """
+        with cls._lock:
+            cls._config = None
+            cls._session = None
+            cls._resource = None
+            cls._client = None
@@ -1,7 +1,7 @@
 try:
     # For local development
     from .dynamo import PlanTable, SubscriptionsAndPlansTable, SubscriptionTable
-except:
+except ImportError:
     # For AWS Lambda deployment
     from dynamo import PlanTable, SubscriptionsAndPlansTable, SubscriptionTable
 
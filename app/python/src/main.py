@@ -1,15 +1,38 @@
 try:
     # For local development
+    from .models.models import QueueBatchAdapter
     from .routes import Router
-    from .schemas.schemas import EventSchema
-except:
+    from .schemas.schemas import EVENT_ADAPTER, QUEUE_EVENT_ADAPTER
+    from .utils.deadline import request_deadline
+    from .utils.metrics import invocation, span
+except ImportError:
     # For AWS Lambda deployment
+    from models.models import QueueBatchAdapter
     from routes import Router
-    from schemas.schemas import EventSchema
+    from schemas.schemas import EVENT_ADAPTER, QUEUE_EVENT_ADAPTER
+    from utils.deadline import request_deadline
+    from utils.metrics import invocation, span
 
 
 def handler(event, context):
-    event = EventSchema(**event)
-    router = Router(event=event)
+    with invocation("handler"):
+        with span("parse"):
+            event = EVENT_ADAPTER.validate_python(event)
+            router = Router(event, context)
 
-    return router.process_event()
+        with span("route"):
+            return router.process_event()
+
+
+def queue_handler(event, context):
+    """
+    Entry point for queue-driven webhooks (`main.queue_handler`). Returns the
+    partial batch response, so only failed messages are redelivered; that
+    includes the messages left when the invocation runs out of time.
+    """
+    with invocation("queue_handler"):
+        with span("parse"):
+            event = QUEUE_EVENT_ADAPTER.validate_python(event)
+
+        with span("route"), request_deadline(context):
+            return QueueBatchAdapter(event.Records).process()
@@ -0,0 +1,176 @@
+from datetime import datetime, timezone
+from typing import Iterable
+
+try:
+    # Analytics run offline and are not part of the Lambda package
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    # For local development
+    from ..utils.utils import parse_iso8601
+    from .models import BillingCycle, SubscriptionStatus
+except ImportError:
+    # For AWS Lambda deployment
+    from models.models import BillingCycle, SubscriptionStatus
+    from utils.utils import parse_iso8601
+
+# Status codes of `SubscriptionAnalytics.statuses`; subscriptions that have
+# not started yet at the given instant are `NOT_STARTED`
+NOT_STARTED = -1
+STATUSES = (
+    SubscriptionStatus.ACTIVE,
+    SubscriptionStatus.PENDING,
+    SubscriptionStatus.CANCELLED,
+)
+ACTIVE, PENDING, CANCELLED = range(len(STATUSES))
+
+MONTHS_PER_CYCLE = {BillingCycle.MONTHLY: 1, BillingCycle.YEARLY: 12}
+
+
+def _datetimes(items: list[dict], name: str) -> "np.ndarray":
+    """
+    A date attribute of every item as `datetime64[s]`, with NaT where it is
+    missing. Items written with the `<name>Ms` epoch shadow are read from
+    the integers; otherwise the UTC ISO 8601 strings are parsed (numpy
+    parses naive timestamps, so the `Z` goes).
+    """
+    shadow = f"{name}Ms"
+    if all(shadow in item or not item.get(name) for item in items):
+        # NaT is stored as the smallest int64
+        nat = np.iinfo(np.int64).min
+        millis = np.fromiter(
+            (nat if (value := item.get(shadow)) is None else value for item in items),
+            dtype=np.int64,
+            count=len(items),
+        )
+        return millis.view("datetime64[ms]").astype("datetime64[s]")
+
+    return np.array(
+        [
+            value.removesuffix("Z") if (value := item.get(name)) else "NaT"
+            for item in items
+        ],
+        dtype="datetime64[s]",
+    )
+
+
+def _instant(value: "datetime | str") -> "np.datetime64":
+    if isinstance(value, str):
+        value = parse_iso8601(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "s")
+
+
+class SubscriptionAnalytics:
+    """
+    Subscription and plan items loaded into columns, so statuses and revenue
+    are computed for every subscription at once instead of per item through
+    `SubscriptionModel.compute_status`.
+
+    Plan SKUs are categorical: `plan_codes` indexes `plan_skus`, and the plan
+    columns (`monthly_prices`, `currencies`) are aligned with `plan_skus`.
+    Subscriptions whose plan is not among the items get a NaN price.
+    """
+
+    def __init__(self, items: Iterable[dict]) -> None:
+        if np is None:
+            raise ImportError("Subscription analytics need numpy installed")
+
+        plans = {}
+        subscriptions = []
+        for item in items:
+            if item.get("type") == "plan":
+                plans[item["pk"]] = item
+            elif item.get("type") == "sub":
+                subscriptions.append(item)
+
+        codes = {}
+        self.plan_codes = np.fromiter(
+            (codes.setdefault(item["planSku"], len(codes)) for item in subscriptions),
+            dtype=np.int32,
+            count=len(subscriptions),
+        )
+        self.plan_skus = list(codes)
+
+        self.start_dates = _datetimes(subscriptions, "startDate")
+        self.expires_at = _datetimes(subscriptions, "expiresAt")
+        self.cancelled_at = _datetimes(subscriptions, "cancelledAt")
+
+        self.monthly_prices = np.full(len(self.plan_skus), np.nan)
+        self.currencies = [None] * len(self.plan_skus)
+        for sku, code in codes.items():
+            if (plan := plans.get(sku)) is None:
+                continue
+            months = MONTHS_PER_CYCLE[plan["billingCycle"]]
+            self.monthly_prices[code] = float(plan["price"]) / months
+            self.currencies[code] = plan["currency"]
+
+    def __len__(self) -> int:
+        return len(self.plan_codes)
+
+    def statuses(self, as_of: "datetime | str") -> "np.ndarray":
+        """
+        Status code of every subscription at `as_of`: active until it is
+        cancelled, pending from the cancellation until it expires and
+        cancelled afterwards.
+        """
+        instant = _instant(as_of)
+        # Comparisons with NaT are False, so uncancelled rows stay active
+        cancelled = self.cancelled_at <= instant
+        statuses = np.where(
+            cancelled,
+            np.where(self.expires_at <= instant, CANCELLED, PENDING),
+            ACTIVE,
+        ).astype(np.int8)
+        statuses[self.start_dates > instant] = NOT_STARTED
+        return statuses
+
+    def status_counts(self, as_of: "datetime | str") -> dict[str, int]:
+        counts = np.bincount(self.statuses(as_of) + 1, minlength=len(STATUSES) + 1)
+        return {
+            str(status): int(counts[code + 1]) for code, status in enumerate(STATUSES)
+        }
+
+    def mrr_by_plan(self, as_of: "datetime | str") -> dict[str, dict]:
+        """
+        Monthly recurring revenue per plan at `as_of`. Pending subscriptions
+        are paid up until they expire, so they still count.
+        """
+        statuses = self.statuses(as_of)
+        paying = (statuses == ACTIVE) | (statuses == PENDING)
+        codes = self.plan_codes[paying]
+
+        subscriptions = np.bincount(codes, minlength=len(self.plan_skus))
+        revenue = subscriptions * self.monthly_prices
+
+        return {
+            sku: {
+                "currency": self.currencies[code],
+                "subscriptions": int(subscriptions[code]),
+                "mrr": round(float(revenue[code]), 2),
+            }
+            for code, sku in enumerate(self.plan_skus)
+            if subscriptions[code] and self.currencies[code] is not None
+        }
+
+    def churn(self, start: "datetime | str", end: "datetime | str") -> dict:
+        """
+        Subscriptions paying at `start` whose cancellation took effect by
+        `end`, and their share of all subscriptions paying at `start`.
+        """
+        before = self.statuses(start)
+        after = self.statuses(end)
+
+        paying = (before == ACTIVE) | (before == PENDING)
+        churned = paying & (after == CANCELLED)
+        paying_count = int(paying.sum())
+        churned_count = int(churned.sum())
+
+        return {
+            "subscriptions": paying_count,
+            "churned": churned_count,
+            "rate": churned_count / paying_count if paying_count else 0.0,
+        }
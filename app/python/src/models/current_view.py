@@ -0,0 +1,154 @@
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+try:
+    # For local development
+    from ..db.tables import DynamoFenderTables
+    from .models import CurrentSubscriptionView, PlanRecord
+except ImportError:
+    # For AWS Lambda deployment
+    from db.tables import DynamoFenderTables
+    from models.models import CurrentSubscriptionView, PlanRecord
+
+
+class RebuildReport:
+    """
+    Totals of a view rebuild. `unchanged` views were already as new as the
+    table (or a webhook refreshed them meanwhile); `orphaned` users have a
+    subscription whose plan is missing, so they get no view.
+    """
+
+    def __init__(self) -> None:
+        self.scanned = 0
+        self.users = 0
+        self.written = 0
+        self.unchanged = 0
+        self.orphaned = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def __str__(self) -> str:
+        return (
+            f"{self.users} users in {self.scanned} items: {self.written} views "
+            f"written, {self.unchanged} unchanged, {self.orphaned} without plan, "
+            f"{self.elapsed:.1f}s"
+        )
+
+
+def current_subscriptions(items, report: RebuildReport) -> tuple[dict, dict]:
+    """
+    Every user's current subscription (the latest started, as the view
+    picks it) and every plan, keyed by `pk`, from a stream of table items.
+    """
+    subscriptions = {}
+    plans = {}
+    for item in items:
+        report.scanned += 1
+        if item.get("type") == "plan":
+            plans[item["pk"]] = item
+        elif item.get("type") == "sub":
+            current = subscriptions.get(item["pk"])
+            if current is None or current["startDate"] < item["startDate"]:
+                subscriptions[item["pk"]] = item
+    return subscriptions, plans
+
+
+def rebuild_current_views(
+    total_segments: int = 4,
+    workers: int = 8,
+    max_capacity_per_second: float | None = None,
+    progress: Callable[[RebuildReport], None] | None = None,
+) -> RebuildReport:
+    """
+    Regenerate the current subscription view of every user from a parallel
+    scan of the subscriptions table. Views are written with the same
+    condition as the webhook path, so a rebuild running next to live traffic
+    never replaces a newer view; views of the same subscription state get a
+    fresh plan snapshot.
+    """
+    report = RebuildReport()
+    subscriptions, plans = current_subscriptions(
+        DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.scan_parallel(
+            total_segments=total_segments,
+            max_capacity_per_second=max_capacity_per_second,
+        ),
+        report,
+    )
+    report.users = len(subscriptions)
+
+    plan_records = {}
+    pending = deque()
+
+    def collect(future) -> None:
+        if future.result():
+            report.written += 1
+        else:
+            report.unchanged += 1
+        if progress is not None:
+            progress(report)
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="fender-views"
+    ) as executor:
+        for subscription in subscriptions.values():
+            sku = subscription["planSku"]
+            if sku not in plans:
+                report.orphaned += 1
+                continue
+            if sku not in plan_records:
+                plan_records[sku] = PlanRecord.from_item(plans[sku])
+
+            pending.append(
+                executor.submit(
+                    CurrentSubscriptionView.write, subscription, plan_records[sku]
+                )
+            )
+            if len(pending) >= workers * 2:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the `user:<id> / current` subscription views."
+    )
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--max-rcu",
+        type=float,
+        default=None,
+        help="read capacity units per second to stay under while scanning",
+    )
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    last_report = time.perf_counter()
+
+    def progress(report: RebuildReport) -> None:
+        nonlocal last_report
+        if time.perf_counter() - last_report >= args.progress_interval:
+            last_report = time.perf_counter()
+            print(f"views: {report}", file=sys.stderr)
+
+    report = rebuild_current_views(
+        total_segments=args.segments,
+        workers=args.workers,
+        max_capacity_per_second=args.max_rcu,
+        progress=progress,
+    )
+    print(f"views: done, {report}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    # For local development
+    from ..config import Config
+    from ..db.dynamo import DynamoFender
+    from ..db.tables import DynamoFenderTables
+    from ..utils.deadline import using_margin
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.dynamo import DynamoFender
+    from db.tables import DynamoFenderTables
+    from utils.deadline import using_margin
+
+
+class RecentEvents:
+    """
+    Bounded set of event IDs seen by this process, oldest dropped first.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            return event_id in self._events
+
+    def add(self, event_id: str) -> None:
+        with self._lock:
+            self._events[event_id] = None
+            self._events.move_to_end(event_id)
+            while len(self._events) > self.max_size:
+                self._events.popitem(last=False)
+
+    def discard(self, event_id: str) -> None:
+        with self._lock:
+            self._events.pop(event_id, None)
+
+
+class EventIdempotency:
+    """
+    Claims webhook `eventId`s so retried deliveries are only applied once.
+
+    A claim is checked against the in-memory `RecentEvents` first and then
+    against a conditional put of an `event:<eventId>` dedup record, which
+    carries a `ttl` attribute so DynamoDB expires it. Each claim writes its
+    own `claimToken`, so a put retried after a lost response recognizes the
+    record its first attempt wrote instead of taking it for a duplicate.
+    """
+
+    DEFAULT_TYPE = "event"
+    DEFAULT_SK = "event"
+    TTL_FIELD = "ttl"
+    TOKEN_FIELD = "claimToken"
+
+    def __init__(
+        self,
+        table: DynamoFender,
+        ttl_seconds: int = Config.IDEMPOTENCY_TTL,
+        recent_events: int = Config.IDEMPOTENCY_RECENT_EVENTS,
+    ) -> None:
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.recent = RecentEvents(recent_events)
+
+    @staticmethod
+    def event_pk(event_id: str) -> str:
+        return f"event:{event_id}"
+
+    def claim(self, event_id: str) -> bool:
+        """
+        Return True if the event is new and now claimed by this caller, False
+        if it is a duplicate.
+        """
+        if event_id in self.recent:
+            return False
+
+        claimed = self.table.put_if_absent(
+            {
+                "pk": self.event_pk(event_id),
+                "sk": self.DEFAULT_SK,
+                "type": self.DEFAULT_TYPE,
+                self.TTL_FIELD: int(time.time()) + self.ttl_seconds,
+                self.TOKEN_FIELD: uuid.uuid4().hex,
+            },
+            token_field=self.TOKEN_FIELD,
+        )
+        # Duplicates are remembered too, so the next retry skips the table
+        self.recent.add(event_id)
+
+        return claimed
+
+    def release(self, event_id: str) -> None:
+        """
+        Drop a claim whose processing failed, so a retry can apply it. This
+        may run into the request's deadline margin: the processing often
+        failed because the deadline passed, and a claim left behind would
+        turn every retry into a duplicate.
+        """
+        self.recent.discard(event_id)
+        with using_margin():
+            self.table.delete(self.event_pk(event_id), self.DEFAULT_SK)
+
+
+EVENT_IDEMPOTENCY = EventIdempotency(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS)
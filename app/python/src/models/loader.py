@@ -0,0 +1,257 @@
+import argparse
+import gzip
+import json
+import random
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+from pydantic import ValidationError
+
+try:
+    # For local development
+    from ..db.backends import BATCH_WRITE_MAX_ITEMS, PK_FIELD, SK_FIELD
+    from ..db.dynamo import DynamoFender
+    from ..db.tables import DynamoFenderTables
+    from ..utils.response import process_pydantic_error
+    from .models import PlanModel, SubscriptionModel
+except ImportError:
+    # For AWS Lambda deployment
+    from db.backends import BATCH_WRITE_MAX_ITEMS, PK_FIELD, SK_FIELD
+    from db.dynamo import DynamoFender
+    from db.tables import DynamoFenderTables
+    from models.models import PlanModel, SubscriptionModel
+    from utils.response import process_pydantic_error
+
+# Item `type` to the model that validates it
+RECORD_MODELS = {"plan": PlanModel, "sub": SubscriptionModel}
+# Invalid records whose errors are kept for the report
+MAX_REPORTED_ERRORS = 20
+_READ_CHUNK_SIZE = 1 << 16
+# Whitespace and the comma between array elements
+_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _read_json_array(source) -> Iterator[dict]:
+    """
+    Yield the elements of a top-level JSON array one by one, decoding the
+    file in chunks instead of loading it whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = source.read(_READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("A JSON seed file must hold an array of items")
+    position = 1
+
+    while True:
+        position = _SEPARATOR.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            value, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = source.read(_READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield value
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """
+    Stream the items of a seed file: a JSON array (`.json`) or one item per
+    line (`.ndjson`, `.jsonl`), optionally gzipped.
+    """
+    with _open(path) as source:
+        if path.removesuffix(".gz").endswith(".json"):
+            yield from _read_json_array(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def validate_record(record: dict) -> dict:
+    """
+    The item to write for a seed record, validated by its model.
+    """
+    if (model := RECORD_MODELS.get(record.get("type"))) is None:
+        raise ValueError(f"Unknown item type `{record.get('type')}`")
+    return model(**record).model_dump(exclude_none=True)
+
+
+class LoadReport:
+    """
+    Totals of a bulk load; `invalid` records were rejected by validation and
+    `failed` ones were still unprocessed after every retry.
+    """
+
+    def __init__(self) -> None:
+        self.read = 0
+        self.written = 0
+        self.invalid = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def items_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.written / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.written} written, {self.invalid} invalid, "
+            f"{self.failed} failed of {self.read} read, {self.retries} retries, "
+            f"{self.elapsed:.1f}s ({self.items_per_second:.0f} items/s)"
+        )
+
+
+class BulkLoader:
+    """
+    Writes validated items through parallel BatchWriteItem workers.
+
+    The reader fills batches of 25 on the caller's thread while up to
+    `workers` requests are in flight, and it blocks once twice that many
+    batches are pending, so memory stays flat however large the file is.
+    Items DynamoDB leaves unprocessed (throttling) are retried with
+    exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        table: DynamoFender,
+        workers: int = 8,
+        max_attempts: int = 8,
+        base_delay: float = 0.05,
+        max_delay: float = 5.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.table = table
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def _write(self, items: list[dict]) -> tuple[int, int]:
+        """
+        Write a batch until DynamoDB takes all of it or the attempts run out.
+        Returns the items left unwritten and the retries made.
+        """
+        for attempt in range(self.max_attempts):
+            if attempt:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                self.sleep(random.uniform(0, delay))
+            items = self.table.write_batch(items)
+            if not items:
+                return 0, attempt
+        return len(items), self.max_attempts - 1
+
+    def _batches(self, records: Iterable[dict], report: LoadReport) -> Iterator[list]:
+        batch = {}
+        for record in records:
+            report.read += 1
+            try:
+                item = validate_record(record)
+            except ValidationError as error:
+                self._reject(report, process_pydantic_error(error))
+                continue
+            except (TypeError, ValueError) as error:
+                self._reject(report, str(error))
+                continue
+
+            # A request may not put the same key twice; the last one wins
+            batch[(item[PK_FIELD], item[SK_FIELD])] = item
+            if len(batch) == BATCH_WRITE_MAX_ITEMS:
+                yield list(batch.values())
+                batch = {}
+        if batch:
+            yield list(batch.values())
+
+    @staticmethod
+    def _reject(report: LoadReport, message: str) -> None:
+        report.invalid += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(f"record {report.read}: {message}")
+
+    def load(
+        self,
+        records: Iterable[dict],
+        progress: Callable[[LoadReport], None] | None = None,
+    ) -> LoadReport:
+        report = LoadReport()
+        pending = deque()
+
+        def collect(size: int, future: Future) -> None:
+            failed, retries = future.result()
+            report.written += size - failed
+            report.failed += failed
+            report.retries += retries
+            if progress is not None:
+                progress(report)
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="fender-load"
+        ) as executor:
+            for batch in self._batches(records, report):
+                pending.append((len(batch), executor.submit(self._write, batch)))
+                if len(pending) >= self.workers * 2:
+                    collect(*pending.popleft())
+            while pending:
+                collect(*pending.popleft())
+
+        return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Seed the subscriptions table from JSON or NDJSON files."
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="seed files (.json, .ndjson or .jsonl, maybe .gz)"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    last_report = time.perf_counter()
+
+    def progress(report: LoadReport) -> None:
+        nonlocal last_report
+        if time.perf_counter() - last_report >= args.progress_interval:
+            last_report = time.perf_counter()
+            print(f"load: {report}", file=sys.stderr)
+
+    def records() -> Iterator[dict]:
+        for path in args.paths:
+            yield from read_records(path)
+
+    loader = BulkLoader(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, args.workers)
+    report = loader.load(records(), progress=progress)
+
+    for error in report.errors:
+        print(f"load: invalid {error}", file=sys.stderr)
+    print(f"load: done, {report}", file=sys.stderr)
+    if report.invalid or report.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
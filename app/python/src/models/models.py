@@ -1,25 +1,62 @@
-import random
+import hashlib
+from dataclasses import dataclass
 from datetime import datetime
 from enum import StrEnum
-from typing import Literal, Optional
+from typing import ClassVar, Literal, Optional
 
-from faker import Faker
-from pydantic import BaseModel
+from botocore.exceptions import ClientError
+from pydantic import BaseModel, ValidationError, model_validator
 
 try:
     # For local development
+    from ..config import Config
+    from ..db.resilience import TableUnavailable
     from ..db.tables import DynamoFenderTables
-    from ..schemas.schemas import SubscriptionEventPayload
-    from ..utils.response import success_response, validation_wrapper
-    from ..utils.utils import parse_iso8601
-except:
+    from ..schemas.schemas import (
+        SUBSCRIPTION_EVENT_ADAPTER,
+        SUBSCRIPTION_LOOKUP_ADAPTER,
+        QueueRecordSchema,
+        SubscriptionEventPayload,
+    )
+    from ..utils.concurrency import run_concurrently, run_in_parallel
+    from ..utils.deadline import DeadlineExceeded
+    from ..utils.encoding import FragmentCache, RawJSON
+    from ..utils.metrics import count
+    from ..utils.response import (
+        compress_response,
+        etag_matches,
+        not_modified_response,
+        process_pydantic_error,
+        success_response,
+        validation_wrapper,
+    )
+    from ..utils.utils import epoch_millis, parse_iso8601
+    from .idempotency import EVENT_IDEMPOTENCY
+except ImportError:
     # For AWS Lambda deployment
+    from config import Config
+    from db.resilience import TableUnavailable
     from db.tables import DynamoFenderTables
-    from schemas.schemas import SubscriptionEventPayload
-    from utils.response import success_response, validation_wrapper
-    from utils.utils import parse_iso8601
-
-fake = Faker("es_MX")
+    from models.idempotency import EVENT_IDEMPOTENCY
+    from schemas.schemas import (
+        SUBSCRIPTION_EVENT_ADAPTER,
+        SUBSCRIPTION_LOOKUP_ADAPTER,
+        QueueRecordSchema,
+        SubscriptionEventPayload,
+    )
+    from utils.concurrency import run_concurrently, run_in_parallel
+    from utils.deadline import DeadlineExceeded
+    from utils.encoding import FragmentCache, RawJSON
+    from utils.metrics import count
+    from utils.response import (
+        compress_response,
+        etag_matches,
+        not_modified_response,
+        process_pydantic_error,
+        success_response,
+        validation_wrapper,
+    )
+    from utils.utils import epoch_millis, parse_iso8601
 
 
 class SubscriptionStatus(StrEnum):
@@ -47,7 +84,42 @@ class SubscriptionAttributes(BaseModel):
     paymentMethod: Optional[str] = None
 
 
-class SubscriptionModel(BaseModel):
+class SubscriptionStatusMixin:
+    """
+    Status rules shared by `SubscriptionModel` and `SubscriptionRecord`,
+    from the epoch-millisecond shadows of their dates.
+    """
+
+    __slots__ = ()
+
+    @property
+    def plan_pk(self) -> str:
+        return f"{self.planSku}"
+
+    def _cancellation_ms(self) -> int:
+        # `parse_cancelled_at` as epoch milliseconds, without parsing
+        if not self.cancelledAt:
+            raise ValueError("cancelledAt is None")
+        return self.expiresAtMs
+
+    @property
+    def is_pending(self) -> bool:
+        return self.lastModifiedMs < self._cancellation_ms()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.lastModifiedMs >= self._cancellation_ms()
+
+    def compute_status(self) -> SubscriptionStatus:
+        if not self.cancelledAt:
+            return SubscriptionStatus.ACTIVE
+        if self.is_pending:
+            return SubscriptionStatus.PENDING
+        if self.is_cancelled:
+            return SubscriptionStatus.CANCELLED
+
+
+class SubscriptionModel(SubscriptionStatusMixin, BaseModel):
     pk: str
     sk: str
     type: str = "sub"
@@ -57,10 +129,21 @@ class SubscriptionModel(BaseModel):
     cancelledAt: str | None = None
     lastModified: str
     attributes: SubscriptionAttributes | None = None
+    # Epoch-millisecond shadows of the dates, so status checks and range
+    # conditions compare integers; filled in for items stored without them
+    expiresAtMs: int | None = None
+    cancelledAtMs: int | None = None
+    lastModifiedMs: int | None = None
 
-    @property
-    def plan_pk(self) -> str:
-        return f"{self.planSku}"
+    @model_validator(mode="after")
+    def shadow_dates(self) -> "SubscriptionModel":
+        if self.expiresAtMs is None:
+            self.expiresAtMs = epoch_millis(self.expiresAt)
+        if self.lastModifiedMs is None:
+            self.lastModifiedMs = epoch_millis(self.lastModified)
+        if self.cancelledAtMs is None and self.cancelledAt:
+            self.cancelledAtMs = epoch_millis(self.cancelledAt)
+        return self
 
     def create(self) -> None:
         DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.write(
@@ -76,24 +159,24 @@ class SubscriptionModel(BaseModel):
             raise ValueError("cancelledAt is None")
         return parse_iso8601(self.expiresAt)
 
-    @property
-    def is_pending(self) -> bool:
-        return self.last_date_modified < self.parse_cancelled_at()
+
+class PlanStatusMixin:
+    """
+    Status checks shared by `PlanModel` and `PlanRecord`.
+    """
+
+    __slots__ = ()
 
     @property
-    def is_cancelled(self) -> bool:
-        return self.last_date_modified >= self.parse_cancelled_at()
+    def is_active(self) -> bool:
+        return self.status == PlanStatus.ACTIVE
 
-    def compute_status(self) -> SubscriptionStatus:
-        if not self.cancelledAt:
-            return SubscriptionStatus.ACTIVE
-        if self.is_pending:
-            return SubscriptionStatus.PENDING
-        if self.is_cancelled:
-            return SubscriptionStatus.CANCELLED
+    @property
+    def is_inactive(self) -> bool:
+        return self.status == PlanStatus.INACTIVE
 
 
-class PlanModel(BaseModel):
+class PlanModel(PlanStatusMixin, BaseModel):
     pk: str
     sk: str
     type: str
@@ -108,108 +191,624 @@ class PlanModel(BaseModel):
     def create(self) -> None:
         DynamoFenderTables.PLAN.write(self.model_dump())
 
-    @property
-    def is_active(self) -> bool:
-        return self.status == PlanStatus.ACTIVE
 
-    @property
-    def is_inactive(self) -> bool:
-        return self.status == PlanStatus.INACTIVE
+# Items read back from our own table were validated by the models above when
+# they were written, so reads build these plain records instead: no
+# validation, and a fraction of a model's memory per item.
+
 
+@dataclass(slots=True)
+class SubscriptionAttributesRecord:
+    provider: str | None = None
+    paymentId: str | None = None
+    customerId: str | None = None
+    autoRenew: bool | None = None
+    paymentMethod: str | None = None
 
-class SubscriptionDetailsSchema:
+
+@dataclass(slots=True)
+class SubscriptionRecord(SubscriptionStatusMixin):
     """
-    Schema to transform SubscriptionEventPayload into SubscriptionModel data.
+    A stored subscription, read without validation.
     """
 
-    DEFAULT_TYPE = "sub"
-
-    def __init__(self, payload: SubscriptionEventPayload) -> None:
-        self.pk = payload.sub_pk
-        self.sk = payload.sub_sk
-        self.type = self.DEFAULT_TYPE
-        self.planSku = payload.metadata.planSku
-        self.startDate = payload.timestamp
-        self.expiresAt = payload.expiresAt
-        self.lastModified = payload.timestamp
-        self.attributes = {
-            "provider": payload.provider,
-            "paymentId": payload.paymentId,
-            "customerId": payload.customerId,
-            "autoRenew": payload.metadata.autoRenew,
-            "paymentMethod": payload.metadata.paymentMethod,
+    pk: str
+    sk: str
+    type: str
+    planSku: str
+    startDate: str
+    expiresAt: str
+    cancelledAt: str | None
+    lastModified: str
+    attributes: SubscriptionAttributesRecord | None
+    expiresAtMs: int
+    cancelledAtMs: int | None
+    lastModifiedMs: int
+
+    @classmethod
+    def from_item(cls, item: dict) -> "SubscriptionRecord":
+        """
+        Record of a subscription item (or view item) of our table. Items
+        stored before the epoch shadows get them computed here.
+        """
+        attributes = item.get("attributes")
+        cancelled_at = item.get("cancelledAt")
+        cancelled_at_ms = item.get("cancelledAtMs")
+        if cancelled_at_ms is None and cancelled_at:
+            cancelled_at_ms = epoch_millis(cancelled_at)
+        return cls(
+            item["pk"],
+            item["sk"],
+            item.get("type", "sub"),
+            item["planSku"],
+            item["startDate"],
+            item["expiresAt"],
+            cancelled_at,
+            item["lastModified"],
+            (
+                SubscriptionAttributesRecord(
+                    attributes.get("provider"),
+                    attributes.get("paymentId"),
+                    attributes.get("customerId"),
+                    attributes.get("autoRenew"),
+                    attributes.get("paymentMethod"),
+                )
+                if attributes is not None
+                else None
+            ),
+            item.get("expiresAtMs") or epoch_millis(item["expiresAt"]),
+            cancelled_at_ms,
+            item.get("lastModifiedMs") or epoch_millis(item["lastModified"]),
+        )
+
+
+@dataclass(slots=True)
+class PlanRecord(PlanStatusMixin):
+    """
+    A stored plan, read without validation.
+    """
+
+    pk: str
+    sk: str
+    type: str
+    name: str
+    price: float
+    currency: str
+    billingCycle: str
+    features: list[str]
+    status: str
+    lastModified: str | None
+
+    @classmethod
+    def from_item(cls, item: dict) -> "PlanRecord":
+        return cls(
+            item["pk"],
+            item["sk"],
+            item["type"],
+            item["name"],
+            item["price"],
+            item["currency"],
+            item["billingCycle"],
+            item["features"],
+            item["status"],
+            item.get("lastModified"),
+        )
+
+    def to_item(self) -> dict:
+        """
+        The plan as an item, like `PlanModel.model_dump(exclude_none=True)`.
+        """
+        item = {
+            "pk": self.pk,
+            "sk": self.sk,
+            "type": self.type,
+            "name": self.name,
+            "price": self.price,
+            "currency": self.currency,
+            "billingCycle": self.billingCycle,
+            "features": self.features,
+            "status": self.status,
         }
-        if payload.is_cancelled:
-            self.cancelledAt = payload.cancelledAt
+        if self.lastModified is not None:
+            item["lastModified"] = self.lastModified
+        return item
+
 
-    def to_dict(self) -> dict:
-        return self.__dict__
+def subscription_item(payload: SubscriptionEventPayload) -> dict:
+    """
+    The full subscription item a validated event creates, as
+    `SubscriptionModel(...).model_dump(exclude_none=True)` would give it.
+    """
+    attributes = {
+        "provider": payload.provider,
+        "paymentId": payload.paymentId,
+        "customerId": payload.customerId,
+        "autoRenew": payload.metadata.autoRenew,
+        "paymentMethod": payload.metadata.paymentMethod,
+    }
+    item = {
+        "pk": payload.sub_pk,
+        "sk": payload.sub_sk,
+        "type": "sub",
+        "planSku": payload.metadata.planSku,
+        "startDate": payload.timestamp,
+        "expiresAt": payload.expiresAt,
+        "lastModified": payload.timestamp,
+        "attributes": {
+            name: value for name, value in attributes.items() if value is not None
+        },
+        "expiresAtMs": epoch_millis(payload.expiresAt),
+        "lastModifiedMs": epoch_millis(payload.timestamp),
+    }
+    if payload.is_cancelled and payload.cancelledAt:
+        item["cancelledAt"] = payload.cancelledAt
+        item["cancelledAtMs"] = epoch_millis(payload.cancelledAt)
+    return item
+
+
+def latest_subscription(items: list[dict]) -> dict | None:
+    """
+    A user's current subscription among the items of their partition: the
+    one that started last.
+    """
+    subscriptions = [item for item in items if item.get("type") == "sub"]
+    if not subscriptions:
+        return None
+    return max(subscriptions, key=lambda item: item["startDate"])
+
+
+def _is_newer(item: dict, timestamp: str) -> bool:
+    """
+    Whether a stored item was modified after `timestamp`, by the same rule
+    as `SubscriptionAdapter.NOT_NEWER_CONDITION`.
+    """
+    if "lastModifiedMs" in item:
+        return item["lastModifiedMs"] > epoch_millis(timestamp)
+    return item.get("lastModified", "") > timestamp
+
+
+class CurrentSubscriptionView:
+    """
+    Denormalized `user:<id> / current` item: the user's current subscription
+    together with a snapshot of its plan, so GET reads one item by key
+    however long the user's history is.
+
+    The current subscription is the one that started last. Webhook writes
+    refresh the view with a conditional PutItem that only replaces it with
+    a newer state of the same subscription or with a later-started one, so
+    concurrent and out-of-order deliveries cannot roll it back. States are
+    ordered by `lastModifiedMs`, like the subscription writes; views stored
+    before the shadow are compared by their strings. The plan snapshot is
+    taken at write time; `models.current_view` rebuilds the views from the
+    table, e.g. after plans change. Reads of users without a view (seeded
+    by `models.loader`, say) write it, so only their first read falls back.
+    """
+
+    SK: ClassVar[str] = "current"
+    TYPE: ClassVar[str] = "current"
+
+    NEWER_CONDITION: ClassVar[str] = (
+        "attribute_not_exists(#pk)"
+        " OR (#subscriptionId = :subscriptionId"
+        " AND (#lastModifiedMs <= :lastModifiedMs"
+        " OR (attribute_not_exists(#lastModifiedMs)"
+        " AND #lastModified <= :lastModified)))"
+        " OR #startDate < :startDate"
+    )
+
+    @classmethod
+    def item(cls, subscription: dict, plan: PlanRecord) -> dict:
+        """
+        The view item for a stored subscription item and its plan.
+        """
+        return {
+            **subscription,
+            "sk": cls.SK,
+            "type": cls.TYPE,
+            "subscriptionId": subscription["sk"],
+            # Subscriptions stored before the shadows lack it
+            "lastModifiedMs": subscription.get("lastModifiedMs")
+            or epoch_millis(subscription["lastModified"]),
+            "plan": plan.to_item(),
+        }
+
+    @staticmethod
+    def load(item: dict) -> tuple[SubscriptionRecord, PlanRecord]:
+        subscription = SubscriptionRecord.from_item(item)
+        subscription.sk = item["subscriptionId"]
+        subscription.type = "sub"
+        return subscription, PlanRecord.from_item(item["plan"])
+
+    @classmethod
+    def write(cls, subscription: dict, plan: PlanRecord) -> bool:
+        """
+        Make `subscription` the user's current one unless the stored view
+        is newer. Returns False when the view was left as it was.
+        """
+        item = cls.item(subscription, plan)
+        return DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.put(
+            item,
+            condition=cls.NEWER_CONDITION,
+            condition_values={
+                ":subscriptionId": item["subscriptionId"],
+                ":lastModified": item["lastModified"],
+                ":lastModifiedMs": item["lastModifiedMs"],
+                ":startDate": item["startDate"],
+            },
+        )
+
+    @classmethod
+    def backfill(cls, subscription: dict, plan: PlanRecord) -> bool:
+        """
+        `write` from a read path, which already has its data: a write that
+        is throttled, runs out of time or fails is counted in
+        `views.backfill_failed` and left for a later read to retry.
+        """
+        try:
+            return cls.write(subscription, plan)
+        except (TableUnavailable, DeadlineExceeded, ClientError):
+            count("views.backfill_failed")
+            return False
+
+    @classmethod
+    def refresh(cls, subscription: dict, plan: PlanRecord | None = None) -> bool:
+        """
+        `write` for a subscription, reading its plan unless `plan` is it.
+        """
+        if plan is None or plan.pk != subscription["planSku"]:
+            items = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(
+                subscription["planSku"]
+            )
+            if not items:
+                return False
+            plan = PlanRecord.from_item(items[0])
+        return cls.write(subscription, plan)
 
 
 class SubscriptionAdapter(BaseModel):
     payload: SubscriptionEventPayload
 
-    def get_sub_by_pk(self) -> dict:
-        return DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(self.payload.sub_pk)
+    # Out-of-order deliveries must not overwrite newer state; items stored
+    # before the epoch shadows existed are compared by their strings
+    NOT_NEWER_CONDITION: ClassVar[str] = (
+        "attribute_not_exists(#lastModified)"
+        " OR #lastModifiedMs <= :eventTimestampMs"
+        " OR (attribute_not_exists(#lastModifiedMs)"
+        " AND #lastModified <= :eventTimestamp)"
+    )
+    NOT_EXISTS_CONDITION: ClassVar[str] = "attribute_not_exists(#pk)"
 
-    def get_plan_by_pk(self) -> PlanModel | None:
+    def get_plan_by_pk(self) -> PlanRecord | None:
         if plan := DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(
             self.payload.plan_pk
         ):
-            return PlanModel(**plan[0])
+            return PlanRecord.from_item(plan[0])
 
-    def create_sub(self) -> None:
+    def creation_fields(self) -> dict:
         """
-        Process subscription event payload and create subscription record.
+        Full subscription item for this event, used when it does not exist yet.
         """
-        data = SubscriptionDetailsSchema(self.payload).to_dict()
+        return subscription_item(self.payload)
 
-        subscription_model = SubscriptionModel(**data)
-        subscription_model.create()
-
-    def _update_renewal(self) -> None:
-        """
-        Update plan on renewal if needed.
-        """
-        update_dict = {
+    def renewal_changes(self) -> dict:
+        return {
             "pk": self.payload.sub_pk,
             "sk": self.payload.sub_sk,
             "lastModified": self.payload.timestamp,
+            "lastModifiedMs": epoch_millis(self.payload.timestamp),
             "expiresAt": self.payload.expiresAt,
+            "expiresAtMs": epoch_millis(self.payload.expiresAt),
             "internalStatus": SubscriptionStatus.ACTIVE,
         }
-        DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.update(update_dict)
 
-    def _update_cancelled(self) -> None:
-        """
-        Update plan on renewal if needed.
-        """
-        update_dict = {
+    def cancellation_changes(self) -> dict:
+        cancelled_at = self.payload.cancelledAt
+        return {
             "pk": self.payload.sub_pk,
             "sk": self.payload.sub_sk,
             "lastModified": self.payload.timestamp,
+            "lastModifiedMs": epoch_millis(self.payload.timestamp),
             "expiresAt": self.payload.expiresAt,
-            "cancelledAt": self.payload.cancelledAt,
+            "expiresAtMs": epoch_millis(self.payload.expiresAt),
+            "cancelledAt": cancelled_at,
+            "cancelledAtMs": epoch_millis(cancelled_at) if cancelled_at else None,
             "internalStatus": SubscriptionStatus.CANCELLED,
         }
-        DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.update(update_dict)
 
-    def process(self) -> None:
+    def event_changes(self) -> dict | None:
         """
-        Process subscription event payload.
+        Attributes this event sets on an existing subscription, or None if it
+        only creates missing subscriptions.
+        """
+        if self.payload.is_renewal:
+            return self.renewal_changes()
+        if self.payload.is_cancelled:
+            return self.cancellation_changes()
+        return None
+
+    def write_event(self) -> dict | None:
+        """
+        Apply the event with one conditional UpdateItem, without reading the
+        subscription first. Returns the stored subscription, or None when the
+        event was ignored (already created, or older than the stored state).
+        """
+        table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+        key = {"pk": self.payload.sub_pk, "sk": self.payload.sub_sk}
+
+        if (changes := self.event_changes()) is None:
+            return table.update(
+                key,
+                set_if_missing=self.creation_fields(),
+                condition=self.NOT_EXISTS_CONDITION,
+            )
+
+        return table.update(
+            changes,
+            set_if_missing=self.creation_fields(),
+            condition=self.NOT_NEWER_CONDITION,
+            condition_values={
+                ":eventTimestamp": self.payload.timestamp,
+                ":eventTimestampMs": epoch_millis(self.payload.timestamp),
+            },
+        )
+
+    def process(self) -> dict | None:
+        """
+        Process subscription event payload and refresh the user's current
+        subscription view.
         """
         if not (plan := self.get_plan_by_pk()) or plan.is_inactive:
             raise ValueError("Plan is inactive or does not exist")
 
-        if not self.get_sub_by_pk():
-            return self.create_sub()
+        stored = self.write_event()
+        # An ignored event may be the retry of one whose view write failed
+        current = stored or DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_item(
+            self.payload.sub_pk, self.payload.sub_sk
+        )
+        if current:
+            CurrentSubscriptionView.refresh(current, plan)
+        return stored
+
 
-        if self.payload.is_renewal:
-            # Add logic to update plan if needed on renewal
-            return self._update_renewal()
-        elif self.payload.is_cancelled:
-            # Add logic to update plan if needed on cancellation
-            return self._update_cancelled()
+class SubscriptionBatchAdapter:
+    """
+    Applies a batch of webhook events with as few DynamoDB calls as possible.
+
+    Events are validated in one pass and grouped by `sub_pk`, so each user's
+    events are applied in `timestamp` order. Every plan and every user
+    partition is read once, concurrently. The events are folded into the
+    final items in memory, with the same rules as the single-event path.
+    Each item is written with a concurrent, conditional PutItem that only
+    succeeds if the stored item is still the one read. If another write got
+    there first, that item's events are applied again one by one through
+    `SubscriptionAdapter.write_event`, whose conditions keep newer state.
+    Then the views of the written subscriptions are refreshed. Each event
+    gets its own result.
+    """
+
+    PROCESSED = "processed"
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
+
+    def __init__(self, events: list[dict]) -> None:
+        self.events = events
+        self.results = [{"index": index} for index in range(len(events))]
+
+    def _fail(self, index: int, message: str) -> None:
+        self.results[index].update({"status": self.FAILED, "error": message})
+
+    def _validate(self) -> list[tuple[int, SubscriptionEventPayload]]:
+        payloads = []
+
+        for index, event in enumerate(self.events):
+            if isinstance(event, dict) and "eventId" in event:
+                self.results[index]["eventId"] = event["eventId"]
+            try:
+                payloads.append(
+                    (index, SUBSCRIPTION_EVENT_ADAPTER.validate_python(event))
+                )
+            except ValidationError as error:
+                self._fail(index, process_pydantic_error(error))
+
+        return payloads
+
+    def _claim(self, payloads: list) -> list[tuple[int, SubscriptionEventPayload]]:
+        if not Config.IDEMPOTENCY_ENABLED:
+            return payloads
+
+        claimed = []
+        for index, payload in payloads:
+            try:
+                is_new = EVENT_IDEMPOTENCY.claim(payload.eventId)
+            except Exception as error:
+                self._fail(index, str(error))
+                continue
+            if is_new:
+                claimed.append((index, payload))
+            else:
+                self.results[index]["status"] = self.DUPLICATE
+
+        return claimed
+
+    def _read_all(self, pks: list[str]) -> dict[str, list]:
+        table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+        calls = [lambda pk=pk: table.get_by_pk(pk) for pk in pks]
+        return dict(zip(pks, run_concurrently(*calls))) if calls else {}
+
+    def _fold(self, payloads: list, reads: dict) -> dict:
+        """
+        Apply every event to an in-memory copy of its subscription item, the
+        same way `SubscriptionAdapter.process` would one by one. Returns the
+        final items keyed by `(pk, sk)` together with the events behind them.
+        An event that cannot be applied fails on its own; the item stays as
+        the events before it left it.
+        """
+        items = {}
+
+        for index, payload in payloads:
+            plan = reads.get(payload.plan_pk)
+            if not plan or PlanRecord.from_item(plan[0]).is_inactive:
+                self._fail(index, "Plan is inactive or does not exist")
+                continue
+
+            key = (payload.sub_pk, payload.sub_sk)
+            if key not in items:
+                stored = [
+                    item
+                    for item in reads[payload.sub_pk]
+                    if item.get("sk") == payload.sub_sk
+                ]
+                items[key] = {
+                    "item": dict(stored[0]) if stored else {},
+                    "read": stored[0] if stored else None,
+                    "changed": False,
+                    "events": [],
+                    "payloads": [],
+                }
+            entry = items[key]
+
+            try:
+                changed = self._fold_event(entry, SubscriptionAdapter(payload=payload))
+            except Exception as error:
+                self._fail(index, str(error))
+                continue
+            entry["events"].append(index)
+            entry["payloads"].append(payload)
+            entry["changed"] = entry["changed"] or changed
+
+        return items
+
+    @staticmethod
+    def _fold_event(entry: dict, adapter: "SubscriptionAdapter") -> bool:
+        """
+        Apply one event to `entry["item"]`. Returns False if the event
+        changes nothing.
+        """
+        item = entry["item"]
+        # Same conditions as `SubscriptionAdapter.write_event`
+        if (changes := adapter.event_changes()) is None:
+            if item:
+                return False
+            entry["item"] = adapter.creation_fields()
+        else:
+            if _is_newer(item, adapter.payload.timestamp):
+                return False
+            entry["item"] = {**adapter.creation_fields(), **item, **changes}
+        return True
+
+    @staticmethod
+    def _unchanged_condition(read: dict | None) -> tuple[str, dict]:
+        """
+        ConditionExpression (and values) that holds only while the stored
+        item is the one `_read_all` returned.
+        """
+        if read is None:
+            return "attribute_not_exists(#pk)", {}
+        if "lastModifiedMs" in read:
+            return "#lastModifiedMs = :readMs", {":readMs": read["lastModifiedMs"]}
+        if "lastModified" in read:
+            return (
+                "attribute_not_exists(#lastModifiedMs) AND #lastModified = :read",
+                {":read": read["lastModified"]},
+            )
+        return "attribute_exists(#pk) AND attribute_not_exists(#lastModified)", {}
+
+    def _write_entry(self, entry: dict) -> None:
+        table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+        condition, values = self._unchanged_condition(entry["read"])
+        if table.put(entry["item"], condition=condition, condition_values=values):
+            return
+
+        # Written meanwhile: replay the events against what is stored now
+        key = (entry["item"]["pk"], entry["item"]["sk"])
+        stored = None
+        for payload in entry["payloads"]:
+            stored = SubscriptionAdapter(payload=payload).write_event() or stored
+        entry["item"] = stored or table.get_item(*key) or {}
+
+    def _write(self, items: dict) -> None:
+        for entry in items.values():
+            if not entry["changed"]:
+                for index in entry["events"]:
+                    self.results[index]["status"] = self.PROCESSED
+
+        entries = [entry for entry in items.values() if entry["changed"]]
+
+        def write(entry: dict) -> Exception | None:
+            try:
+                self._write_entry(entry)
+            except Exception as error:
+                return error
+            return None
+
+        calls = [lambda entry=entry: write(entry) for entry in entries]
+        errors = run_concurrently(*calls) if calls else []
+        for entry, error in zip(entries, errors):
+            for index in entry["events"]:
+                if error is not None:
+                    self._fail(index, str(error))
+                else:
+                    self.results[index]["status"] = self.PROCESSED
+
+    def _refresh_views(self, items: dict, reads: dict) -> None:
+        """
+        Refresh the current subscription view of every written subscription,
+        concurrently. Events whose view could not be written fail, so their
+        retry refreshes it again.
+        """
+        entries = [
+            entry
+            for entry in items.values()
+            if entry["item"]
+            and entry["events"]
+            and self.results[entry["events"][0]].get("status") == self.PROCESSED
+        ]
+
+        def refresh(entry: dict) -> Exception | None:
+            plan = reads.get(entry["item"]["planSku"])
+            try:
+                CurrentSubscriptionView.refresh(
+                    entry["item"], PlanRecord.from_item(plan[0]) if plan else None
+                )
+            except Exception as error:
+                return error
+            return None
+
+        calls = [lambda entry=entry: refresh(entry) for entry in entries]
+        errors = run_concurrently(*calls) if calls else []
+        for entry, error in zip(entries, errors):
+            if error is not None:
+                for index in entry["events"]:
+                    self._fail(index, str(error))
+
+    def process(self) -> list[dict]:
+        payloads = self._claim(self._validate())
+        # Stable sort: events of one user keep their timestamp order
+        payloads.sort(key=lambda entry: (entry[1].sub_pk, entry[1].timestamp))
+
+        # One deduplicated, concurrent read for every plan and user partition
+        pks = [payload.plan_pk for _, payload in payloads]
+        pks += [payload.sub_pk for _, payload in payloads]
+        try:
+            try:
+                reads = self._read_all(list(dict.fromkeys(pks)))
+            except Exception as error:
+                # E.g. the request deadline passed
+                for index, _ in payloads:
+                    self._fail(index, str(error))
+            else:
+                items = self._fold(payloads, reads)
+                self._write(items)
+                self._refresh_views(items, reads)
+        finally:
+            # Claims of events that were not stored are released even when
+            # an error escapes, so a retry of those events is applied
+            if Config.IDEMPOTENCY_ENABLED:
+                for index, payload in payloads:
+                    if self.results[index].get("status") != self.PROCESSED:
+                        EVENT_IDEMPOTENCY.release(payload.eventId)
+
+        return self.results
 
 
 class PlanAdapter(BaseModel):
@@ -222,6 +821,13 @@ class PlanAdapter(BaseModel):
         """
         Process subscription event payload and create plan record.
         """
+        # Demo-only dependencies, imported here to keep them off the cold start
+        import random
+
+        from faker import Faker
+
+        fake = Faker("es_MX")
+
         DEFAULT_TYPE = "plan"
         DEFAULT_CURRENCY = "USD"
         # Random price and currency for demonstration purposes
@@ -249,6 +855,10 @@ class PlanAdapter(BaseModel):
             return self._create()
 
 
+# Encoded `plan` objects of GET responses; plans rarely change
+PLAN_FRAGMENTS = FragmentCache()
+
+
 class SubscriptionAndPlanAdapter(BaseModel):
     user_id: str
 
@@ -256,30 +866,38 @@ class SubscriptionAndPlanAdapter(BaseModel):
     def sub_pk(self) -> str:
         return f"user:{self.user_id}"
 
-    def _get_sub_by_pk(self) -> SubscriptionModel:
+    def _get_sub_by_pk(self) -> dict:
         if not (
-            subscription := DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(
-                self.sub_pk
+            subscription := latest_subscription(
+                DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(self.sub_pk)
             )
         ):
             raise ValueError("Subscription not found")
 
-        return SubscriptionModel(**subscription[0])
+        return subscription
 
-    def _get_plan_by_pk(self, plan_pk: str) -> PlanModel:
+    def _get_plan_by_pk(self, plan_pk: str) -> PlanRecord:
         if not (plan := DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_by_pk(plan_pk)):
             raise ValueError("Plan not found")
 
-        return PlanModel(**plan[0])
+        return PlanRecord.from_item(plan[0])
 
-    def process(self) -> dict:
-        subscription = self._get_sub_by_pk()
-        plan = self._get_plan_by_pk(subscription.plan_pk)
-
-        data = {
-            "userId": subscription.pk,
-            "subscriptionId": subscription.sk,
-            "plan": {
+    @staticmethod
+    def _plan_fragment(plan: PlanRecord) -> RawJSON:
+        """
+        The response's `plan` object, encoded once per distinct plan content.
+        """
+        key = (
+            plan.pk,
+            plan.name,
+            plan.price,
+            plan.currency,
+            plan.billingCycle,
+            tuple(plan.features),
+        )
+        return PLAN_FRAGMENTS.get(
+            key,
+            lambda: {
                 "sku": plan.pk,
                 "name": plan.name,
                 "price": plan.price,
@@ -287,6 +905,54 @@ class SubscriptionAndPlanAdapter(BaseModel):
                 "billingCycle": plan.billingCycle,
                 "features": plan.features,
             },
+        )
+
+    def load(self) -> tuple[SubscriptionRecord, PlanRecord]:
+        """
+        The user's current subscription and plan from one GetItem of their
+        view. Users whose view was never written fall back to reading the
+        subscription partition and then the plan, and get their view written
+        for the next read.
+        """
+        if view := DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_item(
+            self.sub_pk, CurrentSubscriptionView.SK
+        ):
+            return CurrentSubscriptionView.load(view)
+
+        # The plan key comes from the subscription item, so these reads are
+        # dependent and cannot be overlapped
+        item = self._get_sub_by_pk()
+        subscription = SubscriptionRecord.from_item(item)
+        plan = self._get_plan_by_pk(subscription.plan_pk)
+        CurrentSubscriptionView.backfill(item, plan)
+        return subscription, plan
+
+    @staticmethod
+    def etag(
+        subscription: SubscriptionRecord, plan: PlanRecord, fragment: RawJSON
+    ) -> str:
+        """
+        Weak ETag of the response, which only changes when a webhook updates
+        the subscription or the plan changes. Plans seeded without
+        `lastModified` are identified by their encoded `fragment` instead.
+        """
+        version = (
+            f"{subscription.pk}|{subscription.sk}|{subscription.lastModified}|"
+            f"{plan.pk}|{plan.lastModified or fragment.text}"
+        )
+        digest = hashlib.md5(version.encode(), usedforsecurity=False).hexdigest()
+        return f'W/"{digest}"'
+
+    @staticmethod
+    def data(subscription: SubscriptionRecord, fragment: RawJSON) -> dict:
+        """
+        Response data for the user's subscription, with the plan given as its
+        pre-encoded `fragment`.
+        """
+        data = {
+            "userId": subscription.pk,
+            "subscriptionId": subscription.sk,
+            "plan": fragment,
             "startDate": subscription.startDate,
             "expiresAt": subscription.expiresAt,
             "status": subscription.compute_status(),
@@ -301,21 +967,245 @@ class SubscriptionAndPlanAdapter(BaseModel):
 
         return data
 
+    def process(self, if_none_match: str | None = None) -> tuple[str, dict | None]:
+        """
+        The response's ETag and data; the data is None when `if_none_match`
+        already matches, so nothing is built for an unchanged subscription.
+        """
+        subscription, plan = self.load()
+        fragment = self._plan_fragment(plan)
+
+        etag = self.etag(subscription, plan, fragment)
+        if etag_matches(if_none_match, etag):
+            return etag, None
+        return etag, self.data(subscription, fragment)
+
+
+class SubscriptionLookupAdapter:
+    """
+    Subscriptions of many users at once, each in the shape
+    `SubscriptionAndPlanAdapter.process` gives a single GET.
+
+    The users' current subscription views are read with chunked, concurrent
+    BatchGetItem requests. Users without a view have their partitions read
+    concurrently, and the plans those need are read once per distinct
+    `planSku`. Plans are encoded once per distinct plan either way.
+    """
+
+    def __init__(self, user_ids: list[str]) -> None:
+        self.user_ids = list(dict.fromkeys(user_ids))
+
+    @staticmethod
+    def _read_all(pks: list[str]) -> dict[str, list]:
+        table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+        calls = [lambda pk=pk: table.get_by_pk(pk) for pk in pks]
+        return dict(zip(pks, run_concurrently(*calls))) if calls else {}
+
+    def _without_views(self, user_ids: list[str]) -> dict[str, tuple]:
+        """
+        `(subscription, plan)` of users that have no view yet, from their
+        partitions; users without a subscription or plan are left out. The
+        views of the users found are written concurrently, as a GET would.
+        """
+        partitions = self._read_all([f"user:{user_id}" for user_id in user_ids])
+        items = {}
+        for user_id in user_ids:
+            if subscription := latest_subscription(partitions[f"user:{user_id}"]):
+                items[user_id] = subscription
+
+        skus = dict.fromkeys(item["planSku"] for item in items.values())
+        plans = {
+            sku: PlanRecord.from_item(found[0])
+            for sku, found in self._read_all(list(skus)).items()
+            if found
+        }
+        resolved = {
+            user_id: (item, plans[item["planSku"]])
+            for user_id, item in items.items()
+            if item["planSku"] in plans
+        }
+
+        writes = [
+            lambda item=item, plan=plan: CurrentSubscriptionView.backfill(item, plan)
+            for item, plan in resolved.values()
+        ]
+        if writes:
+            run_concurrently(*writes)
+        return {
+            user_id: (SubscriptionRecord.from_item(item), plan)
+            for user_id, (item, plan) in resolved.items()
+        }
+
+    def process(self) -> tuple[list[dict], list[str]]:
+        """
+        Response data of every user found, in request order, and the IDs of
+        the users without a subscription.
+        """
+        views = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.get_items(
+            [
+                (f"user:{user_id}", CurrentSubscriptionView.SK)
+                for user_id in self.user_ids
+            ]
+        )
+        resolved = {
+            user_id: CurrentSubscriptionView.load(view)
+            for user_id in self.user_ids
+            if (view := views.get((f"user:{user_id}", CurrentSubscriptionView.SK)))
+        }
+        resolved.update(
+            self._without_views(
+                [user_id for user_id in self.user_ids if user_id not in resolved]
+            )
+        )
+
+        subscriptions = []
+        missing = []
+        for user_id in self.user_ids:
+            if (entry := resolved.get(user_id)) is None:
+                missing.append(user_id)
+                continue
+            subscription, plan = entry
+            fragment = SubscriptionAndPlanAdapter._plan_fragment(plan)
+            subscriptions.append(
+                SubscriptionAndPlanAdapter.data(subscription, fragment)
+            )
+
+        return subscriptions, missing
+
+
+def apply_subscription_event(payload: SubscriptionEventPayload) -> bool:
+    """
+    Apply a webhook event exactly once. Returns False if it was a duplicate.
+    """
+    if Config.IDEMPOTENCY_ENABLED and not EVENT_IDEMPOTENCY.claim(payload.eventId):
+        return False
+
+    subscription_adapter = SubscriptionAdapter(payload=payload)
+    try:
+        subscription_adapter.process()
+    except Exception:
+        if Config.IDEMPOTENCY_ENABLED:
+            EVENT_IDEMPOTENCY.release(payload.eventId)
+        raise
+
+    return True
+
+
+class QueueBatchAdapter:
+    """
+    Applies a queue batch of webhook bodies.
+
+    Records are grouped by `userId`. Users are processed in parallel (up to
+    `QUEUE_MAX_PARALLEL_USERS`), while each user's records are applied
+    strictly in delivery order. Once a record fails, the rest of that user's
+    records are not attempted and are reported too, so the redelivery keeps
+    the order.
+    """
+
+    def __init__(self, records: list[QueueRecordSchema]) -> None:
+        self.records = records
+
+    def _partition(self) -> tuple[dict, list]:
+        users = {}
+        failures = []
+
+        for record in self.records:
+            try:
+                payload = SUBSCRIPTION_EVENT_ADAPTER.validate_json(record.body)
+            except ValidationError:
+                failures.append(record.messageId)
+                continue
+            users.setdefault(payload.userId, []).append((record.messageId, payload))
+
+        return users, failures
+
+    @staticmethod
+    def _process_user(records: list) -> list[str]:
+        for position, (_, payload) in enumerate(records):
+            try:
+                apply_subscription_event(payload)
+            except Exception:
+                return [message_id for message_id, _ in records[position:]]
+        return []
+
+    def process(self) -> dict:
+        users, failures = self._partition()
+
+        calls = [
+            lambda records=records: self._process_user(records)
+            for records in users.values()
+        ]
+        for user_failures in run_in_parallel(calls, Config.QUEUE_MAX_PARALLEL_USERS):
+            failures.extend(user_failures)
+
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": message_id} for message_id in failures
+            ]
+        }
+
 
 @validation_wrapper
 def process_subscription_and_plan(payload: SubscriptionEventPayload) -> None:
-    subscription_adapter = SubscriptionAdapter(payload=payload)
-    subscription_adapter.process()
+    if not apply_subscription_event(payload):
+        # Provider retry of an event that was already applied
+        return success_response("Event already processed")
 
     return success_response("Subscription and Plan processed successfully")
 
 
 @validation_wrapper
-def process_user_id(user_id: str) -> dict:
+def process_subscription_events_batch(events: list[dict]) -> dict:
+    if len(events) > Config.WEBHOOK_BATCH_MAX_EVENTS:
+        raise ValueError(
+            f"Batch exceeds {Config.WEBHOOK_BATCH_MAX_EVENTS} events per request"
+        )
+
+    results = SubscriptionBatchAdapter(events).process()
+    failed = sum(1 for result in results if result["status"] == "failed")
+
+    return success_response(
+        f"Processed {len(results) - failed} of {len(results)} events",
+        data={"results": results},
+    )
+
+
+@validation_wrapper
+def process_user_id(
+    user_id: str, if_none_match: str | None = None, accept_encoding: str | None = None
+) -> dict:
     """
-    Fetch user subscription by user ID.
+    Fetch user subscription by user ID. A matching `If-None-Match` gets a
+    304 without a body.
     """
     subscription_adapter = SubscriptionAndPlanAdapter(user_id=user_id)
-    data = subscription_adapter.process()
+    etag, data = subscription_adapter.process(if_none_match=if_none_match)
+    if data is None:
+        return not_modified_response(etag)
+
+    response = success_response(
+        "User subscription retrieved successfully", data=data, headers={"ETag": etag}
+    )
+    return compress_response(response, accept_encoding)
+
+
+@validation_wrapper
+def process_subscriptions_lookup(
+    body: str | None, accept_encoding: str | None = None
+) -> dict:
+    """
+    Fetch the subscriptions of up to `SUBSCRIPTION_LOOKUP_MAX_USERS` users.
+    """
+    request = SUBSCRIPTION_LOOKUP_ADAPTER.validate_json(body or "{}")
+    if len(request.userIds) > Config.SUBSCRIPTION_LOOKUP_MAX_USERS:
+        raise ValueError(
+            f"Lookup exceeds {Config.SUBSCRIPTION_LOOKUP_MAX_USERS} users per request"
+        )
 
-    return success_response("User subscription retrieved successfully", data=data)
+    subscriptions, missing = SubscriptionLookupAdapter(request.userIds).process()
+    response = success_response(
+        f"Retrieved {len(subscriptions)} of {len(subscriptions) + len(missing)} "
+        "subscriptions",
+        data={"missing": missing, "subscriptions": subscriptions},
+    )
+    return compress_response(response, accept_encoding)
@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable
+
+from pydantic import ValidationError
+
+try:
+    # For local development
+    from ..schemas.schemas import SUBSCRIPTION_EVENT_ADAPTER, SubscriptionEventPayload
+    from ..utils.utils import parse_iso8601
+    from .loader import read_records
+    from .models import apply_subscription_event
+except ImportError:
+    # For AWS Lambda deployment
+    from models.loader import read_records
+    from models.models import apply_subscription_event
+    from schemas.schemas import SUBSCRIPTION_EVENT_ADAPTER, SubscriptionEventPayload
+    from utils.utils import parse_iso8601
+
+CHECKPOINT_FILE = "checkpoint.json"
+# Invalid or failed events whose errors are kept for the report
+MAX_REPORTED_ERRORS = 20
+
+
+def partition_of(user_id: str, partitions: int) -> int:
+    """
+    Stable partition of a user; `hash()` is salted per process, so it would
+    move users between partitions when a run is resumed.
+    """
+    return zlib.crc32(user_id.encode()) % partitions
+
+
+class ReplayProgress:
+    """
+    Running totals of a replay, handed to the progress callback. `lag` is
+    the number of spilled events not applied (or rejected) yet.
+    """
+
+    def __init__(self, total: int, total_partitions: int) -> None:
+        self.total = total
+        self.total_partitions = total_partitions
+        self.partitions_done = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, applied: int = 0, duplicates: int = 0) -> None:
+        with self._lock:
+            self.applied += applied
+            self.duplicates += duplicates
+
+    def reject(self, message: str) -> None:
+        with self._lock:
+            self.invalid += 1
+            self._error(message)
+
+    def fail(self, events: int, message: str) -> None:
+        with self._lock:
+            self.failed += events
+            self._error(message)
+
+    def _error(self, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    @property
+    def processed(self) -> int:
+        return self.applied + self.duplicates + self.invalid + self.failed
+
+    @property
+    def lag(self) -> int:
+        return self.total - self.processed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def events_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        rate = self.events_per_second
+        eta = f", ~{self.lag / rate:.0f}s left" if rate and self.lag else ""
+        return (
+            f"{self.applied} applied, {self.duplicates} duplicates, "
+            f"{self.invalid} invalid, {self.failed} failed, lag {self.lag} events"
+            f"{eta}; {self.partitions_done}/{self.total_partitions} partitions, "
+            f"{self.elapsed:.1f}s ({rate:.0f} events/s)"
+        )
+
+
+class ReplayEngine:
+    """
+    Re-applies a webhook event log, in parallel across users and in
+    `timestamp` order for each user.
+
+    The log is streamed once and spilled into `partitions` NDJSON files in
+    `work_dir`, keyed by `userId`, so no more than one partition per worker
+    is ever held in memory. Partitions are then applied on a pool of
+    `workers`: every user lives in exactly one partition and its events are
+    applied one after another, oldest first (log order breaks ties), just as
+    `SubscriptionAdapter` expects. Once one of a user's events fails, the
+    user's later events are not attempted.
+
+    Finished partitions are recorded in a checkpoint in `work_dir`, and a
+    run over the same log resumes from it. A partition that had failures is
+    not recorded, so it is retried on resume; its events that were already
+    applied are skipped as duplicates by their `eventId`.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        work_dir: str,
+        partitions: int = 64,
+        workers: int = 8,
+        apply: Callable[[SubscriptionEventPayload], bool] = apply_subscription_event,
+    ) -> None:
+        self.paths = list(paths)
+        self.work_dir = work_dir
+        self.partitions = partitions
+        self.workers = workers
+        self.apply = apply
+        self.checkpoint_path = os.path.join(work_dir, CHECKPOINT_FILE)
+
+    def _partition_path(self, partition: int) -> str:
+        return os.path.join(self.work_dir, f"partition-{partition:04d}.ndjson")
+
+    def _load_checkpoint(self) -> dict | None:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as source:
+            checkpoint = json.load(source)
+        if (
+            checkpoint["paths"] != self.paths
+            or checkpoint["partitions"] != self.partitions
+        ):
+            raise ValueError(
+                f"{self.checkpoint_path} belongs to another replay; "
+                "use a new work directory"
+            )
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: dict) -> None:
+        # Written aside and renamed, so an interruption never leaves half a file
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as output:
+            json.dump(checkpoint, output)
+        os.replace(temporary, self.checkpoint_path)
+
+    def spill(self, records: Iterable[dict]) -> dict:
+        """
+        Write every event to its user's partition file, in log order, and
+        start a checkpoint holding the event count of every partition.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        counts = [0] * self.partitions
+        outputs = [
+            open(self._partition_path(partition), "w", encoding="utf-8")
+            for partition in range(self.partitions)
+        ]
+        try:
+            for record in records:
+                user_id = record.get("userId") if isinstance(record, dict) else None
+                # Events without a user are rejected when their partition runs
+                partition = partition_of(str(user_id or ""), self.partitions)
+                outputs[partition].write(encode(record))
+                outputs[partition].write("\n")
+                counts[partition] += 1
+        finally:
+            for output in outputs:
+                output.close()
+
+        checkpoint = {
+            "paths": self.paths,
+            "partitions": self.partitions,
+            "counts": counts,
+            "done": [],
+        }
+        self._save_checkpoint(checkpoint)
+        return checkpoint
+
+    def _read_partition(self, partition: int, progress: ReplayProgress) -> dict:
+        """
+        The partition's valid events grouped by user, each user's sorted by
+        `timestamp`.
+        """
+        users = {}
+        with open(self._partition_path(partition), encoding="utf-8") as source:
+            for position, line in enumerate(source):
+                try:
+                    payload = SUBSCRIPTION_EVENT_ADAPTER.validate_json(line)
+                    instant = parse_iso8601(payload.timestamp)
+                except (ValidationError, ValueError) as error:
+                    progress.reject(f"partition {partition} line {position}: {error}")
+                    continue
+                users.setdefault(payload.userId, []).append(
+                    (instant, position, payload)
+                )
+
+        for events in users.values():
+            events.sort(key=lambda event: event[:2])
+        return users
+
+    def _replay_partition(self, partition: int, progress: ReplayProgress) -> bool:
+        """
+        Apply one partition. Returns False if any event failed.
+        """
+        succeeded = True
+        for user_id, events in self._read_partition(partition, progress).items():
+            for position, (_, _, payload) in enumerate(events):
+                try:
+                    applied = self.apply(payload)
+                except Exception as error:
+                    progress.fail(
+                        len(events) - position,
+                        f"user {user_id} event {payload.eventId}: {error}",
+                    )
+                    succeeded = False
+                    break
+                if applied:
+                    progress.add(applied=1)
+                else:
+                    progress.add(duplicates=1)
+        return succeeded
+
+    def run(
+        self,
+        progress: Callable[[ReplayProgress], None] | None = None,
+        progress_interval: float = 5.0,
+    ) -> ReplayProgress:
+        """
+        Replay the log, resuming from the checkpoint if there is one.
+        `progress` is called at most every `progress_interval` seconds.
+        """
+        checkpoint = self._load_checkpoint()
+        if checkpoint is None:
+            records = (record for path in self.paths for record in read_records(path))
+            checkpoint = self.spill(records)
+
+        done = set(checkpoint["done"])
+        pending = [
+            partition
+            for partition in range(self.partitions)
+            if partition not in done and checkpoint["counts"][partition]
+        ]
+        stats = ReplayProgress(
+            sum(checkpoint["counts"][partition] for partition in pending),
+            len(pending),
+        )
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="fender-replay"
+        ) as executor:
+            futures = {
+                executor.submit(self._replay_partition, partition, stats): partition
+                for partition in pending
+            }
+            last_report = time.perf_counter()
+            while futures:
+                finished, _ = wait(
+                    futures, timeout=progress_interval, return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    partition = futures.pop(future)
+                    stats.partitions_done += 1
+                    if future.result():
+                        done.add(partition)
+                        checkpoint["done"] = sorted(done)
+                        self._save_checkpoint(checkpoint)
+                now = time.perf_counter()
+                if progress is not None and now - last_report >= progress_interval:
+                    last_report = now
+                    progress(stats)
+
+        return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay webhook event logs (NDJSON, maybe .gz) in order per user."
+    )
+    parser.add_argument("paths", nargs="+", help="event logs, oldest first")
+    parser.add_argument(
+        "--work-dir",
+        required=True,
+        help="directory for partition files and the checkpoint; reuse it to resume",
+    )
+    parser.add_argument("--partitions", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    engine = ReplayEngine(args.paths, args.work_dir, args.partitions, args.workers)
+    report = engine.run(
+        progress=lambda progress: print(f"replay: {progress}", file=sys.stderr),
+        progress_interval=args.progress_interval,
+    )
+
+    for error in report.errors:
+        print(f"replay: error in {error}", file=sys.stderr)
+    print(f"replay: done, {report}", file=sys.stderr)
+    if report.invalid or report.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,39 @@
 from http import HTTPStatus
 
-from pydantic import BaseModel
-
 try:
     # For local development
-    from .models.models import process_subscription_and_plan, process_user_id
+    from .models.models import (
+        process_subscription_and_plan,
+        process_subscription_events_batch,
+        process_subscriptions_lookup,
+        process_user_id,
+    )
     from .schemas.schemas import EventSchema, SubscriptionEventPayload
+    from .utils.deadline import check_deadline, request_deadline
     from .utils.response import error_response, validation_wrapper
-except:
+except ImportError:
     # For AWS Lambda deployment
-    from models.models import process_subscription_and_plan, process_user_id
+    from models.models import (
+        process_subscription_and_plan,
+        process_subscription_events_batch,
+        process_subscriptions_lookup,
+        process_user_id,
+    )
     from schemas.schemas import EventSchema, SubscriptionEventPayload
+    from utils.deadline import check_deadline, request_deadline
     from utils.response import error_response, validation_wrapper
 
 
 # /api/v1/subscriptions/{userId}
-def router_get_user_subscription(user_id: str) -> dict:
+def router_get_user_subscription(
+    user_id: str, if_none_match: str | None = None, accept_encoding: str | None = None
+) -> dict:
     """
     Router function to handle GET /api/v1/subscriptions/{userId} requests.
     """
-    return process_user_id(user_id=user_id)
+    return process_user_id(
+        user_id=user_id, if_none_match=if_none_match, accept_encoding=accept_encoding
+    )
 
 
 # /api/v1/webhooks/subscriptions
@@ -30,18 +44,74 @@ def router_post_user_subscription(body: SubscriptionEventPayload) -> dict:
     return process_subscription_and_plan(payload=body)
 
 
-class Router(BaseModel):
-    event: EventSchema
+# /api/v1/webhooks/subscriptions (JSON array body)
+def router_post_user_subscriptions_batch(events: list[dict]) -> dict:
+    """
+    Router function to handle batched POST /api/v1/webhooks/subscriptions
+    requests.
+    """
+    return process_subscription_events_batch(events=events)
+
+
+# /api/v1/subscriptions/batch
+def router_post_subscriptions_lookup(
+    body: str | None, accept_encoding: str | None = None
+) -> dict:
+    """
+    Router function to handle POST /api/v1/subscriptions/batch requests.
+    """
+    return process_subscriptions_lookup(body=body, accept_encoding=accept_encoding)
+
+
+class Router:
+    """
+    Dispatches an already validated API Gateway event. It is a plain class
+    so the event is not validated a second time.
+
+    With the Lambda `context`, the request gets a deadline from the
+    invocation's remaining time; running out of it answers with a 503
+    instead of letting the invocation time out.
+    """
+
+    def __init__(self, event: EventSchema, context=None) -> None:
+        self.event = event
+        self.context = context
 
-    @validation_wrapper
     def process_event(self) -> dict:
+        response = self._process()
+        # `validation_wrapper` reports errors as `(False, response)`, but
+        # API Gateway only accepts the response itself
+        if isinstance(response, tuple):
+            _, response = response
+        return response
+
+    @validation_wrapper
+    def _process(self) -> dict:
+        with request_deadline(self.context):
+            check_deadline()
+            return self._dispatch()
+
+    def _dispatch(self) -> dict:
 
         if self.event.is_get:
             user_id = self.event.pathParameters.userId
-            return router_get_user_subscription(user_id=user_id)
+            return router_get_user_subscription(
+                user_id=user_id,
+                if_none_match=self.event.header("If-None-Match"),
+                accept_encoding=self.event.header("Accept-Encoding"),
+            )
+
+        elif self.event.is_subscription_lookup:
+            return router_post_subscriptions_lookup(
+                body=self.event.body,
+                accept_encoding=self.event.header("Accept-Encoding"),
+            )
 
         elif self.event.is_post:
-            body = SubscriptionEventPayload(**self.event.parse_body())
+            body = self.event.parse_payload()
+            if isinstance(body, list):
+                return router_post_user_subscriptions_batch(events=body)
+
             return router_post_user_subscription(body=body)
 
         else:
@@ -1,8 +1,31 @@
 import json
 from enum import StrEnum
-from typing import Optional
+from typing import Annotated, Optional
 
-from pydantic import BaseModel
+from pydantic import AfterValidator, BaseModel, TypeAdapter
+
+try:
+    # For local development
+    from ..utils.utils import parse_iso8601
+except ImportError:
+    # For AWS Lambda deployment
+    from utils.utils import parse_iso8601
+
+
+def _iso8601(value: str) -> str:
+    """
+    Reject dates the write path could not order by (their `<name>Ms`
+    shadows), so they fail validation before the event is claimed.
+    """
+    try:
+        parse_iso8601(value)
+    except ValueError:
+        raise ValueError(f"Invalid ISO 8601 date: {value!r}") from None
+    return value
+
+
+# An ISO 8601 date kept as the string it was sent as
+Iso8601 = Annotated[str, AfterValidator(_iso8601)]
 
 
 class SubscriptionType(StrEnum):
@@ -20,10 +43,15 @@ class UserParamsSchema(BaseModel):
     userId: str
 
 
+# POST path of the multi-user subscription lookup
+SUBSCRIPTION_LOOKUP_PATH = "/api/v1/subscriptions/batch"
+
+
 class EventSchema(BaseModel):
     httpMethod: str
     path: str
     body: Optional[str] = None
+    headers: Optional[dict[str, str]] = None
     pathParameters: Optional[UserParamsSchema] = None
 
     @property
@@ -34,11 +62,42 @@ class EventSchema(BaseModel):
     def is_post(self) -> bool:
         return self.httpMethod == SupportedMethods.POST
 
-    def parse_body(self) -> dict:
+    @property
+    def is_subscription_lookup(self) -> bool:
+        # REST API paths may carry the stage, e.g. `/dev/api/v1/...`
+        return self.is_post and self.path.rstrip("/").endswith(SUBSCRIPTION_LOOKUP_PATH)
+
+    def header(self, name: str) -> str | None:
+        """
+        Header value by case-insensitive name (HTTP APIs lowercase them).
+        """
+        if not self.headers:
+            return None
+        if (value := self.headers.get(name)) is not None:
+            return value
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return None
+
+    def parse_body(self) -> dict | list:
         if self.body:
             return json.loads(self.body)
         return {}
 
+    def parse_payload(self) -> "SubscriptionEventPayload | list":
+        """
+        Validate a webhook body straight from its JSON text, in one pass. A
+        JSON array is a batch: its raw events are returned as a list and
+        validated one by one by the batch path.
+        """
+        if not self.body:
+            return SUBSCRIPTION_EVENT_ADAPTER.validate_python({})
+        if self.body.lstrip()[:1] == "[":
+            return json.loads(self.body)
+        return SUBSCRIPTION_EVENT_ADAPTER.validate_json(self.body)
+
 
 class MetadataSchema(BaseModel):
     planSku: str
@@ -50,14 +109,14 @@ class MetadataSchema(BaseModel):
 class SubscriptionEventPayload(BaseModel):
     eventId: str
     eventType: str
-    timestamp: str
+    timestamp: Iso8601
     provider: str
     subscriptionId: str
     paymentId: Optional[str] = None
     userId: str
     customerId: str
-    expiresAt: str
-    cancelledAt: Optional[str] = None
+    expiresAt: Iso8601
+    cancelledAt: Optional[Iso8601] = None
     metadata: MetadataSchema
 
     @property
@@ -87,3 +146,23 @@ class SubscriptionEventPayload(BaseModel):
     @property
     def is_cancelled(self) -> bool:
         return self.eventType == SubscriptionType.CANCELLED
+
+
+class SubscriptionLookupSchema(BaseModel):
+    userIds: list[str]
+
+
+class QueueRecordSchema(BaseModel):
+    messageId: str
+    body: str
+
+
+class QueueEventSchema(BaseModel):
+    Records: list[QueueRecordSchema]
+
+
+# Validators built once at import and reused by every request
+EVENT_ADAPTER = TypeAdapter(EventSchema)
+SUBSCRIPTION_EVENT_ADAPTER = TypeAdapter(SubscriptionEventPayload)
+QUEUE_EVENT_ADAPTER = TypeAdapter(QueueEventSchema)
+SUBSCRIPTION_LOOKUP_ADAPTER = TypeAdapter(SubscriptionLookupSchema)
@@ -0,0 +1,1329 @@
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+try:
+    # For local development
+    from ..config import Config
+    from ..db.backends import FaultInjectingBackend, MemoryBackend
+    from ..db.cache import ItemCache
+    from ..db.dynamo import (
+        DynamoFender,
+        PlanTable,
+        SubscriptionsAndPlansTable,
+        SubscriptionTable,
+    )
+    from ..db.export import write_ndjson
+    from ..db.resilience import (
+        AdaptiveRateLimiter,
+        CircuitBreaker,
+        TableGuard,
+        TableUnavailable,
+    )
+    from ..db.serializers import convert_dynamo_items, deserialize_item
+    from ..db.session import DynamoSession
+    from ..db.tables import DynamoFenderTables
+    from ..main import handler
+    from ..models import models
+    from ..models.analytics import SubscriptionAnalytics
+    from ..models.idempotency import EventIdempotency
+    from ..models.loader import BulkLoader
+    from ..models.models import (
+        CurrentSubscriptionView,
+        PlanModel,
+        PlanRecord,
+        SubscriptionModel,
+        SubscriptionRecord,
+    )
+    from ..models.replay import ReplayEngine
+    from ..routes import Router
+    from ..schemas.schemas import EVENT_ADAPTER, EventSchema, SubscriptionEventPayload
+    from ..utils import encoding
+    from ..utils.encoding import OrjsonEncoder, RawJSON, StdlibEncoder
+    from ..utils.metrics import span, timed
+    from ..utils.response import success_response
+    from ..utils.utils import epoch_millis, parse_iso8601
+    from .main import (
+        ACTIVE_PLAN_ITEM,
+        AWS_GET_EVENT_SUBSCRIPTION,
+        AWS_POST_EVENT_CREATE_SUBSCRIPTION,
+        CANCELLED_SUBSCRIPTION_EVENT,
+        CREATED_SUBSCRIPTION_EVENT,
+        RENEWED_SUBSCRIPTION_EVENT,
+        base_aws_post_event,
+    )
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.backends import FaultInjectingBackend, MemoryBackend
+    from db.cache import ItemCache
+    from db.dynamo import (
+        DynamoFender,
+        PlanTable,
+        SubscriptionsAndPlansTable,
+        SubscriptionTable,
+    )
+    from db.export import write_ndjson
+    from db.resilience import (
+        AdaptiveRateLimiter,
+        CircuitBreaker,
+        TableGuard,
+        TableUnavailable,
+    )
+    from db.serializers import convert_dynamo_items, deserialize_item
+    from db.session import DynamoSession
+    from db.tables import DynamoFenderTables
+    from main import handler
+    from models import models
+    from models.analytics import SubscriptionAnalytics
+    from models.idempotency import EventIdempotency
+    from models.loader import BulkLoader
+    from models.models import (
+        CurrentSubscriptionView,
+        PlanModel,
+        PlanRecord,
+        SubscriptionModel,
+        SubscriptionRecord,
+    )
+    from models.replay import ReplayEngine
+    from routes import Router
+    from schemas.schemas import EVENT_ADAPTER, EventSchema, SubscriptionEventPayload
+    from tests.main import (
+        ACTIVE_PLAN_ITEM,
+        AWS_GET_EVENT_SUBSCRIPTION,
+        AWS_POST_EVENT_CREATE_SUBSCRIPTION,
+        CANCELLED_SUBSCRIPTION_EVENT,
+        CREATED_SUBSCRIPTION_EVENT,
+        RENEWED_SUBSCRIPTION_EVENT,
+        base_aws_post_event,
+    )
+    from utils import encoding
+    from utils.encoding import OrjsonEncoder, RawJSON, StdlibEncoder
+    from utils.metrics import span, timed
+    from utils.response import success_response
+    from utils.utils import epoch_millis, parse_iso8601
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `import main` budget, measured in the Lambda package layout
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "800"))
+# Modules that must never be imported on the handler's cold-start path
+COLD_START_FORBIDDEN_MODULES = ("faker", "dotenv")
+
+
+class FakeDynamoHandler(BaseHTTPRequestHandler):
+    """
+    Minimal DynamoDB JSON endpoint. It answers every call with an empty
+    result and counts the TCP connections it accepts.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body as one segment so Nagle does not skew timings
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        target = self.headers.get("X-Amz-Target", "")
+        body = {}
+        if target.endswith(".Query"):
+            body = {"Items": [], "Count": 0, "ScannedCount": 0}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_dynamo(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDynamoHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    endpoint = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "bench")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "bench")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr(Config, "DYNAMODB_ENDPOINT_URL", endpoint)
+    DynamoSession.reset()
+
+    yield server
+
+    DynamoSession.reset()
+    server.shutdown()
+    server.server_close()
+
+
+def _legacy_tables(endpoint: str) -> list:
+    """
+    Previous behaviour: one resource and one client per table, built eagerly.
+    """
+    session = boto3.session.Session()
+    tables = []
+    for tablename in ("FenderSubscriptions", "FenderPlans", "fender_digital"):
+        dynamodb = session.resource("dynamodb", endpoint_url=endpoint)
+        client = session.client("dynamodb", endpoint_url=endpoint)
+        tables.append((dynamodb.Table(tablename), client))
+    return tables
+
+
+def test_benchmark_session_cold_start(fake_dynamo):
+    # Pay the process-wide one-time costs (lazy botocore imports) up front,
+    # so neither side is charged for them; collections triggered by whatever
+    # earlier tests left on the heap would likewise land on either side
+    _legacy_tables(Config.DYNAMODB_ENDPOINT_URL)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        tables = [SubscriptionTable(), PlanTable(), SubscriptionsAndPlansTable()]
+        shared_init = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tables[-1].get_by_pk("plan:bench")
+        shared_first_call = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table, _ = _legacy_tables(Config.DYNAMODB_ENDPOINT_URL)[-1]
+        legacy_init = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table.query(KeyConditionExpression=Key("pk").eq("plan:bench"))
+        legacy_first_call = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    print(
+        f"\ncold start: legacy init={legacy_init * 1000:.1f}ms "
+        f"first call={legacy_first_call * 1000:.1f}ms | "
+        f"shared init={shared_init * 1000:.3f}ms "
+        f"first call={shared_first_call * 1000:.1f}ms"
+    )
+    assert shared_init < legacy_init
+    # Building lazily moves most of the cost into the first call, so the two
+    # totals are close and only compared on an otherwise idle machine
+    if ASSERT_BENCHMARK_SPEEDUPS:
+        assert shared_init + shared_first_call < legacy_init + legacy_first_call
+
+
+def test_benchmark_session_warm_requests(fake_dynamo):
+    requests = 100
+    key = {"pk": {"S": "plan:bench"}, "sk": {"S": "meta"}}
+    condition = Key("pk").eq("plan:bench")
+
+    legacy_tables = _legacy_tables(Config.DYNAMODB_ENDPOINT_URL)
+    start = time.perf_counter()
+    for _ in range(requests):
+        for table, client in legacy_tables:
+            table.query(KeyConditionExpression=condition)
+            client.get_item(TableName=table.name, Key=key)
+    legacy = time.perf_counter() - start
+    legacy_connections = fake_dynamo.connections
+
+    fake_dynamo.connections = 0
+    tables = [SubscriptionTable(), PlanTable(), SubscriptionsAndPlansTable()]
+    start = time.perf_counter()
+    for _ in range(requests):
+        for shared in tables:
+            shared.backend.table.query(KeyConditionExpression=condition)
+            shared.backend.client.get_item(TableName=shared.tablename, Key=key)
+    elapsed = time.perf_counter() - start
+    shared_connections = fake_dynamo.connections
+
+    print(
+        f"\nwarm x{requests}: legacy={legacy * 1000:.1f}ms "
+        f"({legacy_connections} connections) "
+        f"shared={elapsed * 1000:.1f}ms ({shared_connections} connections)"
+    )
+    # one connection for the resource and one for the low-level client,
+    # however many tables use them
+    assert shared_connections == 2
+    assert shared_connections < legacy_connections
+
+
+def import_time_report(module: str = "main") -> dict:
+    """
+    Import `module` in a fresh interpreter with `-X importtime`, laid out the
+    way the Lambda package is, and return `{module: (self_us, cumulative_us)}`.
+    """
+    env = {**os.environ, "AWS_LAMBDA_FUNCTION_NAME": "import-time-report"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    report = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        report[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return report
+
+
+def test_cold_start_import_budget():
+    # Best of three runs to keep the check stable on noisy machines
+    reports = [import_time_report() for _ in range(3)]
+    report = min(reports, key=lambda report: report["main"][1])
+    total_ms = report["main"][1] / 1000
+
+    heaviest = sorted(report.items(), key=lambda item: item[1][0], reverse=True)
+    print(f"\n`import main`: {total_ms:.1f}ms (budget {IMPORT_TIME_BUDGET_MS}ms)")
+    for name, (self_us, cumulative_us) in heaviest[:10]:
+        print(
+            f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms total  {name}"
+        )
+
+    loaded = [
+        name for name in report if name.split(".")[0] in COLD_START_FORBIDDEN_MODULES
+    ]
+    assert not loaded, f"Forbidden modules on the cold-start path: {loaded}"
+    assert total_ms < IMPORT_TIME_BUDGET_MS
+
+
+PLAN_ITEM = {
+    "pk": "plan:DEF789",
+    "sk": "metadata",
+    "type": "plan",
+    "name": "Enterprise Plan",
+    "price": Decimal("499.99"),
+    "currency": "USD",
+    "billingCycle": "yearly",
+    "features": [
+        "Custom integrations",
+        "Dedicated account manager",
+        "24/7 phone support",
+        "Unlimited storage",
+        "Advanced analytics",
+    ],
+    "status": "active",
+    "lastModified": "2024-06-10T12:00:00Z",
+}
+SUBSCRIPTION_ITEM = {
+    "pk": "user:123",
+    "sk": "sub:sub_456789",
+    "type": "sub",
+    "planSku": "plan:DEF789",
+    "startDate": "2024-03-20T10:00:00Z",
+    "expiresAt": "2024-05-20T10:00:00Z",
+    "cancelledAt": "2024-05-20T10:00:00Z",
+    "lastModified": "2024-05-20T10:00:00Z",
+    "internalStatus": "cancelled",
+    "attributes": {
+        "provider": "STRIPE",
+        "paymentId": "pm_654321",
+        "customerId": "cus_789012",
+        "autoRenew": False,
+        "paymentMethod": "CREDIT_CARD",
+    },
+}
+
+
+def _best_of(call, rounds: int = 5, iterations: int = 2000) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        timings.append((time.perf_counter() - start) / iterations)
+    return min(timings)
+
+
+def test_benchmark_item_deserialization():
+    items = [PLAN_ITEM, SUBSCRIPTION_ITEM] * 5
+    serializer = TypeSerializer()
+    deserializer = TypeDeserializer()
+    wire_items = [
+        {name: serializer.serialize(value) for name, value in item.items()}
+        for item in items
+    ]
+
+    def legacy_resource():
+        return json.loads(json.dumps(items, default=str))
+
+    def legacy_wire():
+        deserialized = [
+            {name: deserializer.deserialize(value) for name, value in item.items()}
+            for item in wire_items
+        ]
+        return json.loads(json.dumps(deserialized, default=str))
+
+    results = {
+        "json round trip": _best_of(legacy_resource),
+        "convert_dynamo_items": _best_of(lambda: convert_dynamo_items(items)),
+        "TypeDeserializer + json round trip": _best_of(legacy_wire),
+        "deserialize_item (client reads)": _best_of(
+            lambda: [deserialize_item(item) for item in wire_items]
+        ),
+    }
+
+    print(f"\n{len(items)} plan/subscription items per call:")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000:8.1f}us  {name}")
+
+    assert convert_dynamo_items(items)[0]["price"] == 499.99
+    assert results["convert_dynamo_items"] < results["json round trip"]
+    assert (
+        results["deserialize_item (client reads)"]
+        < results["TypeDeserializer + json round trip"]
+    )
+
+
+def _legacy_parse_iso8601(date_string: str) -> datetime:
+    return datetime.fromisoformat(date_string.replace("Z", "+00:00")).astimezone(
+        timezone.utc
+    )
+
+
+def test_benchmark_date_codec():
+    """
+    Status checks of a cancelled subscription, parsing its dates on every
+    check as before and comparing the epoch shadows, and the parser itself
+    without its cache.
+    """
+    subscription = SubscriptionModel(**SUBSCRIPTION_ITEM)
+    date_string = SUBSCRIPTION_ITEM["lastModified"]
+
+    def legacy_status():
+        # `is_pending` and then `is_cancelled`, two parses each
+        last_modified = _legacy_parse_iso8601(subscription.lastModified)
+        if last_modified < _legacy_parse_iso8601(subscription.expiresAt):
+            return "pending"
+        last_modified = _legacy_parse_iso8601(subscription.lastModified)
+        if last_modified >= _legacy_parse_iso8601(subscription.expiresAt):
+            return "cancelled"
+
+    results = {
+        "fromisoformat + astimezone": _best_of(
+            lambda: _legacy_parse_iso8601(date_string)
+        ),
+        "parse_iso8601 (uncached)": _best_of(
+            lambda: parse_iso8601.__wrapped__(date_string)
+        ),
+        "parse_iso8601": _best_of(lambda: parse_iso8601(date_string)),
+        "status from strings": _best_of(legacy_status),
+        "compute_status (epoch shadows)": _best_of(subscription.compute_status),
+    }
+
+    print("\nDate handling per call:")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000:8.3f}us  {name}")
+
+    assert legacy_status() == subscription.compute_status()
+    assert subscription.lastModifiedMs == epoch_millis(date_string)
+    assert results["parse_iso8601"] < results["fromisoformat + astimezone"]
+    assert results["compute_status (epoch shadows)"] < results["status from strings"]
+
+
+# Stored per-route results of `test_benchmark_handler_routes`
+HANDLER_BASELINES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "handler_baselines.json"
+)
+# Allowed growth over the baseline before the benchmark fails (1.5 = +50%)
+HANDLER_LATENCY_THRESHOLD = float(os.getenv("HANDLER_LATENCY_THRESHOLD", "1.5"))
+# p99 moves more between runs than p50, so it gets more room
+HANDLER_TAIL_THRESHOLD = float(os.getenv("HANDLER_TAIL_THRESHOLD", "2.0"))
+HANDLER_ALLOCATION_THRESHOLD = float(os.getenv("HANDLER_ALLOCATION_THRESHOLD", "1.2"))
+# Latencies swing with the load on the machine, so only the allocation
+# baselines are checked unless this is set
+ASSERT_HANDLER_LATENCY = os.getenv("ASSERT_HANDLER_LATENCY", "false").lower() == "true"
+# Set to `true` to record the current results as the new baselines
+UPDATE_BENCHMARK_BASELINES = (
+    os.getenv("UPDATE_BENCHMARK_BASELINES", "false").lower() == "true"
+)
+HANDLER_BENCHMARK_USERS = int(os.getenv("HANDLER_BENCHMARK_USERS", "300"))
+HANDLER_BENCHMARK_ROUNDS = int(os.getenv("HANDLER_BENCHMARK_ROUNDS", "3"))
+
+
+@pytest.fixture
+def memory_tables(monkeypatch):
+    """
+    Run the handler against a `MemoryBackend`, so only our own code is timed.
+    """
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    backend = MemoryBackend([ACTIVE_PLAN_ITEM])
+    monkeypatch.setattr(table, "backend", backend)
+    monkeypatch.setattr(
+        table, "cache", ItemCache(prefix_ttls={"plan:": Config.ITEM_CACHE_PLAN_TTL})
+    )
+    monkeypatch.setattr(models, "EVENT_IDEMPOTENCY", EventIdempotency(table))
+    return backend
+
+
+def _get_event(user_id: str) -> dict:
+    return {
+        **AWS_GET_EVENT_SUBSCRIPTION,
+        "path": f"/api/v1/subscriptions/{user_id}",
+        "pathParameters": {"userId": user_id},
+    }
+
+
+def _webhook_event(event: dict, user_id: str) -> dict:
+    metadata = {**event["metadata"], "planSku": ACTIVE_PLAN_ITEM["pk"]}
+    return base_aws_post_event(
+        {
+            **event,
+            "eventId": f"{event['eventId']}_{user_id}",
+            "userId": user_id,
+            "metadata": metadata,
+        }
+    )
+
+
+def handler_workload(users: int, prefix: str) -> list[tuple[str, dict]]:
+    """
+    `(route, event)` pairs: every user is created, renewed and cancelled, and
+    read back after each step, one phase at a time across all users.
+    """
+    user_ids = [f"{prefix}{index}" for index in range(users)]
+    phases = [
+        ("POST created", CREATED_SUBSCRIPTION_EVENT),
+        ("GET", None),
+        ("POST renewed", RENEWED_SUBSCRIPTION_EVENT),
+        ("GET", None),
+        ("POST cancelled", CANCELLED_SUBSCRIPTION_EVENT),
+        ("GET", None),
+    ]
+
+    return [
+        (
+            route,
+            _get_event(user_id) if event is None else _webhook_event(event, user_id),
+        )
+        for route, event in phases
+        for user_id in user_ids
+    ]
+
+
+def _percentile(samples: list[int], percentile: float) -> int:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def run_handler_workload(workload: list[tuple[str, dict]]) -> dict:
+    """
+    Time every handler call and return per-route latency stats in ms.
+    """
+    timings = {}
+    # Like `timeit`, keep collector pauses out of individual samples
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for route, event in workload:
+            call_start = time.perf_counter_ns()
+            response = handler(event, {})
+            timings.setdefault(route, []).append(time.perf_counter_ns() - call_start)
+            assert response["statusCode"] == 200, response
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    results = {
+        route: {
+            "requests": len(samples),
+            "p50_ms": _percentile(samples, 0.50) / 1e6,
+            "p99_ms": _percentile(samples, 0.99) / 1e6,
+            "max_ms": max(samples) / 1e6,
+            "rps": len(samples) / (sum(samples) / 1e9),
+        }
+        for route, samples in timings.items()
+    }
+    results["total"] = {"requests": len(workload), "rps": len(workload) / elapsed}
+    return results
+
+
+def handler_peak_allocations(workload: list[tuple[str, dict]]) -> dict:
+    """
+    Largest traced allocation peak of a single call, per route, in KiB. It is
+    a separate pass because tracing slows every allocation down.
+    """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for route, event in workload:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            handler(event, {})
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[route] = max(peaks.get(route, 0), (peak - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def calibration_ms() -> float:
+    """
+    Time of a fixed pure-Python task (a JSON round trip of a webhook body).
+    Latency baselines are stored in multiples of it, so they carry over
+    between machines and are not thrown off by CPU frequency changes.
+    """
+    body = json.dumps(CREATED_SUBSCRIPTION_EVENT)
+    return (
+        _best_of(lambda: json.dumps(json.loads(body)), rounds=7, iterations=1000) * 1000
+    )
+
+
+def _regressions(results: dict, baselines: dict) -> list[str]:
+    limits = {"peak_kib": HANDLER_ALLOCATION_THRESHOLD}
+    if ASSERT_HANDLER_LATENCY:
+        limits["p50_units"] = HANDLER_LATENCY_THRESHOLD
+        limits["p99_units"] = HANDLER_TAIL_THRESHOLD
+    regressions = []
+    for route, baseline in baselines.items():
+        for metric, threshold in limits.items():
+            if metric not in baseline or route not in results:
+                continue
+            if results[route][metric] > baseline[metric] * threshold:
+                regressions.append(
+                    f"{route} {metric}: {results[route][metric]:.3f} > "
+                    f"{baseline[metric]:.3f} x {threshold}"
+                )
+    return regressions
+
+
+def test_benchmark_handler_routes(memory_tables):
+    # Warm up imports, validators and the plan cache on separate users
+    run_handler_workload(handler_workload(20, prefix="warmup-"))
+
+    # Best of several rounds, each on new users, to keep the check stable
+    rounds = []
+    for index in range(HANDLER_BENCHMARK_ROUNDS):
+        before_ms = calibration_ms()
+        result = run_handler_workload(
+            handler_workload(HANDLER_BENCHMARK_USERS, prefix=f"bench{index}-")
+        )
+        # Calibrated on both sides of the round, in case the CPU clock moved
+        unit_ms = (before_ms + calibration_ms()) / 2
+        for route, stats in result.items():
+            if route != "total":
+                stats["p50_units"] = stats["p50_ms"] / unit_ms
+                stats["p99_units"] = stats["p99_ms"] / unit_ms
+        rounds.append(result)
+
+    results = {
+        route: {
+            metric: (max if metric == "rps" else min)(
+                result[route][metric] for result in rounds
+            )
+            for metric in stats
+        }
+        for route, stats in rounds[0].items()
+    }
+    peaks = handler_peak_allocations(handler_workload(50, prefix="alloc-"))
+    for route, peak in peaks.items():
+        results[route]["peak_kib"] = peak
+
+    print(f"\nhandler x{results['total']['requests']}:")
+    for route, stats in results.items():
+        if route == "total":
+            continue
+        print(
+            f"  {route:15} p50={stats['p50_ms']:.3f}ms ({stats['p50_units']:.1f}u) "
+            f"p99={stats['p99_ms']:.3f}ms ({stats['p99_units']:.1f}u) "
+            f"max={stats['max_ms']:.3f}ms {stats['rps']:.0f} rps "
+            f"peak={stats['peak_kib']:.1f}KiB"
+        )
+    print(f"  {'total':15} {results['total']['rps']:.0f} rps")
+
+    if UPDATE_BENCHMARK_BASELINES or not os.path.exists(HANDLER_BASELINES_PATH):
+        baselines = {
+            route: {
+                metric: round(value, 4)
+                for metric, value in stats.items()
+                if metric in ("p50_units", "p99_units", "peak_kib")
+            }
+            for route, stats in results.items()
+            if route != "total"
+        }
+        with open(HANDLER_BASELINES_PATH, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write("\n")
+        return
+
+    with open(HANDLER_BASELINES_PATH) as file:
+        baselines = json.load(file)
+
+    regressions = _regressions(results, baselines)
+    assert not regressions, "Handler regressed past its baseline:\n" + "\n".join(
+        regressions
+    )
+
+
+def test_benchmark_disabled_metrics_overhead():
+    def call():
+        return None
+
+    wrapped = timed("benchmark")(call)
+
+    def with_span():
+        with span("benchmark"):
+            return None
+
+    bare = _best_of(call, iterations=20000)
+    results = {
+        "timed": _best_of(wrapped, iterations=20000) - bare,
+        "span": _best_of(with_span, iterations=20000) - bare,
+    }
+
+    print("\ndisabled metrics overhead per call:")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000_000:8.1f}ns  {name}")
+
+    # Far below the microseconds a single DynamoDB call costs in our own code
+    assert results["timed"] < 1e-6
+    assert results["span"] < 1e-6
+
+
+class _LegacyRouter(BaseModel):
+    """
+    Previous `Router`: a pydantic model, so it re-validated the event.
+    """
+
+    event: EventSchema
+
+
+def test_benchmark_request_parsing():
+    event = AWS_POST_EVENT_CREATE_SUBSCRIPTION
+
+    def legacy():
+        schema = EventSchema(**event)
+        router = _LegacyRouter(event=schema)
+        return SubscriptionEventPayload(**router.event.parse_body())
+
+    def single_pass():
+        return Router(EVENT_ADAPTER.validate_python(event)).event.parse_payload()
+
+    assert legacy() == single_pass()
+    results = {
+        "EventSchema + Router model + json.loads": _best_of(legacy),
+        "TypeAdapter + validate_json": _best_of(single_pass),
+    }
+
+    print("\nwebhook request parsing per call:")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000:8.1f}us  {name}")
+
+    assert (
+        results["TypeAdapter + validate_json"]
+        < results["EventSchema + Router model + json.loads"]
+    )
+
+
+GET_RESPONSE_DATA = {
+    "userId": "user:123",
+    "subscriptionId": "sub:sub_456789",
+    "plan": {
+        "sku": PLAN_ITEM["pk"],
+        "name": PLAN_ITEM["name"],
+        "price": 499.99,
+        "currency": PLAN_ITEM["currency"],
+        "billingCycle": PLAN_ITEM["billingCycle"],
+        "features": PLAN_ITEM["features"],
+    },
+    "startDate": "2024-03-20T10:00:00Z",
+    "expiresAt": "2024-05-20T10:00:00Z",
+    "status": "active",
+    "attributes": {"autoRenew": True, "paymentMethod": "CREDIT_CARD"},
+}
+
+
+def test_benchmark_response_encoding(monkeypatch):
+    message = "User subscription retrieved successfully"
+    plan = RawJSON(StdlibEncoder().dumps(GET_RESPONSE_DATA["plan"]))
+    data = {**GET_RESPONSE_DATA, "plan": plan}
+
+    def legacy():
+        return json.dumps({"message": message, "data": GET_RESPONSE_DATA})
+
+    encoders = [StdlibEncoder()]
+    if encoding.orjson is not None:
+        encoders.append(OrjsonEncoder())
+
+    results = {"json.dumps (previous)": _best_of(legacy)}
+    for encoder in encoders:
+        monkeypatch.setattr(encoding, "ENCODER", encoder)
+        body = success_response(message, data=data)["body"]
+        assert json.loads(body) == json.loads(legacy())
+        results[encoder.name] = _best_of(lambda: success_response(message, data=data))
+
+    print("\nGET response encoding per call:")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000:8.1f}us  {name}")
+
+    # The stdlib fallback is about as fast as before; orjson is the speed-up
+    if ASSERT_BENCHMARK_SPEEDUPS:
+        assert results["json"] < results["json.dumps (previous)"] * 1.5
+        if "orjson" in results:
+            assert results["orjson"] < results["json.dumps (previous)"]
+
+
+def test_benchmark_conditional_get(memory_tables):
+    handler(_webhook_event(CREATED_SUBSCRIPTION_EVENT, "polling"), {})
+    event = _get_event("polling")
+    full = handler(event, {})
+    etag = full["headers"]["ETag"]
+
+    headers = {**event["headers"], "If-None-Match": etag}
+    conditional_event = {**event, "headers": headers}
+    assert handler(conditional_event, {})["statusCode"] == 304
+
+    results = {
+        "200 with body": _best_of(lambda: handler(event, {}), iterations=500),
+        "304 If-None-Match": _best_of(
+            lambda: handler(conditional_event, {}), iterations=500
+        ),
+    }
+
+    print(f"\npolling GET per call ({len(full['body'])} body bytes on 200):")
+    for name, seconds in results.items():
+        print(f"  {seconds * 1_000_000:8.1f}us  {name}")
+
+    # A revalidation reads the same items but skips building and encoding
+    assert results["304 If-None-Match"] < results["200 with body"] * 1.1
+
+
+def test_benchmark_current_view_get(memory_tables):
+    """
+    GET cost as a user's subscription history grows, from the current view
+    and from the partition query the view replaces.
+    """
+    results = {}
+    for history in (1, 100, 1000):
+        user_id = f"history{history}"
+        for index in range(history - 1):
+            memory_tables.put_item(
+                {
+                    **SUBSCRIPTION_ITEM,
+                    "pk": f"user:{user_id}",
+                    "sk": f"sub:old{index:04d}",
+                    "planSku": ACTIVE_PLAN_ITEM["pk"],
+                    "startDate": "2023-01-01T00:00:00Z",
+                }
+            )
+        handler(_webhook_event(CREATED_SUBSCRIPTION_EVENT, user_id), {})
+        event = _get_event(user_id)
+
+        with_view = _best_of(lambda: handler(event, {}), iterations=20)
+
+        # The fallback writes the view back, so every call starts without it
+        def without_view_get(key={"pk": f"user:{user_id}", "sk": "current"}):
+            memory_tables.delete_item(key)
+            return handler(event, {})
+
+        without_view = _best_of(without_view_get, iterations=20)
+        results[history] = (with_view, without_view)
+
+    print("\nGET per call by subscriptions in the user's history:")
+    for history, (with_view, without_view) in results.items():
+        print(
+            f"  {history:5} subscriptions: {with_view * 1_000_000:8.1f}us view, "
+            f"{without_view * 1_000_000:8.1f}us partition query"
+        )
+
+    # One GetItem whatever the history; the query grows with it
+    assert results[1000][0] < results[1][0] * 2
+    assert results[1000][0] * 5 < results[1000][1]
+
+
+def _retained(build) -> tuple[object, int]:
+    """
+    What `build` returns and the bytes it still holds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return built, retained
+
+
+def test_benchmark_trusted_records():
+    """
+    Reading table items as validated pydantic models, as every read did
+    before, and as slotted records, per GET (one view item) and per batch
+    of 10k subscription items.
+    """
+    plan_item = {**PLAN_ITEM, "price": float(PLAN_ITEM["price"])}
+    view_item = CurrentSubscriptionView.item(
+        SUBSCRIPTION_ITEM, PlanRecord.from_item(plan_item)
+    )
+    items = [
+        {**SUBSCRIPTION_ITEM, "pk": f"user:{index}", "sk": f"sub:{index}"}
+        for index in range(10_000)
+    ]
+
+    def legacy_get():
+        subscription = SubscriptionModel(
+            **{**view_item, "sk": view_item["subscriptionId"], "type": "sub"}
+        )
+        return subscription.compute_status(), PlanModel(**view_item["plan"])
+
+    def record_get():
+        subscription, plan = CurrentSubscriptionView.load(view_item)
+        return subscription.compute_status(), plan
+
+    get_timings = {
+        "models": _best_of(legacy_get),
+        "records": _best_of(record_get),
+    }
+    batch_timings = {
+        "models": _best_of(lambda: [SubscriptionModel(**item) for item in items], 3, 1),
+        "records": _best_of(
+            lambda: [SubscriptionRecord.from_item(item) for item in items], 3, 1
+        ),
+    }
+    models, models_bytes = _retained(
+        lambda: [SubscriptionModel(**item) for item in items]
+    )
+    records, records_bytes = _retained(
+        lambda: [SubscriptionRecord.from_item(item) for item in items]
+    )
+
+    print("\nTable reads as validated models and as records:")
+    for name in ("models", "records"):
+        print(f"  {get_timings[name] * 1_000_000:8.1f}us  per GET, {name}")
+    print(
+        f"  {batch_timings['models'] * 1000:8.1f}ms  10k items, models "
+        f"({models_bytes / len(items):.0f} bytes each)"
+    )
+    print(
+        f"  {batch_timings['records'] * 1000:8.1f}ms  10k items, records "
+        f"({records_bytes / len(items):.0f} bytes each)"
+    )
+
+    assert [record.compute_status() for record in records[:3]] == [
+        model.compute_status() for model in models[:3]
+    ]
+    assert legacy_get()[0] == record_get()[0]
+    assert get_timings["records"] < get_timings["models"]
+    assert batch_timings["records"] < batch_timings["models"]
+    assert records_bytes < models_bytes
+
+
+ANALYTICS_BENCHMARK_SUBSCRIPTIONS = int(
+    os.getenv("ANALYTICS_BENCHMARK_SUBSCRIPTIONS", "1000000")
+)
+# Loading and aggregating the whole benchmark set on one core
+ANALYTICS_BUDGET_SECONDS = float(os.getenv("ANALYTICS_BUDGET_SECONDS", "10"))
+
+
+def analytics_items(subscriptions: int) -> list[dict]:
+    """
+    Subscription items over three plans, started through 2024 and with one
+    in four cancelled. Timestamps come from a small pool to keep memory low.
+    """
+    plans = [
+        {**PLAN_ITEM, "pk": f"plan:BENCH{index}", "billingCycle": cycle}
+        for index, cycle in enumerate(("monthly", "monthly", "yearly"))
+    ]
+    days = [
+        f"2024-{month:02d}-{day:02d}T10:00:00Z"
+        for month in range(1, 13)
+        for day in range(1, 29)
+    ]
+    renewals = [day.replace("2024", "2025") for day in days]
+
+    items = list(plans)
+    for index in range(subscriptions):
+        item = {
+            "pk": f"user:{index}",
+            "sk": "sub:1",
+            "type": "sub",
+            "planSku": plans[index % len(plans)]["pk"],
+            "startDate": days[index % len(days)],
+            "expiresAt": renewals[index % len(renewals)],
+            "lastModified": days[index % len(days)],
+        }
+        if index % 4 == 0:
+            item["cancelledAt"] = days[(index * 7) % len(days)]
+        items.append(item)
+    return items
+
+
+def test_benchmark_subscription_analytics():
+    pytest.importorskip("numpy")
+    items = analytics_items(ANALYTICS_BENCHMARK_SUBSCRIPTIONS)
+    sample = [item for item in items[:10_000] if item["type"] == "sub"]
+
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        analytics = SubscriptionAnalytics(items)
+        loaded = time.perf_counter()
+        counts = analytics.status_counts("2024-12-31T00:00:00Z")
+        mrr = analytics.mrr_by_plan("2024-12-31T00:00:00Z")
+        churn = analytics.churn("2024-06-01T00:00:00Z", "2025-06-01T00:00:00Z")
+        aggregated = time.perf_counter()
+
+        per_item = _best_of(
+            lambda: [SubscriptionModel(**item).compute_status() for item in sample],
+            rounds=3,
+            iterations=1,
+        )
+    finally:
+        gc.enable()
+
+    assert sum(counts.values()) == ANALYTICS_BENCHMARK_SUBSCRIPTIONS
+    assert sum(plan["subscriptions"] for plan in mrr.values()) == (
+        counts["active"] + counts["pending"]
+    )
+    assert 0 < churn["rate"] < 1
+
+    extrapolated = per_item / len(sample) * ANALYTICS_BENCHMARK_SUBSCRIPTIONS
+    print(f"\nsubscription analytics over {ANALYTICS_BENCHMARK_SUBSCRIPTIONS} items:")
+    print(f"  {loaded - start:8.2f}s  load into columns")
+    print(f"  {aggregated - loaded:8.2f}s  status mix, MRR by plan and churn")
+    print(f"  {extrapolated:8.2f}s  SubscriptionModel + compute_status (extrapolated)")
+
+    assert aggregated - start < ANALYTICS_BUDGET_SECONDS
+
+
+# Wall-clock speed-ups and latency bounds depend on the machine being
+# otherwise idle, so they are only asserted when this is set
+ASSERT_BENCHMARK_SPEEDUPS = (
+    os.getenv("ASSERT_BENCHMARK_SPEEDUPS", "false").lower() == "true"
+)
+
+
+def _network_backend(
+    items: list[dict] | None, round_trip: float, operations: set[str]
+) -> FaultInjectingBackend:
+    """
+    `MemoryBackend` whose `operations` take `round_trip` seconds each, as
+    they would against DynamoDB.
+    """
+    return FaultInjectingBackend(
+        MemoryBackend(items),
+        latency=round_trip,
+        slow_operations=frozenset(operations),
+    )
+
+
+def _assert_speedup(baseline: float, improved: float, factor: float) -> None:
+    """
+    Check that `improved` took at most `1 / factor` of `baseline`'s time,
+    if `ASSERT_BENCHMARK_SPEEDUPS` is set.
+    """
+    if ASSERT_BENCHMARK_SPEEDUPS:
+        assert (
+            improved * factor < baseline
+        ), f"{improved:.3f}s is not {factor}x faster than {baseline:.3f}s"
+
+
+def test_benchmark_parallel_scan_export(tmp_path):
+    items = [
+        {
+            **SUBSCRIPTION_ITEM,
+            "pk": f"user:{index}",
+            "sk": f"sub:{index}",
+        }
+        for index in range(10_000)
+    ]
+    table = DynamoFender("export", backend=_network_backend(items, 0.02, {"scan"}))
+
+    results = {}
+    for segments in (1, 8):
+        start = time.perf_counter()
+        count = write_ndjson(
+            table.scan_parallel(total_segments=segments, page_size=125),
+            tmp_path / f"export-{segments}.ndjson.gz",
+        )
+        results[segments] = time.perf_counter() - start
+        assert count == len(items)
+
+    print("\nscan export of 10000 items, 125 per page, 20ms per page:")
+    for segments, seconds in results.items():
+        print(
+            f"  {segments} segment(s): {seconds:6.2f}s {len(items) / seconds:9.0f} items/s"
+        )
+
+    _assert_speedup(results[1], results[8], 2)
+
+
+def test_benchmark_bulk_loader():
+    records = [
+        {
+            **SUBSCRIPTION_ITEM,
+            "pk": f"user:{index}",
+            "sk": f"sub:{index}",
+        }
+        for index in range(5_000)
+    ]
+
+    results = {}
+    for workers in (1, 8):
+        backend = _network_backend(None, 0.01, {"batch_write_request"})
+        table = DynamoFender("seed", backend=backend)
+        report = BulkLoader(table, workers=workers).load(records)
+        assert report.written == len(backend.backend) == len(records)
+        results[workers] = report.items_per_second
+
+    print("\nbulk load of 5000 items, 25 per request, 10ms per request:")
+    for workers, rate in results.items():
+        print(f"  {workers} worker(s): {rate:9.0f} items/s")
+
+    _assert_speedup(1 / results[1], 1 / results[8], 2)
+
+
+def test_benchmark_event_replay(memory_tables, monkeypatch, tmp_path):
+    users = [f"replay{index}" for index in range(100)]
+    log = tmp_path / "events.ndjson"
+    with open(log, "w") as output:
+        for event in (
+            CREATED_SUBSCRIPTION_EVENT,
+            RENEWED_SUBSCRIPTION_EVENT,
+            CANCELLED_SUBSCRIPTION_EVENT,
+        ):
+            for user_id in users:
+                output.write(_webhook_event(event, user_id)["body"] + "\n")
+
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    results = {}
+    for workers in (1, 8):
+        # Idempotency claims and subscription updates
+        backend = _network_backend(
+            [ACTIVE_PLAN_ITEM], 0.005, {"put_item", "update_item"}
+        )
+        monkeypatch.setattr(table, "backend", backend)
+        monkeypatch.setattr(models, "EVENT_IDEMPOTENCY", EventIdempotency(table))
+        engine = ReplayEngine(
+            [str(log)], str(tmp_path / f"work-{workers}"), workers=workers
+        )
+        report = engine.run()
+        assert report.applied == 3 * len(users)
+        assert "cancelledAt" in backend.get("user:replay7", "sub:sub_456789")
+        results[workers] = report.events_per_second
+
+    print("\nreplay of 300 events for 100 users, 5ms per write:")
+    for workers, rate in results.items():
+        print(f"  {workers} worker(s): {rate:9.0f} events/s")
+
+    _assert_speedup(1 / results[1], 1 / results[8], 2)
+
+
+# GetItem, Query and BatchGetItem
+READ_OPERATIONS = {"get_item", "query", "batch_get"}
+
+
+def test_benchmark_subscription_lookup(memory_tables, monkeypatch):
+    backend = _network_backend([ACTIVE_PLAN_ITEM], 0.005, READ_OPERATIONS)
+    monkeypatch.setattr(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, "backend", backend)
+    user_ids = [f"lookup{index}" for index in range(200)]
+    for user_id in user_ids:
+        handler(_webhook_event(CREATED_SUBSCRIPTION_EVENT, user_id), {})
+
+    start = time.perf_counter()
+    singles = [
+        json.loads(handler(_get_event(user_id), {})["body"])["data"]
+        for user_id in user_ids
+    ]
+    one_by_one = time.perf_counter() - start
+
+    event = {
+        **base_aws_post_event({"userIds": user_ids}),
+        "path": "/api/v1/subscriptions/batch",
+        "headers": {},
+    }
+    start = time.perf_counter()
+    response = handler(event, {})
+    batched = time.perf_counter() - start
+
+    assert json.loads(response["body"])["data"]["subscriptions"] == singles
+    print("\nsubscriptions of 200 users, 5ms per read:")
+    print(f"  {one_by_one * 1000:8.1f}ms  200 GET requests")
+    print(f"  {batched * 1000:8.1f}ms  one lookup (BatchGetItem)")
+
+    _assert_speedup(one_by_one, batched, 10)
+
+
+# Round trip of one request in the throttling simulation
+THROTTLING_SERVICE_TIME = 0.005
+
+
+def _simulate_throttling(policy, error_rate: float, requests: int) -> dict:
+    """
+    Virtual-time run of `requests` GetItem calls against a table throttling
+    `error_rate` of them, through the guard `policy(clock, sleep)` builds.
+    Returns the sorted call durations and the calls that succeeded.
+    """
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    def clock() -> float:
+        return now[0]
+
+    backend = FaultInjectingBackend(
+        MemoryBackend([SUBSCRIPTION_ITEM]), error_rate=error_rate, seed=7
+    )
+    guard = policy(clock, sleep)
+    key = {"pk": SUBSCRIPTION_ITEM["pk"], "sk": SUBSCRIPTION_ITEM["sk"]}
+
+    def get_item():
+        sleep(THROTTLING_SERVICE_TIME)
+        return backend.get_item(key)
+
+    durations = []
+    succeeded = 0
+    for _ in range(requests):
+        started = now[0]
+        try:
+            guard.call(get_item)
+            succeeded += 1
+        except (TableUnavailable, ClientError):
+            pass
+        durations.append(now[0] - started)
+        # Requests arrive every 20ms
+        now[0] = max(now[0], started + 0.02)
+
+    durations.sort()
+    return {"durations": durations, "succeeded": succeeded}
+
+
+def test_benchmark_throttling_tail_latency():
+    """
+    Call durations while the table throttles part of the requests and
+    during an outage, under botocore's standard retry mode (3 attempts,
+    backoff up to 1s and 2s) and under `TableGuard`.
+    """
+    random.seed(0)
+
+    def botocore_standard(clock, sleep) -> TableGuard:
+        return TableGuard(
+            max_attempts=3,
+            base_delay=1.0,
+            max_delay=20.0,
+            retry_budget=float("inf"),
+            sleep=sleep,
+            clock=clock,
+        )
+
+    def guarded(clock, sleep) -> TableGuard:
+        return TableGuard(
+            limiter=AdaptiveRateLimiter(clock=clock, sleep=sleep),
+            breaker=CircuitBreaker(
+                Config.DYNAMODB_CIRCUIT_FAILURE_THRESHOLD,
+                Config.DYNAMODB_CIRCUIT_RESET_TIMEOUT,
+                clock=clock,
+            ),
+            sleep=sleep,
+            clock=clock,
+        )
+
+    results = {}
+    for name, policy in (("botocore standard", botocore_standard), ("guard", guarded)):
+        for scenario, error_rate in (("30% throttled", 0.3), ("outage", 1.0)):
+            results[(name, scenario)] = _simulate_throttling(policy, error_rate, 500)
+
+    print("\n500 GetItem calls, 5ms round trip, virtual time:")
+    for (name, scenario), result in results.items():
+        durations = result["durations"]
+        print(
+            f"  {name:18} {scenario:14} p50 {_percentile(durations, 0.5) * 1000:7.1f}ms"
+            f"  p99 {_percentile(durations, 0.99) * 1000:7.1f}ms"
+            f"  max {durations[-1] * 1000:7.1f}ms"
+            f"  total {sum(durations):6.1f}s  {result['succeeded']} ok"
+        )
+
+    for scenario in ("30% throttled", "outage"):
+        legacy = results[("botocore standard", scenario)]["durations"]
+        guard = results[("guard", scenario)]["durations"]
+        # Bounded by the retry budget plus the last attempt's round trip
+        assert guard[-1] <= Config.DYNAMODB_RETRY_BUDGET + THROTTLING_SERVICE_TIME
+        assert _percentile(guard, 0.99) < _percentile(legacy, 0.99)
+    # While the circuit is open calls cost nothing
+    assert sum(results[("guard", "outage")]["durations"]) * 10 < sum(
+        results[("botocore standard", "outage")]["durations"]
+    )
+    assert results[("guard", "30% throttled")]["succeeded"] >= (
+        results[("botocore standard", "30% throttled")]["succeeded"]
+    )
+
+
+class _LambdaContext:
+    def __init__(self, remaining_ms: float) -> None:
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int(self.remaining_ms)
+
+
+def test_benchmark_request_deadline(memory_tables, monkeypatch):
+    """
+    GET latency while reads stall, with and without a deadline from the
+    Lambda context, and the deadline's cost on healthy requests.
+    """
+    backend = _network_backend([ACTIVE_PLAN_ITEM], 0.005, READ_OPERATIONS)
+    monkeypatch.setattr(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, "backend", backend)
+    handler(_webhook_event(CREATED_SUBSCRIPTION_EVENT, "deadline"), {})
+    event = _get_event("deadline")
+    plenty = _LambdaContext(30_000)
+
+    backend.latency = 0.0
+    healthy = {}
+    for name, context in (("no context", {}), ("deadline", plenty)):
+        healthy[name] = _best_of(lambda context=context: handler(event, context))
+
+    # Reads stall for 1s; the invocation has 100ms left beyond the margin
+    backend.latency = 1.0
+    stalled = {}
+    for name, context in (
+        ("no context", {}),
+        ("deadline", _LambdaContext(Config.REQUEST_DEADLINE_MARGIN * 1000 + 100)),
+    ):
+        start = time.perf_counter()
+        response = handler(event, context)
+        stalled[name] = (time.perf_counter() - start, response["statusCode"])
+
+    print("\nGET with a Lambda context deadline:")
+    for name, seconds in healthy.items():
+        print(f"  {seconds * 1e6:8.1f}us  healthy, {name}")
+    for name, (seconds, status) in stalled.items():
+        print(f"  {seconds * 1000:8.1f}ms  reads stalled 1s, {name} -> {status}")
+
+    assert stalled["no context"][1] == 200
+    assert stalled["deadline"][1] == 503
+    # Answered before the stalled read would have returned
+    assert stalled["deadline"][0] < 1.0
+    if ASSERT_BENCHMARK_SPEEDUPS:
+        assert stalled["deadline"][0] < 0.3
+        assert healthy["deadline"] < healthy["no context"] * 1.25
@@ -1,19 +1,116 @@
+import base64
+import gzip
 import json
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
 
 import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from pydantic import ValidationError
 
 try:
     # For local development
+    from ..config import Config
+    from ..db.backends import (
+        Boto3Backend,
+        ConditionalCheckFailed,
+        FaultInjectingBackend,
+        MemoryBackend,
+        StorageBackend,
+    )
+    from ..db.cache import ItemCache
+    from ..db.dynamo import DynamoFender
+    from ..db.export import (
+        export_table,
+        read_json_chunks,
+        write_json_chunks,
+        write_ndjson,
+    )
+    from ..db.resilience import (
+        AdaptiveRateLimiter,
+        CircuitBreaker,
+        TableGuard,
+        TableThrottled,
+    )
+    from ..db.scan import CapacityLimiter
+    from ..db.serializers import convert_dynamo_value, deserialize_item
     from ..db.tables import DynamoFenderTables
-    from ..main import handler
-    from ..models.models import SubscriptionAdapter
+    from ..main import handler, queue_handler
+    from ..models import models
+    from ..models.analytics import SubscriptionAnalytics
+    from ..models.current_view import rebuild_current_views
+    from ..models.idempotency import EventIdempotency
+    from ..models.loader import BulkLoader, read_records
+    from ..models.models import (
+        CurrentSubscriptionView,
+        PlanModel,
+        PlanRecord,
+        SubscriptionAdapter,
+        SubscriptionModel,
+        SubscriptionRecord,
+        process_subscription_and_plan,
+        subscription_item,
+    )
+    from ..models.replay import ReplayEngine
     from ..schemas.schemas import EventSchema, SubscriptionEventPayload
-except:
+    from ..utils import encoding, metrics
+    from ..utils.concurrency import call_with_timeout, run_concurrently
+    from ..utils.encoding import FragmentCache, OrjsonEncoder, RawJSON, StdlibEncoder
+    from ..utils.response import compress_response, success_response
+    from ..utils.utils import epoch_millis, format_iso8601, parse_iso8601
+except ImportError:
     # For AWS Lambda deployment
+    from config import Config
+    from db.backends import (
+        Boto3Backend,
+        ConditionalCheckFailed,
+        FaultInjectingBackend,
+        MemoryBackend,
+        StorageBackend,
+    )
+    from db.cache import ItemCache
+    from db.dynamo import DynamoFender
+    from db.export import (
+        export_table,
+        read_json_chunks,
+        write_json_chunks,
+        write_ndjson,
+    )
+    from db.resilience import (
+        AdaptiveRateLimiter,
+        CircuitBreaker,
+        TableGuard,
+        TableThrottled,
+    )
+    from db.scan import CapacityLimiter
+    from db.serializers import convert_dynamo_value, deserialize_item
     from db.tables import DynamoFenderTables
-    from main import handler
-    from models.models import SubscriptionAdapter
+    from main import handler, queue_handler
+    from models import models
+    from models.analytics import SubscriptionAnalytics
+    from models.current_view import rebuild_current_views
+    from models.idempotency import EventIdempotency
+    from models.loader import BulkLoader, read_records
+    from models.models import (
+        CurrentSubscriptionView,
+        PlanModel,
+        PlanRecord,
+        SubscriptionAdapter,
+        SubscriptionModel,
+        SubscriptionRecord,
+        process_subscription_and_plan,
+        subscription_item,
+    )
+    from models.replay import ReplayEngine
     from schemas.schemas import EventSchema, SubscriptionEventPayload
+    from utils import encoding, metrics
+    from utils.concurrency import call_with_timeout, run_concurrently
+    from utils.encoding import FragmentCache, OrjsonEncoder, RawJSON, StdlibEncoder
+    from utils.response import compress_response, success_response
+    from utils.utils import epoch_millis, format_iso8601, parse_iso8601
 
 CREATED_SUBSCRIPTION_EVENT = {
     "eventId": "evt_123456789",
@@ -32,7 +129,7 @@ CREATED_SUBSCRIPTION_EVENT = {
     },
 }
 CREATED_SUBSCRIPTION_EVENT_INACTIVE_PLAN = {
-    "eventId": "evt_123456789",
+    "eventId": "evt_123456790",
     "eventType": "subscription.created",
     "timestamp": "2024-03-20T10:00:00Z",
     "provider": "STRIPE",
@@ -226,7 +323,7 @@ AWS_POST_EVENT_CANCEL_SUBSCRIPTION = base_aws_post_event(CANCELLED_SUBSCRIPTION_
 
 
 # @pytest.mark.skip(reason="Skipping this test for now")
-def test_handler_event():
+def test_handler_event(stand_in_table):
     context = {}
     event_get = AWS_GET_EVENT_SUBSCRIPTION
 
@@ -247,6 +344,8 @@ def test_handler_event():
     response_get = handler(event_get, context)
 
     print(response_get)
+    assert response_created["statusCode"] == 200
+    assert response_get["statusCode"] == 200
 
 
 @pytest.mark.skip(reason="Skipping this test for now")
@@ -284,3 +383,1478 @@ def test_subscription_adapter():
     subscription_payload = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
     adapter = SubscriptionAdapter(payload=subscription_payload)
     adapter.process()
+
+
+ACTIVE_PLAN_ITEM = {
+    "pk": "plan:XYZ123",
+    "sk": "metadata",
+    "type": "plan",
+    "name": "Basic Monthly Plan",
+    "price": 9.99,
+    "currency": "USD",
+    "billingCycle": "monthly",
+    "features": ["Access to basic features", "Email support"],
+    "status": "active",
+}
+
+
+def slow_call(result, delay: float = 0.1):
+    def call():
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call
+
+
+def test_run_concurrently_overlaps_calls():
+    # Every call waits for the others, so this only passes if all three run
+    # at the same time; run one after another, the barrier breaks
+    barrier = threading.Barrier(3, timeout=5)
+
+    def meet(result):
+        def call():
+            barrier.wait()
+            return result
+
+        return call
+
+    results = run_concurrently(meet(1), meet(2), meet(3))
+
+    assert results == [1, 2, 3]
+
+
+def test_run_concurrently_raises_first_error_in_order():
+    with pytest.raises(ValueError, match="first"):
+        run_concurrently(
+            slow_call(1),
+            slow_call(ValueError("first"), delay=0.1),
+            slow_call(KeyError("second"), delay=0),
+        )
+
+
+def test_abandoned_timed_calls_do_not_hold_up_later_ones():
+    release = threading.Event()
+    try:
+        for _ in range(Config.IO_MAX_WORKERS + 2):
+            with pytest.raises(TimeoutError):
+                call_with_timeout(release.wait, 0.01)
+
+        start = time.perf_counter()
+        assert call_with_timeout(lambda: 1, 1.0) == 1
+        assert time.perf_counter() - start < 0.5
+    finally:
+        release.set()
+
+
+def test_subscription_adapter_keeps_error_semantics(monkeypatch):
+    inactive_plan = PlanModel(**{**ACTIVE_PLAN_ITEM, "status": "inactive"})
+    payload = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+
+    monkeypatch.setattr(
+        SubscriptionAdapter, "get_plan_by_pk", lambda self: inactive_plan
+    )
+    with pytest.raises(ValueError, match="Plan is inactive or does not exist"):
+        SubscriptionAdapter(payload=payload).process()
+
+    monkeypatch.setattr(SubscriptionAdapter, "get_plan_by_pk", lambda self: None)
+    with pytest.raises(ValueError, match="Plan is inactive or does not exist"):
+        SubscriptionAdapter(payload=payload).process()
+
+
+def test_item_cache_prefix_ttls(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = ItemCache(prefix_ttls={"plan:": 60, "user:": 0})
+
+    cache.set("plan:XYZ123", ["plan"])
+    cache.set("user:123", ["sub"])
+
+    assert cache.get("plan:XYZ123") == ["plan"]
+    assert cache.get("user:123") is None
+
+    now[0] += 61
+    assert cache.get("plan:XYZ123") is None
+    assert cache.stats()["expirations"] == 1
+    # Uncacheable prefixes do not skew the hit rate
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_item_cache_lru_eviction_and_invalidation():
+    cache = ItemCache(max_size=2, prefix_ttls={"plan:": 60})
+
+    cache.set("plan:A", ["a"])
+    cache.set("plan:B", ["b"])
+    cache.get("plan:A")
+    cache.set("plan:C", ["c"])
+
+    assert cache.get("plan:B") is None
+    assert cache.get("plan:A") == ["a"]
+    assert cache.stats()["evictions"] == 1
+
+    cache.set("plan:C", {"pk": "plan:C"}, sk="metadata")
+    cache.invalidate("plan:C", "metadata")
+    assert cache.get("plan:C") is None
+    assert cache.get("plan:C", "metadata") is None
+
+
+def test_dynamo_fender_read_through_cache():
+    table = DynamoFender(
+        "test",
+        cache=ItemCache(prefix_ttls={"plan:": 60}),
+        backend=MemoryBackend([ACTIVE_PLAN_ITEM]),
+    )
+
+    assert table.get_by_pk("plan:XYZ123") == [ACTIVE_PLAN_ITEM]
+    assert table.get_by_pk("plan:XYZ123") == [ACTIVE_PLAN_ITEM]
+    assert table.backend.calls["query"] == 1
+
+    table.update({"pk": "plan:XYZ123", "sk": "metadata", "status": "inactive"})
+    table.get_by_pk("plan:XYZ123")
+    assert table.backend.calls["query"] == 2
+
+    # `user:` items are not cached by this configuration
+    table.get_by_pk("user:123")
+    table.get_by_pk("user:123")
+    assert table.backend.calls["query"] == 4
+    assert table.cache.stats()["hits"] == 1
+
+
+def test_cache_hits_are_not_counted_as_dynamo_calls(monkeypatch, capsys):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+    table = DynamoFender(
+        "test",
+        cache=ItemCache(prefix_ttls={"plan:": 60}),
+        backend=MemoryBackend([ACTIVE_PLAN_ITEM]),
+    )
+
+    with metrics.invocation("handler"):
+        table.get_by_pk("plan:XYZ123")
+        table.get_by_pk("plan:XYZ123")
+        table.get_by_pk("plan:XYZ123")
+    line = json.loads(capsys.readouterr().out)
+
+    assert line["dynamo.get_by_pk.count"] == 3
+    assert line["dynamo.calls"] == 1
+    assert line["cache.hits"] == 2
+
+
+def test_event_idempotency_claims_once():
+    table = DynamoFender("test", backend=MemoryBackend())
+    idempotency = EventIdempotency(table, ttl_seconds=60, recent_events=2)
+
+    assert idempotency.claim("evt_1") is True
+    # Answered from the in-memory set without touching the table
+    assert idempotency.claim("evt_1") is False
+    assert table.backend.calls["put_item"] == 1
+
+    # Another container only has the dedup record to go by
+    other_container = EventIdempotency(table, ttl_seconds=60, recent_events=2)
+    assert other_container.claim("evt_1") is False
+    assert table.backend.calls["put_item"] == 2
+
+    idempotency.release("evt_1")
+    assert other_container.claim("evt_1") is False
+    assert idempotency.claim("evt_1") is True
+
+
+def test_duplicate_webhook_skips_processing(monkeypatch):
+    table = DynamoFender("test", backend=MemoryBackend())
+    monkeypatch.setattr(models, "EVENT_IDEMPOTENCY", EventIdempotency(table))
+    processed = []
+    monkeypatch.setattr(
+        SubscriptionAdapter, "process", lambda self: processed.append(self.payload)
+    )
+
+    payload = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+    first = process_subscription_and_plan(payload=payload)
+    duplicate = process_subscription_and_plan(payload=payload)
+
+    assert len(processed) == 1
+    assert json.loads(first["body"])["message"].startswith("Subscription")
+    assert json.loads(duplicate["body"])["message"] == "Event already processed"
+
+
+def test_failed_webhook_releases_its_claim(monkeypatch):
+    table = DynamoFender("test", backend=MemoryBackend())
+    monkeypatch.setattr(models, "EVENT_IDEMPOTENCY", EventIdempotency(table))
+
+    def fail(self):
+        raise ValueError("Plan is inactive or does not exist")
+
+    monkeypatch.setattr(SubscriptionAdapter, "process", fail)
+    payload = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+    process_subscription_and_plan(payload=payload)
+
+    assert table.backend.keys() == []
+
+
+INACTIVE_PLAN_ITEM = {**ACTIVE_PLAN_ITEM, "pk": "plan:ABC456", "status": "inactive"}
+
+
+@pytest.fixture
+def stand_in_table(monkeypatch):
+    """
+    Point the production table at a `MemoryBackend` seeded with plans.
+    """
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    stand_in = MemoryBackend([ACTIVE_PLAN_ITEM, INACTIVE_PLAN_ITEM])
+    monkeypatch.setattr(table, "backend", stand_in)
+    monkeypatch.setattr(table, "cache", ItemCache(prefix_ttls={"plan:": 60}))
+    monkeypatch.setattr(models, "EVENT_IDEMPOTENCY", EventIdempotency(table))
+    return stand_in
+
+
+def test_handler_batch_webhook(stand_in_table):
+    created = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_batch_1"}
+    renewed = {
+        **RENEWED_SUBSCRIPTION_EVENT,
+        "eventId": "evt_batch_2",
+        "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+    }
+    inactive_plan = {
+        **CREATED_SUBSCRIPTION_EVENT_INACTIVE_PLAN,
+        "eventId": "evt_batch_3",
+        "userId": "456",
+    }
+    invalid = {"eventId": "evt_batch_4", "eventType": "subscription.created"}
+
+    # The renewal is listed first but must be applied after the creation
+    events = [renewed, created, inactive_plan, invalid, created]
+    response = handler(base_aws_post_event(events), {})
+    results = json.loads(response["body"])["data"]["results"]
+
+    assert [result["status"] for result in results] == [
+        "processed",
+        "processed",
+        "failed",
+        "failed",
+        "duplicate",
+    ]
+    assert results[2]["error"] == "Plan is inactive or does not exist"
+    assert "'timestamp'" in results[3]["error"]
+
+    subscription = stand_in_table.get("user:123", "sub:sub_456789")
+    assert subscription["startDate"] == CREATED_SUBSCRIPTION_EVENT["timestamp"]
+    assert subscription["expiresAt"] == RENEWED_SUBSCRIPTION_EVENT["expiresAt"]
+    assert stand_in_table.get("user:456", "sub:sub_456789") is None
+    # One query per distinct plan and user, no matter how many events
+    assert stand_in_table.calls["query"] == 4
+
+
+def test_batch_webhook_failures_release_their_claims(stand_in_table, monkeypatch):
+    created = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_bad_1"}
+    malformed = {
+        **RENEWED_SUBSCRIPTION_EVENT,
+        "eventId": "evt_bad_2",
+        "timestamp": "not-a-date",
+        "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+    }
+
+    # The malformed event fails on its own; the valid one is stored
+    response = handler(base_aws_post_event([created, malformed]), {})
+    assert response["statusCode"] == 200
+    results = json.loads(response["body"])["data"]["results"]
+    assert [result["status"] for result in results] == ["processed", "failed"]
+    assert stand_in_table.get("user:123", "sub:sub_456789") is not None
+
+    # Resending the good event is a duplicate, and the corrected one applies
+    corrected = {**malformed, "timestamp": RENEWED_SUBSCRIPTION_EVENT["timestamp"]}
+    response = handler(base_aws_post_event([created, corrected]), {})
+    results = json.loads(response["body"])["data"]["results"]
+    assert [result["status"] for result in results] == ["duplicate", "processed"]
+
+    # An error escaping the write still releases every claim of the batch
+    def failing_write(self, items: dict) -> None:
+        raise RuntimeError("write failed")
+
+    other_user = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_bad_3", "userId": "456"}
+    with monkeypatch.context() as patch:
+        patch.setattr(models.SubscriptionBatchAdapter, "_write", failing_write)
+        assert handler(base_aws_post_event([other_user]), {})["statusCode"] == 400
+    response = handler(base_aws_post_event([other_user]), {})
+    results = json.loads(response["body"])["data"]["results"]
+    assert results[0]["status"] == "processed"
+    assert stand_in_table.get("user:456", "sub:sub_456789") is not None
+
+
+def test_batch_webhook_keeps_concurrent_newer_writes(stand_in_table, monkeypatch):
+    metadata = CREATED_SUBSCRIPTION_EVENT["metadata"]
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    renewed = {**RENEWED_SUBSCRIPTION_EVENT, "metadata": metadata}
+    cancelled = SubscriptionEventPayload(
+        **{**CANCELLED_SUBSCRIPTION_EVENT, "metadata": metadata}
+    )
+
+    fold = models.SubscriptionBatchAdapter._fold
+
+    def racing_fold(self, payloads: list, reads: dict) -> dict:
+        items = fold(self, payloads, reads)
+        # A newer single-event delivery lands between the read and the write
+        SubscriptionAdapter(payload=cancelled).process()
+        return items
+
+    monkeypatch.setattr(models.SubscriptionBatchAdapter, "_fold", racing_fold)
+    response = handler(base_aws_post_event([renewed]), {})
+    results = json.loads(response["body"])["data"]["results"]
+    assert results[0]["status"] == "processed"
+
+    stored = stand_in_table.get("user:123", "sub:sub_456789")
+    assert stored["lastModified"] == CANCELLED_SUBSCRIPTION_EVENT["timestamp"]
+    assert stored["cancelledAt"] == CANCELLED_SUBSCRIPTION_EVENT["cancelledAt"]
+
+
+def base_sqs_event(bodies: list) -> dict:
+    """
+    Local stand-in for the SQS event a queue-triggered Lambda receives.
+    """
+    return {
+        "Records": [
+            {
+                "messageId": f"msg-{index}",
+                "receiptHandle": f"receipt-{index}",
+                "body": body if isinstance(body, str) else json.dumps(body),
+                "attributes": {
+                    "ApproximateReceiveCount": "1",
+                    "SentTimestamp": "1762490639902",
+                    "MessageGroupId": "subscriptions",
+                },
+                "messageAttributes": {},
+                "md5OfBody": "",
+                "eventSource": "aws:sqs",
+                "eventSourceARN": "arn:aws:sqs:us-east-1:929676127859:webhooks.fifo",
+                "awsRegion": "us-east-1",
+            }
+            for index, body in enumerate(bodies)
+        ]
+    }
+
+
+def test_queue_handler_reports_partial_batch_failures(stand_in_table):
+    other_user = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_q_1", "userId": "456"}
+    created = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_q_2"}
+    # Renewal onto an inactive plan fails, so the later cancel must wait for it
+    renewed = {
+        **RENEWED_SUBSCRIPTION_EVENT,
+        "eventId": "evt_q_3",
+        "metadata": CREATED_SUBSCRIPTION_EVENT_INACTIVE_PLAN["metadata"],
+    }
+    cancelled = {
+        **CANCELLED_SUBSCRIPTION_EVENT,
+        "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+    }
+
+    event = base_sqs_event([created, other_user, "not json", renewed, cancelled])
+    response = queue_handler(event, {})
+
+    failures = [failure["itemIdentifier"] for failure in response["batchItemFailures"]]
+    assert sorted(failures) == ["msg-2", "msg-3", "msg-4"]
+    assert stand_in_table.get("user:123", "sub:sub_456789") is not None
+    assert stand_in_table.get("user:456", "sub:sub_456789") is not None
+    assert "cancelledAt" not in stand_in_table.get("user:123", "sub:sub_456789")
+
+    # Redelivering the failed messages keeps them in order and failing
+    response = queue_handler(base_sqs_event([renewed, cancelled]), {})
+    assert len(response["batchItemFailures"]) == 2
+
+
+def test_convert_dynamo_value_maps_numbers_by_attribute():
+    item = {
+        "pk": "plan:XYZ123",
+        "price": Decimal("10"),
+        "ttl": Decimal("1711000000"),
+        "count": Decimal("3"),
+        "ratio": Decimal("0.25"),
+        "tags": {"b"},
+        "attributes": {"autoRenew": True, "seats": Decimal("2")},
+    }
+
+    converted = convert_dynamo_value(item)
+
+    assert converted["price"] == 10.0 and isinstance(converted["price"], float)
+    assert converted["ttl"] == 1711000000 and isinstance(converted["ttl"], int)
+    assert converted["count"] == 3 and isinstance(converted["count"], int)
+    assert converted["ratio"] == 0.25
+    assert converted["tags"] == ["b"]
+    assert converted["attributes"] == {"autoRenew": True, "seats": 2}
+
+
+def test_deserialize_item_matches_resource_layer():
+    item = {
+        **ACTIVE_PLAN_ITEM,
+        "price": Decimal("9.99"),
+        "ttl": Decimal("1711000000"),
+        "cancelledAt": None,
+        "attributes": {"autoRenew": False, "paymentMethod": "CREDIT_CARD"},
+    }
+    serializer = TypeSerializer()
+    wire_item = {name: serializer.serialize(value) for name, value in item.items()}
+
+    assert deserialize_item(wire_item) == convert_dynamo_value(item)
+
+
+def test_subscription_adapter_writes_without_reading(stand_in_table):
+    created = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+    renewed = SubscriptionEventPayload(
+        **{
+            **RENEWED_SUBSCRIPTION_EVENT,
+            "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+        }
+    )
+
+    item = SubscriptionAdapter(payload=created).process()
+    assert item["startDate"] == CREATED_SUBSCRIPTION_EVENT["timestamp"]
+    # Only the plan is read; the subscription goes straight to UpdateItem
+    assert stand_in_table.calls["query"] == 1
+    assert stand_in_table.calls["update_item"] == 1
+
+    item = SubscriptionAdapter(payload=renewed).process()
+    assert item["expiresAt"] == RENEWED_SUBSCRIPTION_EVENT["expiresAt"]
+    assert item["startDate"] == CREATED_SUBSCRIPTION_EVENT["timestamp"]
+
+    # A late `created` delivery and a replayed older renewal are ignored
+    assert SubscriptionAdapter(payload=created).process() is None
+    stale = renewed.model_copy(update={"timestamp": "2024-04-01T10:00:00Z"})
+    assert SubscriptionAdapter(payload=stale).process() is None
+
+    stored = stand_in_table.get("user:123", "sub:sub_456789")
+    assert stored["lastModified"] == RENEWED_SUBSCRIPTION_EVENT["timestamp"]
+    assert stand_in_table.calls["query"] == 1
+
+
+def test_malformed_event_dates_are_rejected_before_the_claim(stand_in_table):
+    malformed = {**CREATED_SUBSCRIPTION_EVENT, "expiresAt": "next month"}
+    response = handler(base_aws_post_event(malformed), {})
+    assert response["statusCode"] == 400
+    assert "'expiresAt'" in json.loads(response["body"])["error"]
+    # Nothing was claimed or written, so the corrected event applies
+    assert stand_in_table.get("event:evt_123456789", "event") is None
+    response = handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    assert json.loads(response["body"])["message"] == (
+        "Subscription and Plan processed successfully"
+    )
+
+
+def test_date_codec_and_epoch_shadows(stand_in_table):
+    instant = parse_iso8601("2024-03-20T10:00:00Z")
+    assert instant == datetime(2024, 3, 20, 10, tzinfo=timezone.utc)
+    assert format_iso8601(instant) == "2024-03-20T10:00:00Z"
+    # Other ISO 8601 layouts take the `fromisoformat` path
+    offset = parse_iso8601("2024-03-20T12:00:00.5+02:00")
+    assert format_iso8601(offset) == "2024-03-20T10:00:00.500000Z"
+    assert epoch_millis("1970-01-01T00:00:01Z") == 1000
+    assert epoch_millis("2024-03-20T12:00:00.5+02:00") == (
+        epoch_millis("2024-03-20T10:00:00Z") + 500
+    )
+
+    metadata = CREATED_SUBSCRIPTION_EVENT["metadata"]
+    created = SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+    cancelled = SubscriptionEventPayload(
+        **{**CANCELLED_SUBSCRIPTION_EVENT, "metadata": metadata}
+    )
+    SubscriptionAdapter(payload=created).process()
+    SubscriptionAdapter(payload=cancelled).process()
+
+    stored = stand_in_table.get("user:123", "sub:sub_456789")
+    for name in ("expiresAt", "cancelledAt", "lastModified"):
+        assert stored[f"{name}Ms"] == epoch_millis(stored[name])
+    assert SubscriptionModel(**stored).compute_status() == "cancelled"
+
+    # Items stored before the shadows get them on load, with the same status
+    legacy = {key: value for key, value in stored.items() if not key.endswith("Ms")}
+    assert SubscriptionModel(**legacy).compute_status() == "cancelled"
+    pending = {**legacy, "lastModified": "2024-05-01T10:00:00Z"}
+    assert SubscriptionModel(**pending).compute_status() == "pending"
+
+    # Out-of-order events are still rejected on items without the shadows
+    DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS.put(legacy)
+    renewed = SubscriptionEventPayload(
+        **{**RENEWED_SUBSCRIPTION_EVENT, "metadata": metadata}
+    )
+    assert SubscriptionAdapter(payload=renewed).process() is None
+    assert stand_in_table.get("user:123", "sub:sub_456789") == legacy
+    # and newer ones are applied, adding the shadows
+    later = renewed.model_copy(update={"timestamp": "2024-06-01T10:00:00Z"})
+    assert SubscriptionAdapter(payload=later).process()["lastModifiedMs"] == (
+        epoch_millis("2024-06-01T10:00:00Z")
+    )
+
+
+def test_memory_backend_pages_through_sorted_partitions():
+    items = [
+        {"pk": "user:1", "sk": f"sub:{index}", "type": "sub"}
+        for index in (3, 1, 4, 2, 0)
+    ]
+    backend = MemoryBackend([*items, {"pk": "user:2", "sk": "sub:0"}], page_size=3)
+    table = DynamoFender("test", backend=backend)
+
+    subscriptions = table.get_by_pk("user:1")
+
+    assert [item["sk"] for item in subscriptions] == [f"sub:{i}" for i in range(5)]
+    assert backend.calls["query"] == 2
+    assert table.get_or_create("user:1", "sub:3")["sk"] == "sub:3"
+
+    page, start_key = backend.query(
+        "#pk = :pk AND begins_with(#sk, :prefix)",
+        {"#pk": "pk", "#sk": "sk"},
+        {":pk": "user:1", ":prefix": "sub:"},
+        limit=2,
+    )
+    assert len(page) == 2 and start_key == {"pk": "user:1", "sk": "sub:1"}
+
+
+def test_memory_backend_update_expressions_and_conditions():
+    backend = MemoryBackend([{**ACTIVE_PLAN_ITEM, "price": Decimal("9.99")}])
+    key = {"pk": "plan:XYZ123", "sk": "metadata"}
+    names = {"#status": "status", "#created": "created", "#currency": "currency"}
+
+    item = backend.update_item(
+        key,
+        "SET #status = :status, #created = if_not_exists(#created, :now) "
+        "REMOVE #currency ADD #views :one",
+        {**names, "#views": "views"},
+        {":status": "inactive", ":now": "2024-01-01T00:00:00Z", ":one": 1},
+        condition="attribute_exists(#status) AND NOT #status = :status",
+    )
+
+    assert item["status"] == "inactive" and item["price"] == 9.99
+    assert item["created"] == "2024-01-01T00:00:00Z" and item["views"] == 1
+    assert "currency" not in item
+
+    with pytest.raises(ConditionalCheckFailed):
+        backend.update_item(
+            key,
+            "SET #status = :status",
+            {"#status": "status"},
+            {":status": "inactive"},
+            condition="#status <> :status",
+        )
+    with pytest.raises(ConditionalCheckFailed):
+        backend.put_item(
+            {**key}, condition="attribute_not_exists(#pk)", names={"#pk": "pk"}
+        )
+
+    backend.delete_item(key)
+    assert len(backend) == 0
+
+
+def test_backends_implement_every_storage_operation():
+    assert not Boto3Backend.__abstractmethods__
+    assert not MemoryBackend.__abstractmethods__
+
+    class PartialBackend(StorageBackend):
+        def get_item(self, key: dict) -> dict | None:
+            return None
+
+    with pytest.raises(TypeError, match="delete_item"):
+        PartialBackend()
+
+
+def test_handler_emits_one_metrics_line(stand_in_table, monkeypatch, capsys):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "_cold_start", True)
+
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    webhook, get = (json.loads(line) for line in lines)
+
+    assert webhook["coldStart"] == 1 and get["coldStart"] == 0
+    assert webhook["function"] == "handler"
+    assert webhook["dynamo.update.count"] == 1
+    assert webhook["dynamo.put.count"] == 1
+    assert webhook["dynamo.calls"] == 4
+    assert {"duration", "parse", "route", "encode"} <= set(webhook)
+    # The current subscription view answers the GET with a single GetItem
+    assert "dynamo.update" not in get and "dynamo.get_by_pk" not in get
+    assert get["dynamo.get_item.count"] == get["dynamo.calls"] == 1
+
+    definition = webhook["_aws"]["CloudWatchMetrics"][0]
+    assert definition["Dimensions"] == [["function"]]
+    assert {metric["Name"] for metric in definition["Metrics"]} <= set(webhook)
+
+
+def test_event_schema_parses_payload_in_one_pass():
+    event = EventSchema(**AWS_POST_EVENT_CREATE_SUBSCRIPTION)
+    payload = event.parse_payload()
+    assert payload == SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)
+
+    batch = base_aws_post_event([CREATED_SUBSCRIPTION_EVENT])
+    assert EventSchema(**{**batch, "body": " " + batch["body"]}).parse_payload() == [
+        CREATED_SUBSCRIPTION_EVENT
+    ]
+
+    with pytest.raises(ValidationError, match="Invalid JSON"):
+        EventSchema(**{**batch, "body": "{not json"}).parse_payload()
+    with pytest.raises(ValidationError, match="eventId"):
+        EventSchema(**{**batch, "body": None}).parse_payload()
+
+
+def test_response_encoders_splice_raw_fragments(monkeypatch):
+    built = []
+    fragments = FragmentCache(max_size=1)
+    plan = fragments.get("plan:XYZ123", lambda: built.append(1) or {"sku": "X"})
+    assert fragments.get("plan:XYZ123", lambda: built.append(1)) is plan
+    assert built == [1]
+
+    data = {"userId": "user:123", "plan": plan, "features": ["é"]}
+    encoders = [StdlibEncoder()]
+    if encoding.orjson is not None:
+        encoders.append(OrjsonEncoder())
+
+    for encoder in encoders:
+        monkeypatch.setattr(encoding, "ENCODER", encoder)
+        response = success_response("ok", data=data)
+        assert json.loads(response["body"]) == {
+            "message": "ok",
+            "data": {"userId": "user:123", "plan": {"sku": "X"}, "features": ["é"]},
+        }
+        assert success_response("ok")["body"] == '{"message":"ok"}'
+
+    with pytest.raises(TypeError):
+        StdlibEncoder().dumps({"nested": {"plan": RawJSON("{}"), "at": object()}})
+
+
+def test_response_encoders_agree_on_nested_fragments():
+    plan = {"sku": "X", "name": "Gold", "price": 9.99, "features": ["é", "4K"]}
+    entry = {"userId": "user:123", "plan": plan, "status": "active"}
+    envelope = {"missing": ["user:9"], "subscriptions": [entry, entry]}
+    fragment = RawJSON(json.dumps(plan, separators=(",", ":"), ensure_ascii=False))
+    spliced = {
+        "missing": ["user:9"],
+        "subscriptions": [{**entry, "plan": fragment}, {**entry, "plan": fragment}],
+    }
+
+    # Fragments stay where they are and nothing is escaped or reordered
+    expected = json.dumps(envelope, separators=(",", ":"), ensure_ascii=False)
+    assert StdlibEncoder().dumps(spliced) == expected
+    if encoding.orjson is not None:
+        assert OrjsonEncoder().dumps(spliced) == expected
+
+    # Data that happens to read like the encoder's placeholder for a fragment
+    tricky = {"note": "\x000", "plan": fragment}
+    assert StdlibEncoder().dumps(tricky) == json.dumps(
+        {"note": "\x000", "plan": plan}, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+def test_handler_conditional_get(stand_in_table):
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+    etag = response["headers"]["ETag"]
+    assert response["statusCode"] == 200
+    assert response["headers"]["Vary"] == "Accept-Encoding"
+
+    headers = {**AWS_GET_EVENT_SUBSCRIPTION["headers"], "if-none-match": etag}
+    conditional = {**AWS_GET_EVENT_SUBSCRIPTION, "headers": headers}
+    not_modified = handler(conditional, {})
+    assert not_modified["statusCode"] == 304
+    assert not_modified["body"] == ""
+    assert not_modified["headers"]["ETag"] == etag
+
+    # A webhook changes `lastModified`, so the old ETag no longer matches
+    renewed = {
+        **RENEWED_SUBSCRIPTION_EVENT,
+        "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+    }
+    handler(base_aws_post_event(renewed), {})
+    response = handler(conditional, {})
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] != etag
+
+
+def test_compress_response_honours_accept_encoding():
+    body = json.dumps({"message": "ok", "data": ["x" * 64] * 32})
+
+    response = compress_response({"statusCode": 200, "body": body}, "gzip, br")
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(base64.b64decode(response["body"])).decode() == body
+
+    for accept_encoding in (None, "br", "gzip;q=0"):
+        response = compress_response({"statusCode": 200, "body": body}, accept_encoding)
+        assert response["body"] == body
+        assert "Content-Encoding" not in response["headers"]
+
+    small = compress_response({"statusCode": 200, "body": "{}"}, "gzip")
+    assert small["body"] == "{}"
+
+
+def test_subscription_analytics_as_of_instants():
+    pytest.importorskip("numpy")
+    yearly_plan = {
+        **ACTIVE_PLAN_ITEM,
+        "pk": "plan:YEARLY",
+        "price": 120.0,
+        "billingCycle": "yearly",
+    }
+
+    def subscription(user: str, plan: str, cancelled_at: str | None = None) -> dict:
+        item = {
+            "pk": f"user:{user}",
+            "sk": "sub:1",
+            "type": "sub",
+            "planSku": plan,
+            "startDate": "2024-01-01T00:00:00Z",
+            "expiresAt": "2024-06-01T00:00:00Z",
+            "lastModified": "2024-01-01T00:00:00Z",
+        }
+        if cancelled_at:
+            item["cancelledAt"] = cancelled_at
+        return item
+
+    items = [
+        ACTIVE_PLAN_ITEM,
+        yearly_plan,
+        subscription("1", "plan:XYZ123"),
+        subscription("2", "plan:XYZ123", cancelled_at="2024-03-01T00:00:00Z"),
+        subscription("3", "plan:YEARLY"),
+        subscription("4", "plan:MISSING"),
+        {"pk": "event:evt_1", "sk": "event", "ttl": 1},
+    ]
+    analytics = SubscriptionAnalytics(items)
+    assert len(analytics) == 4
+
+    assert analytics.status_counts("2023-12-31T00:00:00Z") == {
+        "active": 0,
+        "pending": 0,
+        "cancelled": 0,
+    }
+    assert analytics.status_counts("2024-04-01T00:00:00Z") == {
+        "active": 3,
+        "pending": 1,
+        "cancelled": 0,
+    }
+    assert analytics.status_counts("2024-07-01T00:00:00Z") == {
+        "active": 3,
+        "pending": 0,
+        "cancelled": 1,
+    }
+
+    # Pending subscriptions still pay; yearly prices are spread over 12 months
+    assert analytics.mrr_by_plan("2024-04-01T00:00:00Z") == {
+        "plan:XYZ123": {"currency": "USD", "subscriptions": 2, "mrr": 19.98},
+        "plan:YEARLY": {"currency": "USD", "subscriptions": 1, "mrr": 10.0},
+    }
+    assert analytics.churn("2024-02-01T00:00:00Z", "2024-07-01T00:00:00Z") == {
+        "subscriptions": 4,
+        "churned": 1,
+        "rate": 0.25,
+    }
+
+    # Items with epoch shadows are read from the integers, to the same result
+    shadowed = SubscriptionAnalytics(
+        [
+            {
+                **item,
+                **{
+                    f"{name}Ms": epoch_millis(item[name])
+                    for name in ("expiresAt", "cancelledAt")
+                    if name in item
+                },
+            }
+            for item in items
+        ]
+    )
+    for instant in ("2024-04-01T00:00:00Z", "2024-07-01T00:00:00Z"):
+        assert shadowed.status_counts(instant) == analytics.status_counts(instant)
+    assert shadowed.churn("2024-02-01T00:00:00Z", "2024-07-01T00:00:00Z") == (
+        analytics.churn("2024-02-01T00:00:00Z", "2024-07-01T00:00:00Z")
+    )
+
+
+def _scan_items(count: int) -> list[dict]:
+    return [
+        {"pk": f"user:{index % 37}", "sk": f"sub:{index:04d}", "type": "sub"}
+        for index in range(count)
+    ] + [{**ACTIVE_PLAN_ITEM, "tags": {"a", "b"}}]
+
+
+def test_memory_backend_scan_segments():
+    items = _scan_items(200)
+    backend = MemoryBackend(items, page_size=1000)
+
+    seen = []
+    for segment in range(3):
+        start_key, capacity = None, 0.0
+        while True:
+            page, start_key, page_capacity = backend.scan(
+                segment, 3, limit=9, start_key=start_key
+            )
+            assert len(page) <= 9
+            seen.extend((item["pk"], item["sk"]) for item in page)
+            capacity += page_capacity
+            if start_key is None:
+                break
+        assert capacity > 0
+
+    assert sorted(seen) == backend.keys()
+
+
+def test_scan_parallel_streams_every_item(tmp_path):
+    items = _scan_items(500)
+    table = DynamoFender("scan", backend=MemoryBackend(items))
+    reports = []
+
+    scanned = list(
+        table.scan_parallel(total_segments=4, page_size=23, progress=reports.append)
+    )
+    assert sorted((item["pk"], item["sk"]) for item in scanned) == table.backend.keys()
+    assert reports[-1].items == len(items)
+    assert reports[-1].segments_done == 4
+
+    # Closing the stream early stops the segments
+    stream = table.scan_parallel(total_segments=4, page_size=5)
+    assert len([item for _, item in zip(range(12), stream)]) == 12
+    stream.close()
+
+    ndjson = tmp_path / "export.ndjson.gz"
+    assert write_ndjson(iter(scanned), ndjson) == len(items)
+    with gzip.open(ndjson, "rt") as source:
+        assert [json.loads(line) for line in source] == scanned
+
+    chunks = tmp_path / "export.chunks.json.gz"
+    assert write_json_chunks(iter(scanned), chunks, chunk_size=64) == len(items)
+    assert list(read_json_chunks(chunks)) == scanned
+
+
+def test_export_of_an_empty_table_writes_nothing(tmp_path, capsys):
+    table = DynamoFender("scan", backend=MemoryBackend())
+    # A scan that hands over no page never reports progress
+    table.scan_parallel = lambda **kwargs: iter(())
+    for output_format in ("ndjson", "json-chunks"):
+        assert export_table(table, tmp_path / "export.gz", output_format) == 0
+        assert "None" not in capsys.readouterr().err
+
+
+def test_capacity_limiter_paces_to_the_rate():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = CapacityLimiter(10, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        limiter.wait()
+        limiter.consume(5)
+
+    # The first 10 units are the initial burst; afterwards every page waits
+    # until the previous one is paid for
+    assert sleeps == [0.5, 0.5]
+    assert now[0] == 1.0
+
+
+class _ThrottlingBackend(MemoryBackend):
+    """
+    Leaves the second half of every first attempt unprocessed, as DynamoDB
+    does when a BatchWriteItem request is throttled.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+
+    def batch_write_request(self, items: list[dict]) -> list[dict]:
+        key = tuple((item["pk"], item["sk"]) for item in items)
+        if key in self.seen or len(items) == 1:
+            return super().batch_write_request(items)
+        self.seen.add(tuple((item["pk"], item["sk"]) for item in items[1:]))
+        super().batch_write_request(items[:1])
+        return items[1:]
+
+
+def test_bulk_loader_streams_validates_and_retries(tmp_path):
+    subscriptions = [
+        {
+            "pk": f"user:{index}",
+            "sk": "sub:1",
+            "type": "sub",
+            "planSku": ACTIVE_PLAN_ITEM["pk"],
+            "startDate": "2024-03-20T10:00:00Z",
+            "expiresAt": "2024-04-20T10:00:00Z",
+            "lastModified": "2024-03-20T10:00:00Z",
+        }
+        for index in range(60)
+    ]
+    plans = tmp_path / "plans.json"
+    plans.write_text(json.dumps([ACTIVE_PLAN_ITEM, INACTIVE_PLAN_ITEM], indent=2))
+    seed = tmp_path / "subscriptions.ndjson.gz"
+    with gzip.open(seed, "wt") as output:
+        for item in subscriptions + [{"type": "sub", "pk": "user:x"}]:
+            output.write(json.dumps(item) + "\n")
+
+    assert list(read_records(str(plans))) == [ACTIVE_PLAN_ITEM, INACTIVE_PLAN_ITEM]
+
+    backend = _ThrottlingBackend()
+    sleeps = []
+    loader = BulkLoader(
+        DynamoFender("seed", backend=backend), workers=3, sleep=sleeps.append
+    )
+    records = [*read_records(str(plans)), *read_records(str(seed))]
+    report = loader.load(records)
+
+    assert (report.read, report.written, report.invalid, report.failed) == (
+        63,
+        62,
+        1,
+        0,
+    )
+    assert "'sk'" in report.errors[0]
+    assert report.retries == len(sleeps) == 3
+    assert len(backend) == 62
+    assert backend.get("plan:XYZ123", "metadata")["price"] == 9.99
+
+
+def test_replay_engine_orders_users_and_resumes(stand_in_table, tmp_path):
+    metadata = CREATED_SUBSCRIPTION_EVENT["metadata"]
+    events = []
+    for user in range(8):
+        created = {
+            **CREATED_SUBSCRIPTION_EVENT,
+            "eventId": f"evt_c_{user}",
+            "userId": str(user),
+        }
+        renewed = {
+            **RENEWED_SUBSCRIPTION_EVENT,
+            "eventId": f"evt_r_{user}",
+            "userId": str(user),
+            "metadata": metadata,
+        }
+        cancelled = {
+            **CANCELLED_SUBSCRIPTION_EVENT,
+            "eventId": f"evt_x_{user}",
+            "userId": str(user),
+            "metadata": metadata,
+        }
+        # Logged newest first; each user must still be applied oldest first
+        events += [cancelled, renewed, created]
+    log = tmp_path / "events.ndjson.gz"
+    with gzip.open(log, "wt") as output:
+        for event in events + [{"eventId": "evt_bad", "userId": "3"}]:
+            output.write(json.dumps(event) + "\n")
+
+    applied = []
+
+    def flaky_apply(payload: SubscriptionEventPayload) -> bool:
+        if payload.userId == "5" and payload.is_renewal:
+            raise RuntimeError("throttled")
+        applied.append((payload.userId, payload.eventType))
+        return models.apply_subscription_event(payload)
+
+    work_dir = str(tmp_path / "replay")
+    engine = ReplayEngine([str(log)], work_dir, partitions=4, workers=4)
+    engine.apply = flaky_apply
+    report = engine.run()
+
+    assert (report.total, report.applied, report.invalid, report.failed) == (
+        25,
+        22,
+        1,
+        2,
+    )
+    assert report.lag == 0
+    for user in range(8):
+        mine = [event for user_id, event in applied if user_id == str(user)]
+        if user == 5:
+            assert mine == ["subscription.created"]
+        else:
+            assert mine == [
+                "subscription.created",
+                "subscription.renewed",
+                "subscription.cancelled",
+            ]
+    assert "cancelledAt" not in stand_in_table.get("user:5", "sub:sub_456789")
+
+    # Resuming only re-runs the partition that failed
+    report = ReplayEngine([str(log)], work_dir, partitions=4, workers=4).run()
+    assert report.failed == 0
+    assert report.total_partitions == 1
+    assert report.duplicates >= 1
+    subscription = stand_in_table.get("user:5", "sub:sub_456789")
+    assert subscription["cancelledAt"] == CANCELLED_SUBSCRIPTION_EVENT["cancelledAt"]
+    assert subscription["expiresAt"] == CANCELLED_SUBSCRIPTION_EVENT["expiresAt"]
+
+    with pytest.raises(ValueError):
+        ReplayEngine([str(log)], work_dir, partitions=8).run()
+
+
+def test_records_match_validated_models():
+    # Webhook items are built without a model, to the same result
+    for event in (CREATED_SUBSCRIPTION_EVENT, CANCELLED_SUBSCRIPTION_EVENT):
+        item = subscription_item(SubscriptionEventPayload(**event))
+        assert SubscriptionModel(**item).model_dump(exclude_none=True) == item
+
+    cancelled = subscription_item(
+        SubscriptionEventPayload(**CANCELLED_SUBSCRIPTION_EVENT)
+    )
+    legacy = {key: value for key, value in cancelled.items() if key[-2:] != "Ms"}
+    for item in (
+        subscription_item(SubscriptionEventPayload(**CREATED_SUBSCRIPTION_EVENT)),
+        cancelled,
+        {**legacy, "lastModified": "2024-05-01T10:00:00Z"},
+        legacy,
+    ):
+        record = SubscriptionRecord.from_item(item)
+        model = SubscriptionModel(**item)
+        assert record.compute_status() == model.compute_status()
+        assert record.attributes.autoRenew == model.attributes.autoRenew
+        assert (record.expiresAtMs, record.cancelledAtMs, record.lastModifiedMs) == (
+            model.expiresAtMs,
+            model.cancelledAtMs,
+            model.lastModifiedMs,
+        )
+        assert not hasattr(record, "__dict__")
+
+    plan = PlanRecord.from_item(ACTIVE_PLAN_ITEM)
+    assert plan.to_item() == PlanModel(**ACTIVE_PLAN_ITEM).model_dump(exclude_none=True)
+    assert plan.is_active and not plan.is_inactive
+
+
+def test_current_subscription_view_serves_get(stand_in_table):
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    view = stand_in_table.get("user:123", "current")
+    assert view["subscriptionId"] == "sub:sub_456789"
+    assert view["plan"]["price"] == ACTIVE_PLAN_ITEM["price"]
+
+    # A second, later subscription becomes current; a stale update of the
+    # first one must not take the view back
+    newer = {
+        **CREATED_SUBSCRIPTION_EVENT,
+        "eventId": "evt_newer",
+        "subscriptionId": "sub_newer",
+        "timestamp": "2024-03-25T10:00:00Z",
+    }
+    handler(base_aws_post_event(newer), {})
+    renewed = {
+        **RENEWED_SUBSCRIPTION_EVENT,
+        "metadata": CREATED_SUBSCRIPTION_EVENT["metadata"],
+    }
+    handler(base_aws_post_event(renewed), {})
+    assert stand_in_table.get("user:123", "current")["subscriptionId"] == (
+        "sub:sub_newer"
+    )
+
+    stand_in_table.calls.clear()
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+    data = json.loads(response["body"])["data"]
+    assert data["subscriptionId"] == "sub:sub_newer"
+    assert data["plan"]["sku"] == ACTIVE_PLAN_ITEM["pk"]
+    assert stand_in_table.calls == {"get_item": 1}
+
+    # Users written before the views existed (or seeded by the loader) fall
+    # back to the partition once, which writes their view
+    stand_in_table.delete_item({"pk": "user:123", "sk": "current"})
+    fallback = json.loads(handler(AWS_GET_EVENT_SUBSCRIPTION, {})["body"])["data"]
+    assert fallback == data
+    assert stand_in_table.get("user:123", "current")["subscriptionId"] == (
+        "sub:sub_newer"
+    )
+    stand_in_table.calls.clear()
+    handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+    assert stand_in_table.calls == {"get_item": 1}
+
+    # The rebuild recreates it, and refreshes the plan snapshot of the rest
+    stand_in_table.put_item({**ACTIVE_PLAN_ITEM, "price": Decimal("12.5")})
+    other = {**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_o", "userId": "456"}
+    handler(base_aws_post_event(other), {})
+    report = rebuild_current_views(total_segments=2, workers=2)
+    assert (report.users, report.written, report.orphaned) == (2, 2, 0)
+    assert stand_in_table.get("user:123", "current")["subscriptionId"] == (
+        "sub:sub_newer"
+    )
+    assert stand_in_table.get("user:456", "current")["plan"]["price"] == 12.5
+
+
+def test_current_view_orders_states_by_epoch_millis(stand_in_table):
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    subscription = stand_in_table.get("user:123", "sub:sub_456789")
+    plan = PlanRecord.from_item(ACTIVE_PLAN_ITEM)
+
+    # 12:00+02:00 sorts after 11:00Z as a string but is an hour earlier
+    earlier = {**subscription, "lastModified": "2024-04-01T12:00:00+02:00"}
+    later = {**subscription, "lastModified": "2024-04-01T11:00:00Z"}
+    for item in (earlier, later):
+        item["lastModifiedMs"] = epoch_millis(item["lastModified"])
+    assert CurrentSubscriptionView.write(earlier, plan)
+    assert CurrentSubscriptionView.write(later, plan)
+    assert not CurrentSubscriptionView.write(earlier, plan)
+    assert stand_in_table.get("user:123", "current")["lastModified"] == (
+        later["lastModified"]
+    )
+
+
+def base_aws_lookup_event(user_ids: list) -> dict:
+    return {
+        **base_aws_post_event({"userIds": user_ids}),
+        "path": "/api/v1/subscriptions/batch",
+    }
+
+
+def response_body(response: dict) -> dict:
+    body = response["body"]
+    if response.get("isBase64Encoded"):
+        body = gzip.decompress(base64.b64decode(body)).decode()
+    return json.loads(body)
+
+
+class _FailingViewWritesBackend(MemoryBackend):
+    """
+    `MemoryBackend` that rejects writes of `current` views with `code`,
+    once one is set.
+    """
+
+    code = None
+
+    def put_item(self, item: dict, *args, **kwargs) -> None:
+        if self.code is not None and item["sk"] == "current":
+            raise ClientError(
+                {"Error": {"Code": self.code, "Message": "Injected"}}, "PutItem"
+            )
+        return super().put_item(item, *args, **kwargs)
+
+
+def test_failed_view_backfill_still_answers_reads(monkeypatch, capsys):
+    backend = _FailingViewWritesBackend([ACTIVE_PLAN_ITEM])
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    monkeypatch.setattr(table, "backend", backend)
+    monkeypatch.setattr(table, "guard", TableGuard(base_delay=0))
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    backend.delete_item({"pk": "user:123", "sk": "current"})
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+
+    # Neither a rejected nor a throttled backfill fails the read
+    for code in ("ValidationException", "ProvisionedThroughputExceededException"):
+        backend.code = code
+        response = handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+        assert response["statusCode"] == 200
+        assert response_body(response)["data"]["userId"] == "user:123"
+
+        response = handler(base_aws_lookup_event(["123"]), {})
+        assert response["statusCode"] == 200
+        assert len(response_body(response)["data"]["subscriptions"]) == 1
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line.get("views.backfill_failed") for line in lines] == [1, 1, 1, 1]
+    assert backend.get("user:123", "current") is None
+
+
+class _FlakyBatchGetBackend(MemoryBackend):
+    """
+    `MemoryBackend` that leaves the last key of every first BatchGetItem
+    request unprocessed, as DynamoDB does when throttled.
+    """
+
+    def batch_get(self, keys: list[dict]) -> tuple[list[dict], list[dict]]:
+        if self.calls["batch_get"] % 2:
+            return super().batch_get(keys)
+        items, _ = super().batch_get(keys[:-1])
+        return items, keys[-1:]
+
+
+def test_handler_subscription_lookup(stand_in_table, monkeypatch):
+    backend = _FlakyBatchGetBackend([ACTIVE_PLAN_ITEM])
+    monkeypatch.setattr(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, "backend", backend)
+    handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    # Written before the views existed: no `current` item
+    backend.put_item(
+        {
+            "pk": "user:legacy",
+            "sk": "sub:1",
+            "type": "sub",
+            "planSku": ACTIVE_PLAN_ITEM["pk"],
+            "startDate": "2024-01-01T00:00:00Z",
+            "expiresAt": "2024-02-01T00:00:00Z",
+            "lastModified": "2024-01-01T00:00:00Z",
+            "attributes": {"autoRenew": True, "paymentMethod": "CREDIT_CARD"},
+        }
+    )
+    single = json.loads(handler(AWS_GET_EVENT_SUBSCRIPTION, {})["body"])["data"]
+
+    backend.calls.clear()
+    response = handler(base_aws_lookup_event(["123", "nobody", "legacy", "123"]), {})
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert body["message"] == "Retrieved 2 of 3 subscriptions"
+    assert body["data"]["missing"] == ["nobody"]
+    first, legacy = body["data"]["subscriptions"]
+    assert first == single
+    assert legacy["userId"] == "user:legacy" and legacy["plan"] == single["plan"]
+    # One retry for the unprocessed key, then one query per user without a
+    # view; their one distinct plan is already in the item cache
+    assert backend.calls["batch_get"] == 2
+    assert backend.calls["query"] == 2
+
+    backend.calls.clear()
+    many = [f"u{index}" for index in range(250)]
+    body = response_body(handler(base_aws_lookup_event(many), {}))
+    assert body["data"]["missing"] == many
+    assert backend.calls["batch_get"] == 6
+
+    too_many = [str(index) for index in range(Config.SUBSCRIPTION_LOOKUP_MAX_USERS + 1)]
+    response = handler(base_aws_lookup_event(too_many), {})
+    assert "exceeds" in json.loads(response["body"])["error"]
+
+
+def test_adaptive_rate_limiter_backs_off_and_recovers():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = AdaptiveRateLimiter(
+        min_rate=1, recovery_per_success=5, clock=lambda: now[0], sleep=sleep
+    )
+    # Open until DynamoDB throttles
+    for _ in range(40):
+        assert limiter.acquire(max_wait=0)
+    assert limiter.rate is None and not sleeps
+
+    # Then half the rate just sent, refusing waits longer than allowed
+    limiter.throttled()
+    assert limiter.rate == 20
+    assert limiter.acquire(max_wait=1.0)
+    assert sleeps == [0.05]
+    assert not limiter.acquire(max_wait=0.01)
+
+    for _ in range(4):
+        limiter.succeeded()
+    assert limiter.rate is None
+
+
+def test_table_guard_retries_throttling_and_opens_circuit(stand_in_table, monkeypatch):
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    def clock() -> float:
+        return now[0]
+
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10, clock=clock)
+    guard = TableGuard(
+        max_attempts=4,
+        base_delay=0.01,
+        max_delay=0.1,
+        retry_budget=1.0,
+        limiter=AdaptiveRateLimiter(clock=clock, sleep=sleep),
+        breaker=breaker,
+        sleep=sleep,
+        clock=clock,
+    )
+    faulty = FaultInjectingBackend(stand_in_table)
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    monkeypatch.setattr(table, "backend", faulty)
+    monkeypatch.setattr(table, "guard", guard)
+
+    # Throttled requests are retried with backoff
+    faulty.fail_next(2)
+    assert handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})["statusCode"] == 200
+    assert faulty.injected.total() == 2
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # A request still throttled once its attempts run out gets a 503, in
+    # bounded time
+    faulty.fail_next(5)
+    started = now[0]
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+    assert response["statusCode"] == 503
+    assert int(response["headers"]["Retry-After"]) >= 1
+    assert faulty.injected.total() == 6
+    assert now[0] - started <= guard.retry_budget
+
+    # The fifth failure in a row opens the circuit...
+    assert handler(AWS_GET_EVENT_SUBSCRIPTION, {})["statusCode"] == 503
+    assert faulty.injected.total() == 7
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # ...so requests fail at once without reaching the table
+    calls = stand_in_table.calls.total()
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, {})
+    assert response["statusCode"] == 503
+    assert int(response["headers"]["Retry-After"]) == 10
+    assert stand_in_table.calls.total() == calls
+
+    # After the reset timeout a trial request goes through and closes it
+    now[0] += 10
+    assert handler(AWS_GET_EVENT_SUBSCRIPTION, {})["statusCode"] == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class _RefusingLimiter:
+    """
+    Rate limiter stand-in that refuses the next `refusals` tokens.
+    """
+
+    def __init__(self, refusals: int) -> None:
+        self.refusals = refusals
+
+    def acquire(self, max_wait: float) -> bool:
+        if self.refusals:
+            self.refusals -= 1
+            return False
+        return True
+
+    def throttled(self) -> None:
+        pass
+
+    def succeeded(self) -> None:
+        pass
+
+
+def test_refused_trial_call_keeps_the_circuit_half_open():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+    )
+    guard = TableGuard(
+        limiter=_RefusingLimiter(1), breaker=breaker, clock=lambda: now[0]
+    )
+    breaker.failed()
+
+    # The trial call the half-open circuit lets through is refused a token...
+    now[0] += 10
+    with pytest.raises(TableThrottled):
+        guard.call(lambda: "ok")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # ...so the next call may still be the trial, and closes the circuit
+    now[0] += 1000
+    assert guard.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class _LostPutResponseBackend(MemoryBackend):
+    """
+    `MemoryBackend` whose first put is stored but answered with a 500, as
+    when DynamoDB applied a write and its response was lost.
+    """
+
+    lost = False
+
+    def put_item(self, *args, **kwargs) -> None:
+        super().put_item(*args, **kwargs)
+        if not self.lost:
+            self.lost = True
+            raise ClientError(
+                {"Error": {"Code": "InternalServerError", "Message": "Lost"}},
+                "PutItem",
+            )
+
+
+def test_retried_claim_recognizes_its_own_record(stand_in_table, monkeypatch):
+    backend = _LostPutResponseBackend([ACTIVE_PLAN_ITEM])
+    table = DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS
+    monkeypatch.setattr(table, "backend", backend)
+    monkeypatch.setattr(table, "guard", TableGuard(base_delay=0))
+
+    # The retried claim fails its condition on the record it wrote itself
+    response = handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    assert json.loads(response["body"])["message"] == (
+        "Subscription and Plan processed successfully"
+    )
+    assert backend.lost
+    assert backend.get("user:123", "sub:sub_456789") is not None
+
+    # A record written by another claim still makes a duplicate
+    models.EVENT_IDEMPOTENCY.recent.discard(CREATED_SUBSCRIPTION_EVENT["eventId"])
+    response = handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, {})
+    assert json.loads(response["body"])["message"] == "Event already processed"
+
+
+class _SlowReadsBackend(MemoryBackend):
+    """
+    `MemoryBackend` whose reads take `delay` seconds.
+    """
+
+    delay = 0.0
+
+    def query(self, *args, **kwargs) -> tuple[list[dict], dict | None]:
+        time.sleep(self.delay)
+        return super().query(*args, **kwargs)
+
+    def get_item(self, key: dict) -> dict | None:
+        time.sleep(self.delay)
+        return super().get_item(key)
+
+
+class _LambdaContext:
+    def __init__(self, remaining_ms: float) -> None:
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int(self.remaining_ms)
+
+
+def test_request_deadline_from_lambda_context(stand_in_table, monkeypatch):
+    backend = _SlowReadsBackend([ACTIVE_PLAN_ITEM])
+    monkeypatch.setattr(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, "backend", backend)
+    margin_ms = Config.REQUEST_DEADLINE_MARGIN * 1000
+    plenty = _LambdaContext(30_000)
+    assert handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, plenty)["statusCode"] == 200
+
+    # With nothing left but the margin the request gets a 503 at once,
+    # without reaching the table
+    calls = backend.calls.total()
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, _LambdaContext(margin_ms))
+    assert response["statusCode"] == 503
+    assert json.loads(response["body"])["error"] == "Request deadline exceeded"
+    assert response["headers"]["Retry-After"] == "1"
+    assert backend.calls.total() == calls
+
+    # A read slower than the time left is abandoned at the deadline
+    backend.delay = 0.5
+    started = time.perf_counter()
+    response = handler(AWS_GET_EVENT_SUBSCRIPTION, _LambdaContext(margin_ms + 100))
+    assert response["statusCode"] == 503
+    assert "deadline" in json.loads(response["body"])["error"]
+    assert time.perf_counter() - started < 0.4
+
+    # A webhook that ran out of time releases its idempotency claim, so the
+    # provider's retry applies it instead of taking it for a duplicate
+    retried = base_aws_post_event({**CREATED_SUBSCRIPTION_EVENT, "eventId": "evt_late"})
+    response = handler(retried, _LambdaContext(margin_ms + 100))
+    assert response["statusCode"] == 503
+    backend.delay = 0.0
+    response = handler(retried, plenty)
+    assert response["statusCode"] == 200
+    assert "already processed" not in response["body"]
+
+
+def test_abandoned_write_may_land_after_its_503(stand_in_table, monkeypatch):
+    backend = FaultInjectingBackend(
+        MemoryBackend([ACTIVE_PLAN_ITEM]),
+        latency=0.3,
+        slow_operations=frozenset({"update_item"}),
+    )
+    monkeypatch.setattr(DynamoFenderTables.SUBSCRIPTIONS_AND_PLANS, "backend", backend)
+    margin_ms = Config.REQUEST_DEADLINE_MARGIN * 1000
+
+    # The client is told the webhook failed while its write is in flight...
+    response = handler(
+        AWS_POST_EVENT_CREATE_SUBSCRIPTION, _LambdaContext(margin_ms + 100)
+    )
+    assert response["statusCode"] == 503
+    assert backend.get("user:123", "sub:sub_456789") is None
+
+    # ...and the write still commits afterwards
+    time.sleep(0.4)
+    landed = backend.get("user:123", "sub:sub_456789")
+    assert landed["expiresAt"] == CREATED_SUBSCRIPTION_EVENT["expiresAt"]
+
+    # The claim was released, so the provider's retry applies the event
+    # again, which leaves the same subscription
+    backend.latency = 0.0
+    response = handler(AWS_POST_EVENT_CREATE_SUBSCRIPTION, _LambdaContext(30_000))
+    assert response["statusCode"] == 200
+    assert "already processed" not in response["body"]
+    retried = backend.get("user:123", "sub:sub_456789")
+    assert retried == landed
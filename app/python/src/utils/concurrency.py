@@ -0,0 +1,121 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+try:
+    # For local development
+    from ..config import Config
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Bounded, process-wide thread pool for DynamoDB I/O. It is created on first
+    use and reused across warm Lambda invocations.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.IO_MAX_WORKERS,
+                    thread_name_prefix="fender-io",
+                )
+    return _executor
+
+
+def _in_context(call: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    `call` bound to the caller's context variables (e.g. the request
+    deadline), which pool threads would not see otherwise.
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(call)
+
+
+def submit(call: Callable[[], Any]) -> Future:
+    """
+    Start an I/O call in the background. The caller keeps working and joins it
+    later with `future.result()`, which re-raises the call's error if any.
+    """
+    return get_executor().submit(_in_context(call))
+
+
+def call_with_timeout(call: Callable[[], Any], timeout: float) -> Any:
+    """
+    Run `call` and return its result, raising `TimeoutError` if it takes
+    longer than `timeout` seconds. A call abandoned on timeout keeps running
+    until it ends by itself (the DynamoDB client's own timeouts bound it), so
+    it gets a thread of its own rather than a pool worker: however many are
+    abandoned, later calls never queue behind them. An abandoned write can
+    therefore still be applied after the caller gave up on it.
+    """
+    future = Future()
+    bound = _in_context(call)
+
+    def run() -> None:
+        try:
+            future.set_result(bound())
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, name="fender-deadline", daemon=True).start()
+    return future.result(timeout=timeout)
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> list:
+    """
+    Run independent I/O calls concurrently and return their results in the
+    order they were given.
+
+    Every call is awaited before returning. If any of them failed, the error
+    of the first failing call (in argument order) is raised, so callers keep
+    the same error semantics as running the calls one after another.
+    """
+    if len(calls) == 1:
+        return [calls[0]()]
+
+    executor = get_executor()
+    futures = [executor.submit(_in_context(call)) for call in calls[1:]]
+
+    # The caller's thread runs the first call instead of idling on the join
+    outcomes = [_capture(calls[0])]
+    outcomes.extend(_capture(future.result) for future in futures)
+
+    for _, error in outcomes:
+        if error is not None:
+            raise error
+
+    return [result for result, _ in outcomes]
+
+
+def _capture(call: Callable[[], Any]) -> tuple:
+    try:
+        return call(), None
+    except Exception as error:
+        return None, error
+
+
+def run_in_parallel(calls: list[Callable[[], Any]], max_workers: int) -> list:
+    """
+    Run long-running tasks (e.g. one per user) on a dedicated, bounded pool
+    and return their results in order.
+
+    The tasks may themselves use `submit`/`run_concurrently`; they get their
+    own pool so they can never starve the shared I/O pool they are waiting on.
+    """
+    if len(calls) <= 1 or max_workers <= 1:
+        return [call() for call in calls]
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(calls)), thread_name_prefix="fender-task"
+    ) as executor:
+        futures = [executor.submit(_in_context(call)) for call in calls]
+        return [future.result() for future in futures]
@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    # For local development
+    from ..config import Config
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+
+# `time.monotonic()` by which the current request must have its answer, or
+# None outside a request. Unlike the metrics it is a context variable, so
+# `using_margin` can extend it for one call without extending it for the
+# calls running next to it; the helpers in `utils.concurrency` carry it over
+# to their worker threads.
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    The request ran out of time before it could be answered. `retry_after`
+    is a hint, in seconds, for when the caller may try again.
+    """
+
+    def __init__(self, message: str = "Request deadline exceeded") -> None:
+        super().__init__(message)
+        self.retry_after = 1.0
+
+
+@contextmanager
+def request_deadline(context, margin: float = Config.REQUEST_DEADLINE_MARGIN):
+    """
+    Bound the work done inside the block by the invocation's remaining time,
+    as told by the Lambda `context`, less `margin` seconds kept to answer
+    and to undo half-done work. Without a Lambda context there is no bound.
+    """
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining is None:
+        yield None
+        return
+
+    deadline = time.monotonic() + get_remaining() / 1000 - margin
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> float | None:
+    """
+    Seconds left before the request's deadline (negative once it has
+    passed), or None when there is no deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    Raise `DeadlineExceeded` if the request's deadline has passed.
+    """
+    left = time_remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+@contextmanager
+def using_margin(margin: float = Config.REQUEST_DEADLINE_MARGIN):
+    """
+    Let the calls inside the block run into the margin kept by
+    `request_deadline`, for compensating writes (e.g. releasing an
+    idempotency claim) that must still happen after the deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        yield
+        return
+
+    token = _deadline.set(deadline + margin)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    # For local development
+    from ..config import Config
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+
+try:
+    # Optional fast encoder; the stdlib one is used when it is not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RawJSON:
+    """
+    Already-encoded JSON spliced verbatim into a response, e.g. a cached
+    plan fragment.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RawJSON) and other.text == self.text
+
+    def __hash__(self) -> int:
+        return hash(self.text)
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.text!r})"
+
+
+class StdlibEncoder:
+    """
+    Compact `json.dumps` through one prebuilt encoder, with the same output
+    as orjson: non-ASCII text is left as is and keys keep their order. The
+    stdlib encoder cannot emit raw text, so a value holding `RawJSON`
+    anywhere is encoded container by container instead, splicing each
+    fragment where it sits.
+    """
+
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encode = json.JSONEncoder(
+            separators=(",", ":"), ensure_ascii=False
+        ).encode
+
+    def dumps(self, value) -> str:
+        if isinstance(value, dict):
+            # Responses usually carry their fragments at the top level
+            for item in value.values():
+                if item.__class__ is RawJSON:
+                    return self._splice_dict(value)
+        try:
+            return self._encode(value)
+        except TypeError:
+            # A `RawJSON` fragment deeper down, or a value JSON cannot hold,
+            # which `_splice` raises for again
+            return self._splice(value)
+
+    def _splice(self, value) -> str:
+        if value.__class__ is RawJSON:
+            return value.text
+        if isinstance(value, dict):
+            return self._splice_dict(value)
+        if isinstance(value, (list, tuple)):
+            return f"[{','.join(self._splice(item) for item in value)}]"
+        return self._encode(value)
+
+    def _splice_dict(self, value: dict) -> str:
+        # The dict's own fragments are encoded as placeholder strings in one
+        # call and then swapped for their text
+        fragments = []
+        members = {}
+        for key, item in value.items():
+            if item.__class__ is RawJSON:
+                members[key] = f"\0{len(fragments)}"
+                fragments.append(item.text)
+            else:
+                members[key] = item
+        try:
+            text = self._encode(members)
+        except TypeError:
+            # Fragments further down
+            return self._splice_members(value)
+        for index, fragment in enumerate(fragments):
+            placeholder = f'"\\u0000{index}"'
+            if text.count(placeholder) != 1:
+                # The data itself holds the placeholder's text
+                return self._splice_members(value)
+            text = text.replace(placeholder, fragment)
+        return text
+
+    def _splice_members(self, value: dict) -> str:
+        members = []
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Dict key must be str, not {type(key).__name__}")
+            members.append(f"{self._encode(key)}:{self._splice(item)}")
+        return f"{{{','.join(members)}}}"
+
+
+class OrjsonEncoder:
+    """
+    orjson, which splices `RawJSON` natively through `orjson.Fragment`.
+    """
+
+    name = "orjson"
+
+    @staticmethod
+    def _default(item):
+        if isinstance(item, RawJSON):
+            return orjson.Fragment(item.text)
+        raise TypeError(f"Type is not JSON serializable: {type(item).__name__}")
+
+    def dumps(self, value) -> str:
+        return orjson.dumps(value, default=self._default).decode()
+
+
+def make_encoder(name: str = Config.JSON_ENCODER):
+    """
+    Encoder selected by `JSON_ENCODER`: `orjson`, `json`, or `auto` (orjson
+    when it is installed).
+    """
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            raise ValueError("JSON_ENCODER is `orjson` but orjson is not installed")
+        return OrjsonEncoder()
+    if name in ("json", "auto"):
+        return StdlibEncoder()
+    raise ValueError(f"Unknown JSON encoder `{name}`")
+
+
+ENCODER = make_encoder()
+
+
+def dumps(value) -> str:
+    return ENCODER.dumps(value)
+
+
+class FragmentCache:
+    """
+    Small LRU of encoded JSON fragments keyed by the content they encode,
+    so a changed plan simply misses and is encoded again.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build) -> RawJSON:
+        with self._lock:
+            if (fragment := self._fragments.get(key)) is not None:
+                self._fragments.move_to_end(key)
+                return fragment
+
+        fragment = RawJSON(dumps(build()))
+
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+
+        return fragment
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable
+
+try:
+    # For local development
+    from ..config import Config
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+
+# Lambda serves one invocation at a time per process, so the metrics being
+# collected live in a module global that every thread (including the I/O
+# pool) records into. It is None whenever metrics are disabled.
+_current: "InvocationMetrics | None" = None
+_cold_start = True
+
+
+class InvocationMetrics:
+    """
+    Stage durations and call counts collected during one invocation, plus
+    plain tallies (e.g. DynamoDB requests, cache hits) kept by `count`.
+    """
+
+    def __init__(self, function: str, cold_start: bool) -> None:
+        self.function = function
+        self.cold_start = cold_start
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.durations = {}
+        self.counts = {}
+        self.tallies = {"dynamo.calls": 0}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def tally(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.tallies[name] = self.tallies.get(name, 0) + amount
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+    def to_emf(self) -> dict:
+        """
+        CloudWatch embedded metric format: one JSON log line that CloudWatch
+        turns into metrics. Durations of spans that ran concurrently on the
+        I/O pool add up, so they can exceed `duration`.
+        """
+        values = {"duration": self.elapsed * 1000}
+        units = {"duration": "Milliseconds"}
+
+        for name, seconds in self.durations.items():
+            values[name] = seconds * 1000
+            units[name] = "Milliseconds"
+        for name, count in self.counts.items():
+            values[f"{name}.count"] = count
+            units[f"{name}.count"] = "Count"
+
+        for name, amount in self.tallies.items():
+            values[name] = amount
+            units[name] = "Count"
+        values["coldStart"] = int(self.cold_start)
+        units["coldStart"] = "Count"
+
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": Config.METRICS_NAMESPACE,
+                        "Dimensions": [["function"]],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit} for name, unit in units.items()
+                        ],
+                    }
+                ],
+            },
+            "function": self.function,
+            **{name: round(value, 3) for name, value in values.items()},
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: InvocationMetrics, name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """
+    Time a block: `with span("parse"): ...`. A shared no-op when disabled.
+    """
+    if (metrics := _current) is None:
+        return _NO_SPAN
+    return _Span(metrics, name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Add `amount` to the tally `name`; a no-op when disabled.
+    """
+    if (metrics := _current) is not None:
+        metrics.tally(name, amount)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator version of `span`; disabled metrics cost one global lookup.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if (metrics := _current) is None:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def invocation(function: str):
+    """
+    Collect metrics for one Lambda invocation and print them as a single
+    embedded-metric-format line when it ends (if `METRICS_ENABLED`).
+    """
+    global _current, _cold_start
+
+    cold_start, _cold_start = _cold_start, False
+    if not Config.METRICS_ENABLED:
+        yield None
+        return
+
+    metrics = InvocationMetrics(function, cold_start)
+    _current = metrics
+    try:
+        yield metrics
+    finally:
+        _current = None
+        metrics.finish()
+        print(json.dumps(metrics.to_emf()))
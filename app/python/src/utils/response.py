@@ -1,28 +1,135 @@
-import json
-from functools import wraps
+import base64
+import gzip
+import math
+from functools import lru_cache, wraps
 from http import HTTPStatus
 
 from pydantic import ValidationError
 
+try:
+    # For local development
+    from ..config import Config
+    from ..db.resilience import TableUnavailable
+    from .deadline import DeadlineExceeded
+    from .encoding import dumps
+    from .metrics import span
+except ImportError:
+    # For AWS Lambda deployment
+    from config import Config
+    from db.resilience import TableUnavailable
+    from utils.deadline import DeadlineExceeded
+    from utils.encoding import dumps
+    from utils.metrics import span
+
+
+@lru_cache(maxsize=128)
+def _envelope(message: str) -> tuple[str, str]:
+    """
+    Pre-encoded success envelope for a message: the complete body without
+    data, and the prefix the encoded data is appended to.
+    """
+    encoded = dumps(message)
+    return f'{{"message":{encoded}}}', f'{{"message":{encoded},"data":'
 
-def success_response(body: str, data: dict = None) -> dict:
-
-    body = {"message": body}
-
-    if data:
-        body["data"] = data
 
+def success_response(body: str, data: dict = None, headers: dict = None) -> dict:
+    """
+    `data` may hold `RawJSON` fragments, which are spliced in as they are.
+    """
+    with span("encode"):
+        message_only, data_prefix = _envelope(body)
+        response = {
+            "statusCode": HTTPStatus.OK,
+            "body": f"{data_prefix}{dumps(data)}}}" if data else message_only,
+        }
+        if headers:
+            response["headers"] = headers
+        return response
+
+
+def not_modified_response(etag: str) -> dict:
     return {
-        "statusCode": HTTPStatus.OK,
-        "body": json.dumps(body),
+        "statusCode": HTTPStatus.NOT_MODIFIED,
+        "headers": {"ETag": etag},
+        "body": "",
     }
 
 
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Weak comparison of an `If-None-Match` header against an ETag, as HTTP
+    requires for conditional GETs.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """
+    Whether an `Accept-Encoding` header allows gzip (`gzip` or `*` with a
+    non-zero quality).
+    """
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip().lower().removeprefix("q=")
+        try:
+            return not params or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def compress_response(
+    response: dict,
+    accept_encoding: str | None,
+    min_bytes: int = Config.RESPONSE_GZIP_MIN_BYTES,
+) -> dict:
+    """
+    Gzip a response body when the client accepts it and the body has at
+    least `min_bytes` characters. API Gateway passes binary bodies
+    base64-encoded.
+    """
+    headers = response.setdefault("headers", {})
+    headers["Vary"] = "Accept-Encoding"
+
+    if len(response["body"]) < min_bytes or not accepts_gzip(accept_encoding):
+        return response
+
+    with span("compress"):
+        compressed = gzip.compress(response["body"].encode(), compresslevel=6, mtime=0)
+        headers["Content-Encoding"] = "gzip"
+        response["body"] = base64.b64encode(compressed).decode()
+        response["isBase64Encoded"] = True
+        return response
+
+
 def error_response(body: str, status_code: HTTPStatus = HTTPStatus.BAD_REQUEST) -> dict:
-    return {
-        "statusCode": status_code,
-        "body": json.dumps({"error": body}),
-    }
+    with span("encode"):
+        return {
+            "statusCode": status_code,
+            "body": dumps({"error": body}),
+        }
+
+
+def unavailable_response(error: TableUnavailable | DeadlineExceeded) -> dict:
+    """
+    503 for a request DynamoDB could not serve in time, or that ran out of
+    its deadline, with a `Retry-After`
+    (whole seconds) telling the client when to try again.
+    """
+    response = error_response(str(error), status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+    response["headers"] = {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    return response
 
 
 def process_pydantic_error(e):
@@ -44,7 +151,9 @@ def process_pydantic_error(e):
 
 def validation_wrapper(f):
     """
-    Decorator to catch validation errors
+    Decorator to turn errors into responses: a 503 when DynamoDB is
+    throttling or unavailable or the request ran out of time, a 400
+    otherwise.
     """
 
     @wraps(f)
@@ -54,6 +163,8 @@ def validation_wrapper(f):
         except ValidationError as e:
             message = process_pydantic_error(e)
             return False, error_response(message)
+        except (TableUnavailable, DeadlineExceeded) as e:
+            return False, unavailable_response(e)
         except Exception as e:
             return False, error_response(str(e))
 
@@ -1,17 +1,43 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
+# Distinct timestamps kept by the memoized codec functions
+DATE_CACHE_SIZE = 4096
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_iso8601(date_string: str) -> datetime:
     """
     Parse an ISO 8601 date string and return a timezone-aware datetime object.
+
+    `fromisoformat` reads the trailing `Z` itself, so UTC strings (the
+    `YYYY-MM-DDTHH:MM:SSZ` layout webhooks and stored items use) need no
+    rewriting or conversion. Results are memoized, since the same
+    timestamps come back across fields, events and requests.
     """
-    return datetime.fromisoformat(date_string.replace("Z", "+00:00")).astimezone(
-        timezone.utc
-    )
+    parsed = datetime.fromisoformat(date_string)
+    if parsed.tzinfo is timezone.utc:
+        return parsed
+    return parsed.astimezone(timezone.utc)
 
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def format_iso8601(dt: datetime) -> str:
     """
     Format a timezone-aware datetime object as an ISO 8601 date string.
     """
-    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    if dt.tzinfo is not timezone.utc:
+        dt = dt.astimezone(timezone.utc)
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def epoch_millis(date_string: str) -> int:
+    """
+    Milliseconds since the Unix epoch of an ISO 8601 date string, as stored
+    in the numeric `<name>Ms` shadows of date attributes.
+    """
+    return (parse_iso8601(date_string) - _EPOCH) // _MILLISECOND